@@ -0,0 +1,133 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_cache import CACHE_DIR, _read_manifest, load_tables
+
+
+def basket_matrix(order_lines):
+    """Binary order x SKU incidence matrix (CSR); a SKU twice in one order counts once.
+
+    Returns (sku index, matrix).
+    """
+    order_code, _ = pd.factorize(order_lines['order_id'])
+    sku_code, skus = pd.factorize(order_lines['sku_id'], sort=True)
+    valid = (order_code >= 0) & (sku_code >= 0)
+    cells = np.unique(order_code[valid].astype(np.int64) * len(skus) + sku_code[valid])
+    rows, cols = np.divmod(cells, max(len(skus), 1))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(cells), dtype=np.float32), (rows, cols)),
+        shape=(int(order_code.max()) + 1 if len(order_code) else 0, len(skus)),
+    )
+    return pd.Index(np.asarray(skus), name='sku_id'), matrix
+
+
+def _top_k_rows(block, top_k):
+    # Keep the top_k largest entries of every CSR row (ties by column), vectorized
+    counts = np.diff(block.indptr)
+    rows = np.repeat(np.arange(block.shape[0]), counts)
+    order = np.lexsort((block.indices, -block.data, rows))
+    rank = np.arange(len(order)) - block.indptr[rows[order]]
+    keep = np.sort(order[rank < top_k])
+    kept_rows = rows[keep]
+    return sparse.csr_matrix(
+        (block.data[keep], block.indices[keep], np.r_[0, np.cumsum(np.bincount(kept_rows, minlength=block.shape[0]))]),
+        shape=block.shape,
+    )
+
+
+def build_affinity(order_lines, top_k=20, block_size=1024):
+    """Sparse SKU x SKU co-order affinity, keeping the top_k partners per SKU.
+
+    Entry (i, j) is how many more orders hold both SKU i and SKU j than if
+    the two were ordered independently (co-orders minus
+    orders_i * orders_j / n_orders); pairs at or below chance are dropped,
+    so two best sellers are not partners just for being popular. The full
+    product basketsᵀ · baskets can be dense for big baskets, so it is
+    computed block_size SKUs (rows) at a time and each block is cut to its
+    top_k partners before the next one: memory stays around
+    block_size x n_skus plus n_skus x top_k, however large the orders are.
+
+    Returns (sku index, CSR matrix); the diagonal is dropped.
+    """
+    skus, baskets = basket_matrix(order_lines)
+    by_sku = baskets.T.tocsr()
+    sku_orders = np.diff(by_sku.indptr).astype(np.float32)
+    chance = sku_orders / max(baskets.shape[0], 1)
+
+    blocks = []
+    for start in range(0, len(skus), block_size):
+        block = (by_sku[start:start + block_size] @ baskets).tocsr()
+        block.setdiag(0, k=start)
+        # Subtract the co-orders expected by chance from the stored pairs only
+        rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+        block.data -= sku_orders[start + rows] * chance[block.indices]
+        block.data[block.data < 0] = 0
+        block.eliminate_zeros()
+        blocks.append(_top_k_rows(block, top_k))
+
+    matrix = sparse.vstack(blocks, format='csr') if blocks else sparse.csr_matrix((0, 0), dtype=np.float32)
+    return skus, matrix
+
+
+def _affinity_path(data_dir, top_k):
+    return os.path.join(data_dir, CACHE_DIR, f'affinity_top{top_k}.npz')
+
+
+def load_affinity(data_dir='.', top_k=20):
+    """build_affinity() of the store's orders, cached next to the forensics tables.
+
+    The cached matrix is reused as long as order_transactions.csv has the
+    same content hash it was built from.
+    """
+    orders = load_tables(['orders'], data_dir)['orders']
+    source_hash = _read_manifest(data_dir)['orders']['sha1']
+    path = _affinity_path(data_dir, top_k)
+
+    if os.path.exists(path):
+        cached = np.load(path, allow_pickle=False)
+        if str(cached['source_hash']) == source_hash:
+            matrix = sparse.csr_matrix(
+                (cached['data'], cached['indices'], cached['indptr']), shape=tuple(cached['shape'])
+            )
+            return pd.Index(cached['skus'], name='sku_id'), matrix
+
+    skus, matrix = build_affinity(orders[['order_id', 'sku_id']], top_k)
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(
+            f, source_hash=source_hash, skus=skus.to_numpy(dtype=str), data=matrix.data,
+            indices=matrix.indices, indptr=matrix.indptr, shape=np.array(matrix.shape),
+        )
+    os.replace(path + '.tmp', path)
+    return skus, matrix
+
+
+def affinity_partners(skus, matrix):
+    """{sku_id: [(partner sku_id, excess co-orders), ...]} strongest first, for the greedy pass."""
+    partners = {}
+    sku_ids = skus.to_numpy()
+    for i, sku_id in enumerate(sku_ids):
+        start, stop = matrix.indptr[i], matrix.indptr[i + 1]
+        if stop > start:
+            order = np.argsort(-matrix.data[start:stop], kind='stable')
+            partners[sku_id] = list(zip(
+                sku_ids[matrix.indices[start:stop][order]].tolist(), matrix.data[start:stop][order].tolist()
+            ))
+    return partners
+
+
+if __name__ == "__main__":
+    # python affinity.py [TOP_K]
+    top_k = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"🧺 Building SKU co-order affinity (top {top_k} partners)...")
+    skus, matrix = load_affinity(top_k=top_k)
+    pairs = sparse.triu(matrix.maximum(matrix.T)).tocoo()
+    strongest = np.argsort(-pairs.data, kind='stable')[:10]
+    print(pd.DataFrame({
+        'sku_a': skus[pairs.row[strongest]], 'sku_b': skus[pairs.col[strongest]],
+        'excess_co_orders': pairs.data[strongest].round(1),
+    }).to_string(index=False))
+    print(f"✅ {matrix.nnz:,} partner links for {len(skus):,} SKUs cached in {CACHE_DIR}/")
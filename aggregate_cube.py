@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from data_cache import CACHE_DIR, _check_fresh, _read_manifest, _write_manifest, load_tables
+
+# Bump whenever a cube below changes shape or meaning so it is rebuilt
+CUBE_VERSION = 2
+
+# Source tables every cube is derived from (aisles come from sku current_slot)
+CUBE_SOURCES = ['sku', 'orders', 'picker']
+
+CUBES = ['aisle_minute', 'aisle_hour', 'picker_day', 'picker_distance', 'order_hour', 'sku_week',
+         'totals']
+
+
+def build_cube(sku_df, orders_df, picker_df):
+    """Every aggregate the dashboard pages read, from one pass over each log.
+
+    - aisle_minute: picker movements per aisle, date, hour and minute (the
+      aisle of the SKU's current slot)
+    - aisle_hour: the same rolled up to aisle x hour (heatmap)
+    - picker_day: per picker and date, pick count and the sum, sum of
+      squares, min and max of travel distance, time and speed, so means and
+      standard deviations over any set of days are exact
+    - picker_distance: picks per picker and travel distance (histograms)
+    - order_hour: order lines per date and hour
+    - sku_week: order lines per SKU and week number
+    - totals: one row with order lines, distinct orders, weeks and pickers
+    """
+    slot = picker_df['sku_id'].astype(str).map(sku_df.set_index('sku_id')['current_slot'])
+    aisle = slot.str.split('-').str[0]
+    movement = picker_df['movement_timestamp']
+    time_min = (movement - picker_df['order_timestamp']).dt.total_seconds() / 60
+    speed = picker_df['travel_distance_m'] / time_min.replace(0, np.nan)
+
+    moves = pd.DataFrame({
+        'aisle': aisle.astype('category'), 'date': picker_df['date'], 'hour': picker_df['hour'],
+        'minute': movement.dt.minute,
+    })
+    aisle_minute = (
+        moves.groupby(['aisle', 'date', 'hour', 'minute'], observed=True).size().rename('movements').reset_index()
+    )
+    aisle_hour = aisle_minute.groupby(['aisle', 'hour'], observed=True)['movements'].sum().reset_index()
+
+    picks = pd.DataFrame({
+        'picker_id': picker_df['picker_id'], 'date': picker_df['date'],
+        'distance': picker_df['travel_distance_m'], 'distance_sq': picker_df['travel_distance_m'] ** 2,
+        'time': time_min, 'time_sq': time_min ** 2, 'speed': speed, 'speed_sq': speed ** 2,
+    })
+    picker_day = picks.groupby(['picker_id', 'date'], observed=True).agg(
+        picks=('distance', 'size'),
+        distance_sum=('distance', 'sum'), distance_sq=('distance_sq', 'sum'),
+        distance_min=('distance', 'min'), distance_max=('distance', 'max'),
+        time_n=('time', 'count'), time_sum=('time', 'sum'), time_sq=('time_sq', 'sum'),
+        speed_n=('speed', 'count'), speed_sum=('speed', 'sum'), speed_sq=('speed_sq', 'sum'),
+    ).reset_index()
+    picker_distance = (
+        picks.groupby(['picker_id', 'distance'], observed=True).size().rename('picks').reset_index()
+        .rename(columns={'distance': 'travel_distance_m'})
+    )
+
+    order_hour = orders_df.groupby(['date', 'hour'], observed=True).size().rename('lines').reset_index()
+    sku_week = orders_df.groupby(['sku_id', 'week'], observed=True).size().rename('lines').reset_index()
+    totals = pd.DataFrame({
+        'lines': [len(orders_df)], 'orders': [orders_df['order_id'].nunique()],
+        'weeks': [orders_df['week'].nunique()], 'pickers': [picker_df['picker_id'].nunique()],
+    })
+
+    return {
+        'aisle_minute': aisle_minute, 'aisle_hour': aisle_hour,
+        'picker_day': picker_day, 'picker_distance': picker_distance,
+        'order_hour': order_hour, 'sku_week': sku_week, 'totals': totals,
+    }
+
+
+def _cube_path(data_dir, name):
+    return os.path.join(data_dir, CACHE_DIR, f'cube_{name}.feather')
+
+
+def load_cube(data_dir='.', tables=None):
+    """build_cube() of the store's data, persisted next to the forensics tables.
+
+    The cube is rebuilt only when a source CSV's content hash or
+    CUBE_VERSION changes; otherwise the small aggregate files are read
+    back and the logs are not touched. `tables` can hold already loaded
+    source tables for a rebuild.
+    """
+    manifest = _read_manifest(data_dir)
+    if all(_check_fresh(name, data_dir, manifest) for name in CUBE_SOURCES):
+        key = {'version': CUBE_VERSION, 'sources': {name: manifest[name]['sha1'] for name in CUBE_SOURCES}}
+        if manifest.get('cube') == key and all(os.path.exists(_cube_path(data_dir, name)) for name in CUBES):
+            return {name: feather.read_feather(_cube_path(data_dir, name)) for name in CUBES}
+
+    tables = dict(tables or {})
+    tables.update(load_tables([name for name in CUBE_SOURCES if name not in tables], data_dir))
+    manifest = _read_manifest(data_dir)
+    key = {'version': CUBE_VERSION, 'sources': {name: manifest[name]['sha1'] for name in CUBE_SOURCES}}
+    cube = build_cube(tables['sku'], tables['orders'], tables['picker'])
+    for name, df in cube.items():
+        path = _cube_path(data_dir, name)
+        feather.write_feather(df, path + '.tmp', compression='uncompressed')
+        os.replace(path + '.tmp', path)
+    manifest = _read_manifest(data_dir)
+    manifest['cube'] = key
+    _write_manifest(data_dir, manifest)
+    return cube
+
+
+def picker_summary(picker_day):
+    """Per-picker pick count and mean / std (ddof=1) / min / max of distance, time and speed."""
+    totals = picker_day.groupby('picker_id', observed=True).agg(
+        picks=('picks', 'sum'), distance_sum=('distance_sum', 'sum'), distance_sq=('distance_sq', 'sum'),
+        distance_min=('distance_min', 'min'), distance_max=('distance_max', 'max'),
+        time_n=('time_n', 'sum'), time_sum=('time_sum', 'sum'), time_sq=('time_sq', 'sum'),
+        speed_n=('speed_n', 'sum'), speed_sum=('speed_sum', 'sum'), speed_sq=('speed_sq', 'sum'),
+    )
+    stats = pd.DataFrame({'picks': totals['picks']})
+    for measure, n in [('distance', totals['picks']), ('time', totals['time_n']), ('speed', totals['speed_n'])]:
+        mean = totals[f'{measure}_sum'] / n
+        variance = (totals[f'{measure}_sq'] - n * mean ** 2) / (n - 1)
+        stats[f'{measure}_mean'] = mean
+        stats[f'{measure}_std'] = np.sqrt(variance.clip(lower=0)).where(n > 1)
+    stats['distance_min'] = totals['distance_min']
+    stats['distance_max'] = totals['distance_max']
+    return stats.reset_index()
+
+
+if __name__ == "__main__":
+    # python aggregate_cube.py  -> build (or refresh) the dashboard cube in the cache
+    print("🧊 Building the dashboard aggregate cube...")
+    for name, df in load_cube().items():
+        print(f"   - {name}: {len(df):,} rows")
+    print(f"✅ Cube saved in {CACHE_DIR}/")
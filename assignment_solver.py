@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+
+def pool_zone(temp_req):
+    """Temperature pool each SKU is slotted into (strict mapping, Ambient otherwise)."""
+    temp_req = pd.Series(temp_req)
+    return np.where(temp_req == 'Frozen', 'Frozen',
+                    np.where(temp_req == 'Refrigerated', 'Refrigerated', 'Ambient'))
+
+
+def solve_pool(velocity, weight, greedy_pos, slot_cost, slot_capacity, available, top_k=32):
+    """Min-cost assignment of SKUs to slots within one temperature pool.
+
+    Cost of an edge is velocity x slot_cost; slots that cannot carry the SKU
+    are simply missing edges. Instead of a dense SKU x slot matrix, every SKU
+    is connected to top_k + 1 candidate slots per weight class: within a
+    class all slots are interchangeable for feasibility, so an optimal plan
+    fills each class cheapest-first in velocity order and a SKU with rank r
+    among the SKUs allowed in the class lands at class position <= r. The
+    window [r - top_k, r] keeps the candidates near that position. The
+    greedy slot is always added as an edge so a full matching exists and
+    the result is never worse than greedy.
+
+    Returns pool-local slot positions, one per SKU.
+    """
+    velocity = np.asarray(velocity, dtype=float)
+    weight = np.asarray(weight, dtype=float)
+    greedy_pos = np.asarray(greedy_pos, dtype=np.int64)
+    slot_cost = np.asarray(slot_cost, dtype=float)
+    slot_capacity = np.asarray(slot_capacity, dtype=float)
+    available = np.asarray(available, dtype=bool)
+
+    n_skus, n_slots = len(velocity), len(slot_cost)
+    if n_skus == 0:
+        return greedy_pos
+
+    # Rank SKUs by velocity once (stable, so ties keep their greedy order)
+    order = np.argsort(-velocity, kind='stable')
+    offsets = np.arange(top_k + 1)
+
+    rows = [np.arange(n_skus)]
+    cols = [greedy_pos]
+
+    capacity_key = np.where(np.isnan(slot_capacity), np.inf, slot_capacity)
+    for capacity in np.unique(capacity_key):
+        class_slots = np.flatnonzero(available & (capacity_key == capacity))
+        if len(class_slots) == 0:
+            continue
+        class_slots = class_slots[np.argsort(slot_cost[class_slots], kind='stable')]
+
+        # Same test as the greedy pass: a SKU fits unless weight > limit
+        allowed = order[~(weight[order] > capacity)]
+        rank = np.arange(len(allowed))
+
+        window = np.clip(rank[:, None] - offsets[None, :], 0, len(class_slots) - 1)
+        rows.append(np.repeat(allowed, top_k + 1))
+        cols.append(class_slots[window].ravel())
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+
+    # Drop duplicate edges (clipped windows, greedy slot already in a window)
+    edge_key = np.unique(rows * n_slots + cols)
+    rows, cols = edge_key // n_slots, edge_key % n_slots
+
+    # Shift every edge by 1: each SKU takes exactly one edge, so the optimum is
+    # unchanged, and zero-velocity edges stay explicit in the sparse matrix
+    cost = velocity[rows] * slot_cost[cols] + 1.0
+    graph = csr_matrix((cost, (rows, cols)), shape=(n_skus, n_slots))
+
+    row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+    assigned = np.empty(n_skus, dtype=np.int64)
+    assigned[row_ind] = col_ind
+    return assigned
+
+
+def optimize_assignment(sku_data, warehouse_df, plan, fallback_skus=(), top_k=32, withheld=()):
+    """Re-solve a greedy plan as a min-cost matching per temperature pool.
+
+    `sku_data` needs sku_id, temp_req, clean_weight_kg and order_count,
+    `warehouse_df` needs slot_id, temp_zone, max_weight_kg and slot_cost, and
+    `plan` is the greedy SKU_ID/Bin_ID frame. Fallback SKUs keep their slot
+    and that slot is withheld from the matching, as are the `withheld` slots.
+
+    Returns the improved plan (same row order) and a per-pool report with the
+    objective gap against greedy.
+    """
+    plan = plan.copy()
+    skus = sku_data.set_index('sku_id').loc[plan['SKU_ID']]
+    skus_zone = pool_zone(skus['temp_req'])
+    is_fallback = plan['SKU_ID'].isin(set(fallback_skus)).to_numpy()
+
+    report = []
+    for zone in ['Frozen', 'Refrigerated', 'Ambient']:
+        pool = warehouse_df[warehouse_df['temp_zone'] == zone]
+        position = pd.Series(np.arange(len(pool)), index=pool['slot_id'])
+
+        rows = np.flatnonzero((skus_zone == zone) & ~is_fallback)
+        greedy_pos = position.reindex(plan['Bin_ID'].to_numpy()[rows]).to_numpy()
+        rows = rows[~np.isnan(greedy_pos)]
+        greedy_pos = greedy_pos[~np.isnan(greedy_pos)].astype(np.int64)
+
+        available = ~pool['slot_id'].isin(plan.loc[is_fallback, 'Bin_ID']).to_numpy()
+        available &= ~pool['slot_id'].isin(withheld).to_numpy()
+        velocity = skus['order_count'].to_numpy(dtype=float)[rows]
+        slot_cost = pool['slot_cost'].to_numpy(dtype=float)
+
+        assigned = solve_pool(
+            velocity,
+            skus['clean_weight_kg'].to_numpy(dtype=float)[rows],
+            greedy_pos,
+            slot_cost,
+            pool['max_weight_kg'].to_numpy(dtype=float),
+            available,
+            top_k=top_k,
+        )
+        plan.iloc[rows, plan.columns.get_loc('Bin_ID')] = pool['slot_id'].to_numpy()[assigned]
+
+        greedy_cost = float((velocity * slot_cost[greedy_pos]).sum())
+        optimal_cost = float((velocity * slot_cost[assigned]).sum())
+        report.append({
+            'temp_zone': zone,
+            'skus': len(rows),
+            'greedy_cost': greedy_cost,
+            'optimal_cost': optimal_cost,
+            'gap': greedy_cost - optimal_cost,
+            'gap_pct': (greedy_cost - optimal_cost) / greedy_cost * 100 if greedy_cost else 0.0,
+        })
+
+    return plan, pd.DataFrame(report)
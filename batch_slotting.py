@@ -0,0 +1,110 @@
+import argparse
+import contextlib
+import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from data_cache import load_tables, read_table
+from optimize_slotting import optimize_slotting
+
+# Cleaned tables shared by every store, set once per worker process
+_shared_tables = {}
+
+
+def load_manifest(path):
+    """Read a batch manifest. Relative paths are taken from the manifest's folder.
+
+    {
+      "stores": ["blr-01", {"dir": "blr-02", "output_dir": "out/blr-02", "solver": "optimal"}],
+      "shared": {"sku": "common"},
+      "options": {"move_budget": 50}
+    }
+
+    `shared` maps a table name to the folder holding its CSV; `options` are
+    optimize_slotting() arguments for every store, overridable per store.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        manifest = json.load(f)
+
+    options = manifest.get('options', {})
+    stores = []
+    for entry in manifest['stores']:
+        entry = {'dir': entry} if isinstance(entry, str) else dict(entry)
+        store = {**options, **entry}
+        store['data_dir'] = os.path.join(base, store.pop('dir'))
+        if store.get('output_dir'):
+            store['output_dir'] = os.path.join(base, store['output_dir'])
+        stores.append(store)
+
+    shared = {name: os.path.join(base, folder) for name, folder in manifest.get('shared', {}).items()}
+    return stores, shared
+
+
+def _init_worker(shared):
+    # The parent has already built the cache, so this is a memory-mapped read.
+    # With fork the parent's tables are inherited and nothing is read at all.
+    if not _shared_tables:
+        for name, data_dir in shared.items():
+            _shared_tables[name] = read_table(name, data_dir=data_dir)
+
+
+def _run_store(store):
+    store = dict(store)
+    data_dir = store.pop('data_dir')
+    output_dir = store.get('output_dir') or data_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Workers run side by side, so each store logs to its own file
+    with open(os.path.join(output_dir, 'optimize.log'), 'w') as log, contextlib.redirect_stdout(log):
+        try:
+            optimize_slotting(data_dir=data_dir, tables=_shared_tables, **store)
+        except Exception:
+            traceback.print_exc(file=log)
+            return {'store': data_dir, 'status': 'failed', 'log': log.name}
+
+    with open(os.path.join(output_dir, 'final_slotting_report.json')) as f:
+        run = json.load(f)
+    return {'store': data_dir, 'status': 'ok', 'wall_s': run['wall_s'], 'peak_rss_mb': run['peak_rss_mb'],
+            **run['summary']}
+
+
+def optimize_stores(manifest_path, workers=None):
+    """Optimize every store in the manifest across a process pool.
+
+    Each store gets its own final_slotting_plan.csv, run report and log.
+    Shared tables are cleaned and cached once up front, then loaded once per
+    worker instead of being pickled with every task. A failing store is
+    reported and does not stop the others.
+    """
+    stores, shared = load_manifest(manifest_path)
+
+    for name, data_dir in shared.items():
+        _shared_tables[name] = load_tables([name], data_dir)[name]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+        futures = {pool.submit(_run_store, store): store['data_dir'] for store in stores}
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"   - {result['store']}: {result['status']}")
+            results.append(result)
+
+    # Manifest order, whatever order the stores finished in
+    order = {store['data_dir']: i for i, store in enumerate(stores)}
+    return pd.DataFrame(results).sort_values('store', key=lambda s: s.map(order)).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize slotting for many stores in parallel")
+    parser.add_argument('manifest', help="JSON manifest of store folders")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    print("🏬 Optimizing stores in parallel...")
+    summary = optimize_stores(args.manifest, args.workers)
+    print(summary.to_string(index=False))
+    print(f"✅ {int((summary['status'] == 'ok').sum())} of {len(summary)} stores optimized")
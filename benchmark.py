@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from data_cache import CACHE_DIR, build_cache, load_tables
+from forecast import forecast_velocity
+from optimize_slotting import optimize_slotting, score_slots
+from order_replay import compare_plans, load_order_lines, plan_mapping
+from run_report import close_peak_window, current_rss_mb, open_peak_window
+from synthetic_data import generate_store
+from velocity import load_velocity
+
+# Pipeline stages in run order; each runs inside the store directory
+STAGES = {
+    'cache_build': lambda: build_cache(),
+    'velocity': lambda: load_velocity(),
+    'forecast': lambda: forecast_velocity(),
+    'slot_ranking': lambda: score_slots(load_tables(['warehouse'])['warehouse']),
+    'greedy_plan': lambda: optimize_slotting(),
+    'order_replay': lambda: compare_plans(
+        load_order_lines(),
+        {
+            'current': load_tables(['sku'])['sku'].set_index('sku_id')['current_slot'],
+            'plan': plan_mapping(pd.read_csv('final_slotting_plan.csv')),
+        },
+        load_tables(['warehouse'])['warehouse'],
+    ),
+    'optimal_plan': lambda: optimize_slotting(solver='optimal'),
+    'move_budget_plan': lambda: optimize_slotting(move_budget=50),
+    'congestion_plan': lambda: optimize_slotting(congestion=True),
+    'forecast_plan': lambda: optimize_slotting(forecast='ewma'),
+    'affinity_plan': lambda: optimize_slotting(affinity=True),
+}
+
+
+def measure(fn):
+    """Run fn once; return wall seconds and how far peak RSS rose above the start, in MB."""
+    start_rss = current_rss_mb()
+    window = open_peak_window()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    wall_s = time.perf_counter() - start
+    peak_rss = close_peak_window(window)
+    if peak_rss is None or start_rss is None:
+        return wall_s, None
+    return wall_s, max(peak_rss - start_rss, 0.0)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(scales=(1,), stages=None, data_dir='bench_data', seed=0):
+    """Benchmark every stage at every scale; returns one row per (scale, stage).
+
+    Stores are generated once per scale and seed and reused afterwards. The
+    forensics cache is cleared first, so cache_build is always a cold build.
+    Peak memory is the rise of the process RSS high-water mark over the stage
+    (reset per stage on Linux; elsewhere only stages that set a new process
+    peak show growth).
+    """
+    stages = stages or list(STAGES)
+    commit = _git_commit()
+    rows = []
+    home = os.getcwd()
+    for scale in scales:
+        store_dir = os.path.join(data_dir, f'scale_{scale}_seed_{seed}')
+        if not os.path.exists(os.path.join(store_dir, 'picker_movement.csv')):
+            print(f"🏭 Generating {scale}x store...")
+            generate_store(store_dir, scale, seed)
+        shutil.rmtree(os.path.join(store_dir, CACHE_DIR), ignore_errors=True)
+
+        os.chdir(store_dir)
+        try:
+            sizes = {
+                name: sum(1 for _ in open(path)) - 1
+                for name, path in [('skus', 'sku_master.csv'), ('slots', 'warehouse_constraints.csv'),
+                                   ('order_lines', 'order_transactions.csv')]
+            }
+            for stage in stages:
+                wall_s, peak_mb = measure(STAGES[stage])
+                print(f"   - {scale}x {stage}: {wall_s:.2f}s, peak +{peak_mb or 0:,.0f} MB")
+                rows.append({'scale': scale, 'stage': stage, 'wall_s': round(wall_s, 3),
+                             'peak_mb': peak_mb and round(peak_mb, 1), **sizes, 'seed': seed, 'commit': commit})
+        finally:
+            os.chdir(home)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the slotting pipeline")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1], help="store sizes, e.g. 1 10 100")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help="subset of stages (default: all)")
+    parser.add_argument('--data-dir', default='bench_data', help="where synthetic stores are kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.jsonl', help="results are appended here")
+    args = parser.parse_args()
+
+    print("⏱️ Benchmarking slotting pipeline...")
+    results = run_benchmark(args.scales, args.stages, args.data_dir, args.seed)
+    results.insert(0, 'run_at', datetime.now().isoformat(timespec='seconds'))
+    with open(args.output, 'a') as f:
+        for record in results.to_dict('records'):
+            f.write(json.dumps(record) + '\n')
+
+    print(results.pivot(index='stage', columns='scale', values='wall_s').loc[results['stage'].unique()].to_string())
+    print(f"✅ Results appended to {args.output}")
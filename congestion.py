@@ -0,0 +1,100 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+def picker_events(picker_df, bucket='1min'):
+    """Distinct (sku_id, minute, picker_id) visits from the picker movement log.
+
+    A picker walking to the same SKU twice in one minute is one visit; the
+    minute is the calendar minute of the movement, so days are never merged.
+    """
+    events = pd.DataFrame({
+        'sku_id': picker_df['sku_id'].astype(str).to_numpy(),
+        'minute': picker_df['movement_timestamp'].dt.floor(bucket).to_numpy(),
+        'picker_id': picker_df['picker_id'].astype(str).to_numpy(),
+    })
+    return events.dropna().drop_duplicates(ignore_index=True)
+
+
+def forecast_aisle_load(events, mapping):
+    """Concurrent pickers per aisle and minute if SKUs sat in `mapping`'s slots.
+
+    Every historical visit is moved to the aisle of the SKU's slot in the
+    candidate mapping (a Series of slot_id indexed by sku_id); visits to SKUs
+    without a slot are dropped. Returns aisle, minute, pickers.
+    """
+    aisle = events['sku_id'].map(mapping.astype(str).str.split('-').str[0].where(mapping.notna()))
+    load = (
+        events.assign(aisle=aisle)
+        .dropna(subset=['aisle'])
+        .groupby(['aisle', 'minute'], sort=False)['picker_id']
+        .nunique()
+    )
+    return load.rename('pickers').reset_index()
+
+
+class CongestionTracker:
+    """Per-minute picker concurrency in one restricted space, updated as SKUs are placed.
+
+    Visits are encoded once as (minute, picker) pairs. The tracker keeps how
+    many placed SKUs each pair visits and how many distinct pickers each
+    minute holds, so placing a SKU only touches that SKU's own visits.
+    """
+
+    def __init__(self, events, max_pickers=2):
+        self.max_pickers = max_pickers
+
+        minute_code, minutes = pd.factorize(events['minute'])
+        picker_code, pickers = pd.factorize(events['picker_id'])
+        pair_code, pairs = pd.factorize(minute_code.astype(np.int64) * max(len(pickers), 1) + picker_code)
+        self._pair_minute = pairs // max(len(pickers), 1)
+        self._pair_count = np.zeros(len(pairs), dtype=np.int32)
+        self.pickers = np.zeros(len(minutes), dtype=np.int32)
+
+        # Each SKU's pair codes as one contiguous slice
+        sku_code, skus = pd.factorize(events['sku_id'])
+        order = np.argsort(sku_code, kind='stable')
+        bounds = np.searchsorted(sku_code[order], np.arange(len(skus) + 1))
+        self._sku_pairs = {
+            sku: pair_code[order[start:stop]]
+            for sku, start, stop in zip(skus, bounds[:-1], bounds[1:])
+        }
+
+    def with_limit(self, max_pickers):
+        """An empty tracker over the same visits (encoded once) for another space."""
+        tracker = copy.copy(self)
+        tracker.max_pickers = max_pickers
+        tracker._pair_count = np.zeros_like(self._pair_count)
+        tracker.pickers = np.zeros_like(self.pickers)
+        return tracker
+
+    def _new_pickers(self, sku_id):
+        # Minutes (with repeats) that would gain a picker if sku_id were placed
+        pairs = self._sku_pairs.get(sku_id)
+        if pairs is None:
+            return pairs, None
+        return pairs, self._pair_minute[pairs[self._pair_count[pairs] == 0]]
+
+    def excess(self, sku_id):
+        """Extra picker-minutes above the limit that placing sku_id would cause."""
+        _, minutes = self._new_pickers(sku_id)
+        if minutes is None or not len(minutes):
+            return 0
+        minutes, added = np.unique(minutes, return_counts=True)
+        before = self.pickers[minutes]
+        return int((np.maximum(before + added - self.max_pickers, 0)
+                    - np.maximum(before - self.max_pickers, 0)).sum())
+
+    def add(self, sku_id):
+        """Place sku_id in a forklift zone."""
+        pairs, minutes = self._new_pickers(sku_id)
+        if pairs is None:
+            return
+        np.add.at(self.pickers, minutes, 1)
+        self._pair_count[pairs] += 1
+
+    @property
+    def blocked_minutes(self):
+        return int((self.pickers > self.max_pickers).sum())
@@ -4,8 +4,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import os
 from datetime import datetime
 
+from aggregate_cube import load_cube, picker_summary
+from data_cache import fingerprint, load_tables
+from dead_zones import blocked_time, capacity_rules, evaluate_rules, minute_profile, safe_windows
+from move_scheduler import concurrency_profile, free_slots, schedule_moves, sequence_moves
+from move_selection import build_candidate_moves, select_moves
+from order_replay import compare_plans
+from slot_costs import DEFAULT_LAYOUT, load_layout, slot_costs
+from velocity import update_decayed_velocity
+
 # Page configuration
 st.set_page_config(
     page_title="VelocityMart Operations Dashboard",
@@ -112,51 +122,42 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# Data loading with caching
-@st.cache_data
-def load_data():
-    """Load and CLEAN all datasets with forensic corrections"""
+# Data loading with caching. Every table and metric below is its own cached
+# building block, computed the first time a page asks for it, so a page only
+# pays for (and keeps in memory) what it actually shows. Blocks are keyed on
+# data_version, a cheap fingerprint of the source files, so Streamlit never
+# hashes a DataFrame to find a cache entry. Tables and the cube are read-only
+# resources shared by every session: never modify them in place.
+@st.cache_resource(max_entries=4)
+def load_data(name, data_version):
+    """Load one CLEANED dataset ('sku', 'orders', 'warehouse' or 'picker') from the shared forensics cache"""
     try:
-        sku_df = pd.read_csv('sku_master.csv')
-        orders_df = pd.read_csv('order_transactions.csv')
-        warehouse_df = pd.read_csv('warehouse_constraints.csv')
-        picker_df = pd.read_csv('picker_movement.csv')
-
-        # --- DATA FORENSICS CLEANING ---
-        
-        # 1. Fix Decimal Drift (Weights recorded 10x higher)
-        sku_df['raw_weight_kg'] = sku_df['weight_kg'] # Keep for forensics
-        weight_threshold = 50
-        sku_df.loc[sku_df['weight_kg'] > weight_threshold, 'weight_kg'] = \
-            sku_df.loc[sku_df['weight_kg'] > weight_threshold, 'weight_kg'] / 10
-        
-        # 2. Flag Shortcut Paradox (Picker 07)
-        picker_df['is_suspect'] = picker_df['picker_id'] == 'PICKER-07'
-
-        # Convert timestamps
-        orders_df['order_timestamp'] = pd.to_datetime(orders_df['order_timestamp'])
-        picker_df['order_timestamp'] = pd.to_datetime(picker_df['order_timestamp'])
-        picker_df['movement_timestamp'] = pd.to_datetime(picker_df['movement_timestamp'])
-
-        # Add time features
-        orders_df['hour'] = orders_df['order_timestamp'].dt.hour
-        orders_df['date'] = orders_df['order_timestamp'].dt.date
-        orders_df['week'] = orders_df['order_timestamp'].dt.isocalendar().week
-        orders_df['day_name'] = orders_df['order_timestamp'].dt.day_name()
-
-        picker_df['hour'] = picker_df['movement_timestamp'].dt.hour
-        picker_df['date'] = picker_df['movement_timestamp'].dt.date
-
-        return sku_df, orders_df, warehouse_df, picker_df
+        # Forensic corrections (decimal drift, PICKER-07 flag), parsed timestamps
+        # and time features are built once by data_cache and memory-mapped here
+        df = load_tables([name])[name]
     except Exception as e:
         st.error(f"Error loading and cleaning data: {e}")
         st.stop()
 
-@st.cache_data
-def calculate_metrics(sku_df, orders_df, warehouse_df, picker_df):
-    """Calculate all dashboard metrics"""
+    if name == 'sku':
+        # Dashboard convention: weight_kg is the corrected weight, raw kept for forensics
+        df = df.rename(columns={'weight_kg': 'raw_weight_kg', 'clean_weight_kg': 'weight_kg'})
+    return df
 
-    # 1. Temperature violations
+@st.cache_resource(max_entries=1)
+def load_dashboard_cube(data_version):
+    """Load the persisted aggregate cube: small pre-grouped frames the pages slice"""
+    try:
+        return load_cube()
+    except Exception as e:
+        st.error(f"Error loading the aggregate cube: {e}")
+        st.stop()
+
+@st.cache_data(max_entries=2)
+def sku_locations(data_version):
+    """SKUs joined to their current slot, with the temperature-violation flag"""
+    sku_df = load_data('sku', data_version)
+    warehouse_df = load_data('warehouse', data_version)
     sku_with_warehouse = sku_df.merge(
         warehouse_df[['slot_id', 'temp_zone', 'zone', 'aisle_id', 'max_weight_kg']],
         left_on='current_slot',
@@ -164,34 +165,46 @@ def calculate_metrics(sku_df, orders_df, warehouse_df, picker_df):
         how='left'
     )
     sku_with_warehouse['temp_violation'] = (
-        sku_with_warehouse['temp_req'] != sku_with_warehouse['temp_zone']
+        sku_with_warehouse['temp_req'].astype(str) != sku_with_warehouse['temp_zone'].astype(str)
     )
-
-    # 2. Picker statistics
-    picker_df['travel_time_minutes'] = (
-        (picker_df['movement_timestamp'] - picker_df['order_timestamp']).dt.total_seconds() / 60
+    return sku_with_warehouse
+
+@st.cache_data(max_entries=10)
+def sku_velocity(data_version, half_life_days=None):
+    """Order count per SKU, all-time or time-decayed with a half-life, busiest first"""
+    orders_df = load_data('orders', data_version)
+    if half_life_days:
+        sku_frequency = update_decayed_velocity(None, orders_df[['sku_id', 'order_timestamp']], half_life_days)
+        sku_frequency['order_count'] = sku_frequency['order_count'].round(1)
+    else:
+        sku_frequency = orders_df['sku_id'].value_counts().reset_index()
+        sku_frequency.columns = ['sku_id', 'order_count']
+    return sku_frequency
+
+@st.cache_data(max_entries=2)
+def capacity_timeline(data_version, layout):
+    """Exact picker occupancy of every aisle capacity rule's spaces over the full history"""
+    sku_df = load_data('sku', data_version)
+    return evaluate_rules(
+        load_data('picker', data_version), sku_df.set_index('sku_id')['current_slot'], load_data('warehouse', data_version),
+        layout
     )
-    picker_df['speed_m_per_min'] = picker_df['travel_distance_m'] / picker_df['travel_time_minutes'].replace(0, np.nan)
 
-    # 3. Aisle congestion
-    picker_with_location = picker_df.merge(
-        sku_df[['sku_id', 'current_slot']], 
-        on='sku_id', 
-        how='left'
-    )
-    picker_with_location['aisle'] = picker_with_location['current_slot'].str.split('-').str[0]
-
-    # 4. SKU frequency
-    sku_frequency = orders_df['sku_id'].value_counts().reset_index()
-    sku_frequency.columns = ['sku_id', 'order_count']
-
-    return sku_with_warehouse, picker_df, picker_with_location, sku_frequency
-
-# Load data
-sku_df, orders_df, warehouse_df, picker_df = load_data()
-sku_with_warehouse, picker_df_enhanced, picker_with_location, sku_frequency = calculate_metrics(
-    sku_df, orders_df, warehouse_df, picker_df
-)
+@st.cache_data(max_entries=2)
+def move_profile(data_version, layout):
+    """Per-minute picker profile of every capacity rule space, for timing floor moves"""
+    return concurrency_profile(capacity_timeline(data_version, layout))
+
+# Load the small tables every page uses; the order and picker logs are loaded
+# only by the pages that need them. Picker statistics and aisle congestion
+# come pre-aggregated from the cube.
+data_version = fingerprint()
+# Site capacity rules (restricted aisles and their picker limits) from an optional layout.json
+layout = load_layout('layout.json') if os.path.exists('layout.json') else DEFAULT_LAYOUT
+sku_df = load_data('sku', data_version)
+warehouse_df = load_data('warehouse', data_version)
+cube = load_dashboard_cube(data_version)
+totals = cube['totals'].iloc[0]
 
 # Sidebar navigation
 st.sidebar.title("Navigation")
@@ -204,8 +217,8 @@ page = st.sidebar.radio(
 st.sidebar.markdown("---")
 st.sidebar.markdown("### Key Performance Indicators")
 st.sidebar.metric("Total SKUs", f"{len(sku_df):,}")
-st.sidebar.metric("Total Orders", f"{len(orders_df):,}")
-st.sidebar.metric("Pickers", len(picker_df['picker_id'].unique()))
+st.sidebar.metric("Total Orders", f"{totals['lines']:,}")
+st.sidebar.metric("Pickers", int(totals['pickers']))
 st.sidebar.metric("Warehouse Slots", f"{len(warehouse_df):,}")
 
 # ============================================================================
@@ -216,6 +229,13 @@ st.sidebar.markdown("### Sensitivity Analysis")
 demand_stress = st.sidebar.slider("Stress Test: Demand Spike %", 0, 50, 0, 5, help="Simulate order volume increase")
 stress_factor = 1 + (demand_stress / 100)
 
+VELOCITY_HALF_LIVES = {"All history (no decay)": None, "1 week": 7, "4 weeks": 28, "13 weeks": 91, "26 weeks": 182}
+velocity_model = st.sidebar.selectbox(
+    "Velocity Half-Life", list(VELOCITY_HALF_LIVES), index=0,
+    help="Weight recent orders more: an order one half-life old counts half"
+)
+half_life_days = VELOCITY_HALF_LIVES[velocity_model]
+
 # ============================================================================
 # PAGE 1: OVERVIEW
 # ============================================================================
@@ -230,6 +250,7 @@ if page == "Executive Summary":
     col1, col2, col3, col4, col5 = st.columns(5)
 
     # Calculate metrics
+    sku_with_warehouse = sku_locations(data_version)
     total_violations = len(sku_with_warehouse[sku_with_warehouse['temp_violation'] == True])
     violation_rate = (total_violations / len(sku_df)) * 100
     critical_violations = len(sku_with_warehouse[
@@ -240,12 +261,14 @@ if page == "Executive Summary":
     
     # Dynamic Chaos Impact
     # Model: Congestion delays grow exponentially with volume (Power Law)
-    base_pick_time = picker_df_enhanced['travel_time_minutes'].mean()
+    picker_day = cube['picker_day']
+    base_pick_time = picker_day['time_sum'].sum() / picker_day['time_n'].sum()
     projected_pick_time = base_pick_time * (stress_factor ** 1.5)
     
     # Calculate daily average for peak hour to represent realistic congestion
-    total_days = orders_df['date'].nunique()
-    peak_hour_orders_total = orders_df[orders_df['hour'] == 19].shape[0]
+    order_hour = cube['order_hour']
+    total_days = order_hour['date'].nunique()
+    peak_hour_orders_total = order_hour.loc[order_hour['hour'] == 19, 'lines'].sum()
     peak_hour_volume = int((peak_hour_orders_total / max(1, total_days)) * stress_factor)
 
     with col1:
@@ -386,7 +409,7 @@ if page == "Executive Summary":
 
     with col1:
         st.markdown("### Hourly Order Distribution")
-        hourly_orders = orders_df.groupby('hour').size().reset_index(name='count')
+        hourly_orders = order_hour.groupby('hour')['lines'].sum().reset_index(name='count')
 
         fig_hourly = px.bar(
             hourly_orders,
@@ -443,7 +466,7 @@ if page == "Executive Summary":
     st.markdown("---")
     st.markdown("### Top 10 High-Velocity SKUs")
 
-    top_skus = sku_frequency.head(10).merge(sku_df[['sku_id', 'category', 'temp_req']], on='sku_id')
+    top_skus = sku_velocity(data_version, half_life_days).head(10).merge(sku_df[['sku_id', 'category', 'temp_req']], on='sku_id')
 
     fig_top_skus = px.bar(
         top_skus,
@@ -556,12 +579,10 @@ elif page == "Forensic Data Analysis":
         """)
         
         # Calculate picker statistics
-        picker_stats = picker_df_enhanced.groupby('picker_id').agg({
-            'travel_distance_m': ['mean', 'std', 'count', 'min', 'max'],
-            'travel_time_minutes': ['mean']
-        }).round(2)
-        picker_stats.columns = ['avg_distance', 'std_distance', 'total_picks', 'min_dist', 'max_dist', 'avg_time']
-        picker_stats = picker_stats.reset_index()
+        picker_stats = picker_summary(cube['picker_day'])[[
+            'picker_id', 'distance_mean', 'distance_std', 'picks', 'distance_min', 'distance_max', 'time_mean'
+        ]].round(2)
+        picker_stats.columns = ['picker_id', 'avg_distance', 'std_distance', 'total_picks', 'min_dist', 'max_dist', 'avg_time']
         
         # Identify PICKER-07 as anomaly
         overall_mean = picker_stats[picker_stats['picker_id'] != 'PICKER-07']['avg_distance'].mean()
@@ -607,12 +628,21 @@ elif page == "Forensic Data Analysis":
         with col2:
             st.markdown("### Distance Distribution: PICKER-07 vs Others")
             # Create comparison histograms
-            p7_distances = picker_df_enhanced[picker_df_enhanced['picker_id'] == 'PICKER-07']['travel_distance_m']
-            others_distances = picker_df_enhanced[picker_df_enhanced['picker_id'] != 'PICKER-07']['travel_distance_m']
+            # Weighted by pick counts from the cube instead of one bar input per pick
+            picker_distance = cube['picker_distance']
+            is_p7 = picker_distance['picker_id'] == 'PICKER-07'
+            p7_distances = picker_distance[is_p7]
+            others_distances = picker_distance[~is_p7]
             
             fig_hist = go.Figure()
-            fig_hist.add_trace(go.Histogram(x=others_distances, name='Other Pickers', opacity=0.7, marker_color='#4dabf7'))
-            fig_hist.add_trace(go.Histogram(x=p7_distances, name='PICKER-07', opacity=0.7, marker_color='#ff6b6b'))
+            fig_hist.add_trace(go.Histogram(
+                x=others_distances['travel_distance_m'], y=others_distances['picks'], histfunc='sum',
+                name='Other Pickers', opacity=0.7, marker_color='#4dabf7'
+            ))
+            fig_hist.add_trace(go.Histogram(
+                x=p7_distances['travel_distance_m'], y=p7_distances['picks'], histfunc='sum',
+                name='PICKER-07', opacity=0.7, marker_color='#ff6b6b'
+            ))
             fig_hist.update_layout(
                 barmode='overlay',
                 title="PICKER-07 has impossibly SHORT distances",
@@ -652,6 +682,8 @@ elif page == "Forensic Data Analysis":
         - Verify temperature zone compliance
         """)
         
+        sku_with_warehouse = sku_locations(data_version)
+
         # Check for ghost bins
         valid_slots = set(warehouse_df['slot_id'].unique())
         sku_slots = set(sku_df['current_slot'].unique())
@@ -702,7 +734,7 @@ elif page == "Forensic Data Analysis":
         with col1:
             # Mismatch breakdown
             mismatch_counts = temp_violations.groupby(['temp_req', 'temp_zone']).size().reset_index(name='count')
-            mismatch_counts['mismatch'] = mismatch_counts['temp_req'] + ' → ' + mismatch_counts['temp_zone']
+            mismatch_counts['mismatch'] = mismatch_counts['temp_req'].astype(str) + ' → ' + mismatch_counts['temp_zone'].astype(str)
             
             fig_mismatch = px.bar(
                 mismatch_counts.sort_values('count', ascending=False),
@@ -764,7 +796,7 @@ elif page == "Optimization Strategy":
         
         # Merge for impactful analysis
         # Need: SKU -> Order Count (Velocity) -> Old Slot -> New Slot
-        impact_df = sku_df.merge(sku_frequency, on='sku_id', how='left')
+        impact_df = sku_df.merge(sku_velocity(data_version, half_life_days), on='sku_id', how='left')
         impact_df['order_count'] = impact_df['order_count'].fillna(0)
         
         impact_df = impact_df.merge(slotting_plan, left_on='sku_id', right_on='SKU_ID', how='left')
@@ -773,8 +805,12 @@ elif page == "Optimization Strategy":
         impact_df['is_move'] = impact_df['current_slot'] != impact_df['Bin_ID']
         moves_only = impact_df[impact_df['is_move'] == True].copy()
         
-        # Sort by Velocity (Highest Impact First)
-        top_50_moves = moves_only.sort_values('order_count', ascending=False).head(50)
+        # Pick the 50 moves with the highest velocity-weighted travel saving
+        # (a move into an occupied slot brings the occupant's move with it)
+        slot_cost = slot_costs(warehouse_df)
+        candidate_moves = build_candidate_moves(impact_df, slotting_plan, slot_cost)
+        phase_1_moves, phase_1_summary = select_moves(candidate_moves, budget=50)
+        top_50_moves = moves_only.set_index('sku_id').loc[phase_1_moves['sku_id']].reset_index()
         
         # Analysis of Top 50
         moves_from_aisle_b = top_50_moves[top_50_moves['current_slot'].str.startswith('B', na=False)]
@@ -784,8 +820,42 @@ elif page == "Optimization Strategy":
             st.metric("Top 50 Moves Impact", f"{top_50_moves['order_count'].sum():,.0f}", "Total Orders Affected")
         with col2:
             st.metric("Aisle B De-congestion", f"{len(moves_from_aisle_b)} SKUs", "High-velocity items moved OUT")
+        # Replay the order history against the current layout, the layout
+        # after the Phase 1 moves, and the full plan
+        current_mapping = sku_df.set_index('sku_id')['current_slot']
+        phase_1_mapping = current_mapping.astype(object)
+        phase_1_mapping.loc[phase_1_moves['sku_id']] = phase_1_moves['target_slot'].to_numpy()
+        replay = compare_plans(
+            load_data('orders', data_version)[['order_id', 'sku_id']],
+            {
+                'Current Layout': current_mapping,
+                'Phase 1 (Top 50)': phase_1_mapping,
+                'Full Plan': slotting_plan.set_index('SKU_ID')['Bin_ID'],
+            },
+            warehouse_df,
+        )
+        
         with col3:
-            st.metric("Est. Fulfillment Gain", "-12%", "Reduction in travel time")
+            # Mean simulated pick time per order before vs after the Phase 1 moves
+            baseline_time = replay.loc['Current Layout', 'avg_pick_time_min']
+            phase_1_time = replay.loc['Phase 1 (Top 50)', 'avg_pick_time_min']
+            fulfillment_gain = (phase_1_time / baseline_time - 1) * 100 if baseline_time else 0.0
+            st.metric("Est. Fulfillment Gain", f"{fulfillment_gain:.1f}%", "Reduction in travel time")
+        
+        st.caption(
+            f"Move selection: {phase_1_summary['selected']} of {phase_1_summary['candidates']} candidate moves, "
+            f"velocity-weighted saving {phase_1_summary['saving']:,.0f} "
+            f"(upper bound {phase_1_summary['upper_bound']:,.0f}, gap {phase_1_summary['gap_pct']:.1f}%)"
+        )
+        
+        st.markdown("### Order Replay: Current vs Planned Layouts")
+        replay_display = replay[['orders', 'lines', 'total_distance_km', 'avg_distance_m', 'avg_pick_time_min',
+                                 'unmapped_lines', 'total_pick_hours']]
+        replay_display.columns = ['Orders', 'Lines', 'Total Distance (km)', 'Avg Distance / Order (m)',
+                                  'Avg Pick Time / Order (min)', 'Dropped Lines (no slot)', 'Total Pick Hours']
+        st.dataframe(replay_display.style.format('{:,.1f}'), use_container_width=True)
+        st.caption("Averages are over orders with at least one line in a known slot; "
+                   "lines whose SKU has no slot (or a ghost slot) are dropped and counted separately.")
             
         st.markdown("---")
         
@@ -813,10 +883,24 @@ elif page == "Optimization Strategy":
         st.success("**Strategy:** We are prioritizing moving High-Velocity items from **Aisle B** (Congested) to **Aisle A** (Entry Point) and **Aisle C**.")
         
         st.markdown("### Top 50 Execution List")
-        st.markdown("Detailed itemized list for floor execution.")
+        st.markdown("Detailed itemized list for floor execution, in order: swap chains go through an empty buffer bin, "
+                    "and moves touching a restricted aisle (Aisle B forklift zone, layout capacity rules) start only "
+                    "in minutes that historically stay within its picker limit.")
+        
+        # Sequence the moves so every bin is empty when its new SKU arrives,
+        # then time them against the per-minute picker profile of every capacity rule space
+        phase_1_sequence = sequence_moves(
+            phase_1_moves.rename(columns={'current_slot': 'from_slot', 'target_slot': 'to_slot'})
+            .merge(sku_df[['sku_id', 'temp_req']], on='sku_id'),
+            free_slots(warehouse_df, sku_df, slotting_plan, layout),
+        )
+        phase_1_schedule = schedule_moves(
+            phase_1_sequence, move_profile(data_version, layout), warehouse_df, layout=layout
+        )
         
-        display_moves = top_50_moves[['sku_id', 'category', 'order_count', 'current_slot', 'Bin_ID', 'To_Aisle']].copy()
-        display_moves.columns = ['SKU', 'Category', 'Yearly Orders', 'Current Bin', 'NEW BIN', 'Target Aisle']
+        display_moves = phase_1_schedule.merge(top_50_moves[['sku_id', 'category', 'order_count']], on='sku_id', how='left')
+        display_moves = display_moves[['step', 'night', 'start', 'sku_id', 'category', 'order_count', 'from_slot', 'to_slot', 'kind', 'forklift']]
+        display_moves.columns = ['Step', 'Night', 'Start', 'SKU', 'Category', 'Yearly Orders', 'From Bin', 'NEW BIN', 'Move Type', 'Restricted Aisle']
         
         st.dataframe(
             display_moves.style.apply(lambda x: ['background-color: #d4edda' if col == 'NEW BIN' else '' for col in x.index], axis=1),
@@ -852,7 +936,7 @@ elif page == "Congestion Heatmap":
         selected_hour = st.selectbox("Hour", list(range(24)), index=19)
 
     # Calculate hourly aisle traffic
-    aisle_hour_traffic = picker_with_location.groupby(['aisle', 'hour']).size().reset_index(name='movements')
+    aisle_hour_traffic = cube['aisle_hour'].astype({'aisle': str})
 
     # Filter for selected hour
     hour_data = aisle_hour_traffic[aisle_hour_traffic['hour'] == selected_hour].copy()
@@ -893,6 +977,37 @@ elif page == "Congestion Heatmap":
 
     st.plotly_chart(fig_heatmap, use_container_width=True)
 
+    # Minute-level drill-down of the selected hour, sliced from the cube's aisle x minute counts
+    st.markdown(f"### Minute by Minute: Hour {selected_hour}:00")
+    aisle_minute = cube['aisle_minute']
+    minute_traffic = aisle_minute[aisle_minute['hour'] == selected_hour].astype({'aisle': str})
+    minute_traffic = minute_traffic[minute_traffic['aisle'].isin(top_aisles)]
+    minute_heatmap = minute_traffic.pivot_table(
+        index='aisle',
+        columns='minute',
+        values='movements',
+        aggfunc='sum',
+        fill_value=0
+    ).reindex(columns=range(60), fill_value=0)
+
+    fig_minutes = px.imshow(
+        minute_heatmap,
+        labels=dict(x="Minute of Hour", y="Aisle", color="Movements"),
+        x=minute_heatmap.columns,
+        y=minute_heatmap.index,
+        color_continuous_scale='Reds',
+        aspect="auto"
+    )
+
+    fig_minutes.update_layout(
+        title=f"Top 30 Busiest Aisles - Movements per Minute at {selected_hour}:00 (all days)",
+        height=700,
+        xaxis_title="Minute of Hour",
+        yaxis_title="Aisle ID"
+    )
+
+    st.plotly_chart(fig_minutes, use_container_width=True)
+
     st.markdown("---")
 
     # Aisle B specific analysis
@@ -937,35 +1052,52 @@ elif page == "Congestion Heatmap":
         fig_aisle_b.update_layout(height=400)
         st.plotly_chart(fig_aisle_b, use_container_width=True)
 
-        st.warning("**Forklift Constraint:** Max 2 pickers allowed in Aisle B")
+        rules = capacity_rules(layout)
+        st.warning("**Capacity Rules:** " + "; ".join(
+            f"{rule['name']}: max {rule['max_pickers']} pickers per {rule['per']}" for rule in rules
+        ))
         
         # --- FORKLIFT DEAD-ZONE CALCULATION (THE TWIST) ---
         st.markdown("### Forklift Dead-zone Analysis")
-        st.info("Analysis of minutes where Forklift is BLOCKED (Pickers > 2)")
-        
-        # 1. Filter for Aisle B movements
-        aisle_b_movements = picker_with_location[
-            (picker_with_location['aisle'].str.startswith('B', na=False)) & 
-            (picker_with_location['hour'] == selected_hour)
-        ].copy()
-        
-        if not aisle_b_movements.empty:
-            # 2. Group by minute to find concurrent pickers
-            aisle_b_movements['minute'] = aisle_b_movements['movement_timestamp'].dt.minute
-            minute_counts = aisle_b_movements.groupby('minute')['picker_id'].nunique().reset_index(name='picker_count')
+        st.info("Exact picker occupancy, day by day over the full history: an area is BLOCKED while more pickers are inside than its rule allows")
+        
+        # 1. Exact occupancy timeline: one sweep over every picker's stay, for all rules
+        timeline = capacity_timeline(data_version, layout)
+        rule_order = [rule['name'] for rule in rules]
+        areas = sorted(
+            set(zip(timeline['rule'], timeline['space'])),
+            key=lambda area: (rule_order.index(area[0]), len(area[1]) > 1, area[1])
+        )
+        
+        if areas:
+            rule_name, area = st.selectbox(
+                "Area", areas,
+                format_func=lambda area: f"{area[0]}: " + (f"Zone {area[1]}" if len(area[1]) == 1 else f"Aisle {area[1]}")
+            )
+            area_timeline = timeline[(timeline['rule'] == rule_name) & (timeline['space'] == area)]
+            max_pickers = int(area_timeline['max_pickers'].iloc[0])
+            
+            # 2. Default to the worst day for the selected hour
+            days = blocked_time(area_timeline, max_pickers)
+            hour_days = blocked_time(area_timeline[area_timeline['hour'] == selected_hour], max_pickers)
+            dates = sorted(days['date'])
+            worst_day = hour_days['date'].iloc[0] if len(hour_days) else days['date'].iloc[0]
+            day = st.selectbox("Day", dates, index=dates.index(worst_day), format_func=lambda d: f"{d:%Y-%m-%d (%a)}")
+            
+            minute_counts = minute_profile(area_timeline, area, day, selected_hour, max_pickers)
+            minute_counts = minute_counts.rename(columns={'pickers': 'picker_count'})
             
             # 3. Identify Blocked vs Safe windows
-            minute_counts['status'] = minute_counts['picker_count'].apply(lambda x: 'BLOCKED' if x > 2 else 'SAFE')
-            minute_counts['color'] = minute_counts['picker_count'].apply(lambda x: 'red' if x > 2 else 'green')
+            minute_counts['status'] = minute_counts['picker_count'].apply(lambda x: 'BLOCKED' if x > max_pickers else 'SAFE')
             
-            # Metrics
-            blocked_minutes = len(minute_counts[minute_counts['picker_count'] > 2])
+            # Metrics (exact time above the limit, not whole minute buckets)
+            blocked_minutes = minute_counts['blocked_s'].sum() / 60
             total_minutes = 60
             percent_blocked = (blocked_minutes / total_minutes) * 100
             
             m1, m2, m3 = st.columns(3)
-            m1.metric("Blocked Minutes", f"{blocked_minutes} min", f"{percent_blocked:.1f}% of hour")
-            m2.metric("Safe Restock Windows", f"{total_minutes - blocked_minutes} min", "Available duration")
+            m1.metric("Blocked Minutes", f"{blocked_minutes:.1f} min", f"{percent_blocked:.1f}% of hour")
+            m2.metric("Safe Restock Windows", f"{total_minutes - blocked_minutes:.1f} min", "Available duration")
             m3.metric("Forklift Efficiency", f"{100-percent_blocked:.1f}%", "Capacity utilization")
             
             # Timeline Visualization
@@ -975,17 +1107,15 @@ elif page == "Congestion Heatmap":
                 y='picker_count',
                 color='status',
                 color_discrete_map={'BLOCKED': '#ff4b4b', 'SAFE': '#28a745'},
-                title=f"Forklift Access Timeline (Hour {selected_hour}:00)",
-                labels={'minute': 'Minute of Hour', 'picker_count': 'Concurrent Pickers'},
-                text='picker_count'
+                title=f"Forklift Access Timeline ({day:%Y-%m-%d}, Hour {selected_hour}:00)",
+                labels={'minute': 'Minute of Hour', 'picker_count': 'Peak Concurrent Pickers'},
             )
             
             # Add threshold line
-            fig_deadzone.add_hline(y=2.5, line_dash="dash", line_color="orange", annotation_text="Max Capacity (2)")
+            fig_deadzone.add_hline(y=max_pickers + 0.5, line_dash="dash", line_color="orange", annotation_text=f"Max Capacity ({max_pickers})")
             
-            fig_deadzone.update_traces(textposition='outside')
             fig_deadzone.update_layout(
-                xaxis=dict(tickmode='linear', tick0=0, dtick=5, range=[0, 60]),
+                xaxis=dict(tickmode='linear', tick0=0, dtick=5, range=[-0.5, 59.5]),
                 yaxis=dict(range=[0, max(minute_counts['picker_count'].max()*1.2, 5)]),
                 height=350,
                 showlegend=True
@@ -994,10 +1124,51 @@ elif page == "Congestion Heatmap":
             st.plotly_chart(fig_deadzone, use_container_width=True)
             
             if percent_blocked > 50:
-                st.error(f"**CRITICAL BOTTLENECK:** Aisle B is inaccessible for {blocked_minutes} minutes during this hour! Restocking is impossible.")
+                st.error(f"**CRITICAL BOTTLENECK:** {area} is inaccessible for {blocked_minutes:.0f} minutes during this hour! Restocking is impossible.")
+            elif not minute_counts['picker_count'].any():
+                st.success(f"No pickers in {area} during this hour. Forklift has full access.")
+            
+            # 4. Safe restock windows of the selected day (at least 15 minutes)
+            windows = safe_windows(area_timeline[area_timeline['date'] == day], max_pickers, min_minutes=15)
+            windows_display = pd.DataFrame({
+                'From': windows['start'].dt.strftime('%H:%M'),
+                'To': (windows['end'] - pd.Timedelta(seconds=1)).dt.strftime('%H:%M'),
+                'Minutes': windows['minutes'].round(1),
+            })
+            st.markdown(f"**Safe restock windows on {day:%Y-%m-%d}** (15 min or longer)")
+            st.dataframe(windows_display, use_container_width=True, hide_index=True, height=200)
+            
+            # 5. Full history: when the forklift is blocked, and the worst days
+            st.markdown("### Dead-zones Across the Full History")
+            blocked_days = days[days['blocked_min'] > 0]
+            h1, h2 = st.columns(2)
+            h1.metric("Blocked Days", f"{len(blocked_days)} of {len(days)}", "Days with pickers present", delta_color="off")
+            h2.metric("Total Blocked Time", f"{blocked_days['blocked_min'].sum():.1f} min", f"Worst day {blocked_days['blocked_min'].max() if len(blocked_days) else 0:.1f} min", delta_color="off")
+            
+            by_hour = blocked_time(area_timeline, max_pickers, per='hour').sort_values('hour')
+            fig_blocked_hours = px.bar(
+                by_hour,
+                x='hour',
+                y='blocked_min',
+                title=f"{area}: Blocked Minutes by Hour of Day (all days)",
+                labels={'hour': 'Hour', 'blocked_min': 'Blocked Minutes'},
+                color_discrete_sequence=['#ff4b4b']
+            )
+            fig_blocked_hours.update_layout(height=300)
+            st.plotly_chart(fig_blocked_hours, use_container_width=True)
+            
+            worst_days = blocked_days.head(10)
+            st.dataframe(
+                pd.DataFrame({
+                    'Day': worst_days['date'].dt.strftime('%Y-%m-%d (%a)'),
+                    'Blocked Minutes': worst_days['blocked_min'].round(1),
+                    'Peak Pickers': worst_days['peak_pickers'],
+                }),
+                use_container_width=True, hide_index=True
+            )
             
         else:
-            st.success("No congestion in Aisle B during this hour. Forklift has full access.")
+            st.success("No picker ever entered a capacity-restricted aisle. Forklift has full access.")
 
     with col2:
         st.markdown(f"### Top 10 Aisles at {selected_hour}:00")
@@ -1037,6 +1208,7 @@ elif page == "Cold Chain Compliance":
     st.title("Temperature Zone Violations & Spoilage Analysis")
     st.markdown("### Critical Inventory Compliance Audit")
 
+    sku_with_warehouse = sku_locations(data_version)
     violations = sku_with_warehouse[sku_with_warehouse['temp_violation'] == True]
 
     # Key metrics
@@ -1067,7 +1239,7 @@ elif page == "Cold Chain Compliance":
         st.markdown("### Violations by Mismatch Type")
 
         violation_types = violations.groupby(['temp_req', 'temp_zone']).size().reset_index(name='count')
-        violation_types['mismatch'] = violation_types['temp_req'] + ' → ' + violation_types['temp_zone']
+        violation_types['mismatch'] = violation_types['temp_req'].astype(str) + ' → ' + violation_types['temp_zone'].astype(str)
         violation_types = violation_types.sort_values('count', ascending=False)
 
         fig_types = px.bar(
@@ -1220,14 +1392,12 @@ elif page == "Workforce Efficiency":
     st.markdown("### Efficiency Metrics & Anomaly Detection")
 
     # Calculate picker statistics
-    picker_stats = picker_df_enhanced.groupby('picker_id').agg({
-        'travel_distance_m': ['mean', 'std', 'count'],
-        'travel_time_minutes': ['mean', 'std'],
-        'speed_m_per_min': ['mean', 'std']
-    }).round(2)
-
-    picker_stats.columns = ['_'.join(col).strip() for col in picker_stats.columns.values]
-    picker_stats = picker_stats.reset_index()
+    picker_stats = picker_summary(cube['picker_day']).rename(columns={
+        'distance_mean': 'travel_distance_m_mean', 'distance_std': 'travel_distance_m_std',
+        'picks': 'travel_distance_m_count',
+        'time_mean': 'travel_time_minutes_mean', 'time_std': 'travel_time_minutes_std',
+        'speed_mean': 'speed_m_per_min_mean', 'speed_std': 'speed_m_per_min_std',
+    }).drop(columns=['distance_min', 'distance_max']).round(2)
 
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -1413,11 +1583,11 @@ elif page == "Demand Analytics":
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        total_orders = len(orders_df)
+        total_orders = int(totals['lines'])
         st.metric("Total Orders", f"{total_orders:,}", "436K line items")
 
     with col2:
-        unique_orders = orders_df['order_id'].nunique()
+        unique_orders = int(totals['orders'])
         st.metric("Unique Orders", f"{unique_orders:,}", "998 bulk orders")
 
     with col3:
@@ -1425,7 +1595,7 @@ elif page == "Demand Analytics":
         st.metric("Avg Items/Order", f"{avg_items:.0f}", "437 items")
 
     with col4:
-        weeks = orders_df['week'].nunique()
+        weeks = int(totals['weeks'])
         st.metric("Analysis Period", f"{weeks} weeks", "90 weeks")
 
     st.markdown("---")
@@ -1436,7 +1606,8 @@ elif page == "Demand Analytics":
     with col1:
         st.markdown("### 24-Hour Order Pattern")
 
-        hourly_orders = orders_df.groupby('hour').size().reset_index(name='count')
+        order_hour = cube['order_hour']
+        hourly_orders = order_hour.groupby('hour')['lines'].sum().reset_index(name='count')
 
         fig_hourly = px.area(
             hourly_orders,
@@ -1462,7 +1633,10 @@ elif page == "Demand Analytics":
     with col2:
         st.markdown("### Day of Week Pattern")
 
-        daily_orders = orders_df.groupby('day_name').size().reset_index(name='count')
+        daily_orders = (
+            order_hour.groupby(order_hour['date'].dt.day_name())['lines'].sum().rename_axis('day_name')
+            .reset_index(name='count')
+        )
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         daily_orders['day_name'] = pd.Categorical(daily_orders['day_name'], categories=day_order, ordered=True)
         daily_orders = daily_orders.sort_values('day_name')
@@ -1485,7 +1659,8 @@ elif page == "Demand Analytics":
     # Weekly trend
     st.markdown("### Weekly Order Volume Trend")
 
-    weekly_orders = orders_df.groupby('week').size().reset_index(name='count')
+    sku_week = cube['sku_week']
+    weekly_orders = sku_week.groupby('week')['lines'].sum().reset_index(name='count')
 
     fig_weekly = px.line(
         weekly_orders,
@@ -1518,7 +1693,7 @@ elif page == "Demand Analytics":
     with col1:
         st.markdown("### Top 20 High-Velocity SKUs")
 
-        top_20 = sku_frequency.head(20).merge(
+        top_20 = sku_velocity(data_version, half_life_days).head(20).merge(
             sku_df[['sku_id', 'category', 'temp_req']], 
             on='sku_id'
         )
@@ -1541,10 +1716,10 @@ elif page == "Demand Analytics":
     with col2:
         st.markdown("### Category Distribution")
 
-        category_orders = orders_df.merge(
-            sku_df[['sku_id', 'category']], 
-            on='sku_id'
-        )['category'].value_counts().reset_index()
+        category_orders = (
+            sku_week.astype({'sku_id': str}).merge(sku_df[['sku_id', 'category']], on='sku_id')
+            .groupby('category', observed=True)['lines'].sum().sort_values(ascending=False).reset_index()
+        )
         category_orders.columns = ['category', 'count']
 
         fig_cat = px.pie(
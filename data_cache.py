@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+# Bump whenever a cleaning rule below changes so every cached table is rebuilt
+CLEANING_VERSION = 2
+
+CACHE_DIR = '.forensics_cache'
+
+# Decimal Drift: weights above this are recorded 10x too high
+WEIGHT_THRESHOLD = 50
+
+# Rows per chunk when a source CSV is cleaned, so the raw strings of a large
+# log are never all in memory at once (same chunking as velocity.py)
+CHUNKSIZE = 500_000
+
+SOURCES = {
+    'sku': 'sku_master.csv',
+    'orders': 'order_transactions.csv',
+    'warehouse': 'warehouse_constraints.csv',
+    'picker': 'picker_movement.csv',
+}
+
+
+# ============================================================================
+# FORENSICS CLEANING (single source of truth for optimizer and dashboard)
+# ============================================================================
+
+def drift_corrected(weight_kg, threshold=WEIGHT_THRESHOLD):
+    """Weights with decimal drift undone: anything above threshold was recorded 10x too high."""
+    return weight_kg.mask(weight_kg > threshold, weight_kg / 10)
+
+
+def clean_sku(sku_df):
+    """Fix decimal drift (weight_kg stays raw, clean_weight_kg is corrected), make IDs categorical."""
+    sku_df['clean_weight_kg'] = drift_corrected(sku_df['weight_kg'])
+    for col in ['sku_id', 'category', 'temp_req', 'current_slot']:
+        sku_df[col] = sku_df[col].astype('category')
+    return sku_df
+
+
+def clean_orders(orders_df):
+    """Parse timestamps, derive time features, make IDs categorical."""
+    orders_df['order_timestamp'] = pd.to_datetime(orders_df['order_timestamp'])
+    orders_df['order_id'] = orders_df['order_id'].astype('category')
+    orders_df['sku_id'] = orders_df['sku_id'].astype('category')
+
+    orders_df['hour'] = orders_df['order_timestamp'].dt.hour
+    orders_df['date'] = orders_df['order_timestamp'].dt.normalize()
+    orders_df['week'] = orders_df['order_timestamp'].dt.isocalendar().week
+    orders_df['day_name'] = orders_df['order_timestamp'].dt.day_name().astype('category')
+    return orders_df
+
+
+def clean_warehouse(warehouse_df):
+    """Make slot, zone, aisle, shelf and temperature zone identifiers categorical."""
+    for col in ['slot_id', 'zone', 'aisle_id', 'shelf_level', 'temp_zone']:
+        warehouse_df[col] = warehouse_df[col].astype('category')
+    return warehouse_df
+
+
+def clean_picker(picker_df):
+    """Flag the Shortcut Paradox picker, parse timestamps, make IDs categorical."""
+    picker_df['is_suspect'] = picker_df['picker_id'] == 'PICKER-07'
+    picker_df['picker_id'] = picker_df['picker_id'].astype('category')
+    picker_df['sku_id'] = picker_df['sku_id'].astype('category')
+
+    picker_df['order_timestamp'] = pd.to_datetime(picker_df['order_timestamp'])
+    picker_df['movement_timestamp'] = pd.to_datetime(picker_df['movement_timestamp'])
+    picker_df['hour'] = picker_df['movement_timestamp'].dt.hour
+    picker_df['date'] = picker_df['movement_timestamp'].dt.normalize()
+    return picker_df
+
+
+CLEANERS = {
+    'sku': clean_sku,
+    'orders': clean_orders,
+    'warehouse': clean_warehouse,
+    'picker': clean_picker,
+}
+
+
+# ============================================================================
+# CACHE MANAGEMENT
+# ============================================================================
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_paths(data_dir):
+    cache_dir = os.path.join(data_dir, CACHE_DIR)
+    return cache_dir, os.path.join(cache_dir, 'manifest.json')
+
+
+def _read_manifest(data_dir):
+    _, manifest_path = _cache_paths(data_dir)
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(data_dir, manifest):
+    _, manifest_path = _cache_paths(data_dir)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _check_fresh(name, data_dir, manifest):
+    """True if the cached table matches its source CSV.
+
+    Size and mtime are checked first; only when they differ is the source
+    hashed, so touching a file without changing it does not force a rebuild.
+    """
+    entry = manifest.get(name)
+    cache_dir, _ = _cache_paths(data_dir)
+    if not entry or entry.get('version') != CLEANING_VERSION:
+        return False
+    if not os.path.exists(os.path.join(cache_dir, f'{name}.feather')):
+        return False
+
+    stat = os.stat(os.path.join(data_dir, SOURCES[name]))
+    if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+        return True
+    if stat.st_size != entry['size'] or _file_hash(os.path.join(data_dir, SOURCES[name])) != entry['sha1']:
+        return False
+
+    # Same content, new mtime: remember it so the next check is cheap again
+    entry['mtime_ns'] = stat.st_mtime_ns
+    _write_manifest(data_dir, manifest)
+    return True
+
+
+def is_fresh(name, data_dir='.'):
+    """True if `name` is cached and up to date with its source CSV."""
+    return _check_fresh(name, data_dir, _read_manifest(data_dir))
+
+
+def fingerprint(names=SOURCES, data_dir='.'):
+    """Cheap identity of the cleaned data: source sizes and mtimes plus CLEANING_VERSION.
+
+    Only stats the files, so it can be recomputed on every dashboard rerun
+    and used as a cache key instead of hashing the loaded tables.
+    """
+    parts = [f'v{CLEANING_VERSION}']
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(data_dir, SOURCES[name]))
+        except OSError:
+            parts.append(f'{name}:missing')
+        else:
+            parts.append(f'{name}:{stat.st_size}:{stat.st_mtime_ns}')
+    return '|'.join(parts)
+
+
+def _concat_chunks(chunks):
+    # Categorical columns get the sorted union of every chunk's categories,
+    # the same dtype one astype('category') over the whole file would give
+    for col in chunks[0].select_dtypes('category'):
+        categories = chunks[0][col].cat.categories.append(
+            [chunk[col].cat.categories for chunk in chunks[1:]]
+        ).unique().sort_values()
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def clean_csv(path, cleaner, chunksize=CHUNKSIZE):
+    """Read and clean a CSV one chunk at a time.
+
+    Each chunk is cleaned (timestamps parsed, IDs made categorical) before
+    the next is read, so peak memory is the cleaned table plus one raw
+    chunk, not the whole file as Python strings.
+    """
+    chunks = [cleaner(chunk) for chunk in pd.read_csv(path, chunksize=chunksize)]
+    return _concat_chunks(chunks) if chunks else cleaner(pd.read_csv(path))
+
+
+def build_table(name, data_dir='.'):
+    """Clean one source CSV and write it to the cache as uncompressed Feather."""
+    cache_dir, _ = _cache_paths(data_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    source = os.path.join(data_dir, SOURCES[name])
+    stat = os.stat(source)
+    sha1 = _file_hash(source)
+    df = clean_csv(source, CLEANERS[name])
+
+    # Uncompressed so the file can be memory-mapped instead of decoded
+    table_path = os.path.join(cache_dir, f'{name}.feather')
+    feather.write_feather(df, table_path + '.tmp', compression='uncompressed')
+    os.replace(table_path + '.tmp', table_path)
+
+    manifest = _read_manifest(data_dir)
+    manifest[name] = {
+        'source': SOURCES[name],
+        'version': CLEANING_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': sha1,
+        'rows': len(df),
+    }
+    _write_manifest(data_dir, manifest)
+    return df
+
+
+def read_table(name, columns=None, data_dir='.'):
+    """Memory-map a cached table (optionally only some columns) into pandas.
+
+    attrs['source'] names the table, its source hash and CLEANING_VERSION,
+    so derived results (e.g. slot_costs) can be cached on it without
+    hashing the data again.
+    """
+    cache_dir, _ = _cache_paths(data_dir)
+    table = feather.read_table(os.path.join(cache_dir, f'{name}.feather'), columns=columns, memory_map=True)
+    df = table.to_pandas()
+    entry = _read_manifest(data_dir).get(name, {})
+    df.attrs['source'] = f"{name}:{entry.get('sha1')}:v{entry.get('version')}"
+    return df
+
+
+def load_tables(names, data_dir='.'):
+    """Return cleaned tables by name, rebuilding any whose source changed."""
+    manifest = _read_manifest(data_dir)
+    tables = {}
+    for name in names:
+        if not _check_fresh(name, data_dir, manifest):
+            build_table(name, data_dir)
+            manifest = _read_manifest(data_dir)
+        tables[name] = read_table(name, data_dir=data_dir)
+    return tables
+
+
+def build_cache(data_dir='.'):
+    """Forensics build step: refresh the cache for every source CSV present."""
+    manifest = _read_manifest(data_dir)
+    for name, source in SOURCES.items():
+        if not os.path.exists(os.path.join(data_dir, source)):
+            print(f"   - {source}: not found, skipped")
+        elif _check_fresh(name, data_dir, manifest):
+            print(f"   - {source}: up to date")
+        else:
+            df = build_table(name, data_dir)
+            manifest = _read_manifest(data_dir)
+            print(f"   - {source}: cached {len(df):,} rows")
+
+
+if __name__ == "__main__":
+    print("🧹 Building forensics cache...")
+    build_cache()
+    print(f"✅ Cleaned tables written to {CACHE_DIR}/")
@@ -0,0 +1,305 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_cache import load_tables
+from slot_costs import DEFAULT_LAYOUT, load_layout
+
+HOUR_NS = 3600 * 10 ** 9
+MINUTE_NS = 60 * 10 ** 9
+
+
+def dwell_intervals(picker_df, mapping, layout=None):
+    """When each picker was in which aisle: picker_id, aisle, zone, start, end.
+
+    A logged movement puts the picker in the aisle of the SKU's slot in
+    `mapping` (slot_id by sku_id) from movement_timestamp for
+    layout['pick_dwell_s'] seconds. Movements of SKUs without a slot are dropped.
+    """
+    layout = layout or DEFAULT_LAYOUT
+    aisle = picker_df['sku_id'].astype(str).map(mapping.astype(str).str.split('-').str[0].where(mapping.notna()))
+    start = picker_df['movement_timestamp']
+    intervals = pd.DataFrame({
+        'picker_id': picker_df['picker_id'].astype(str).to_numpy(),
+        'aisle': aisle.to_numpy(),
+        'start': start.to_numpy(),
+        'end': (start + pd.Timedelta(seconds=layout['pick_dwell_s'])).to_numpy(),
+    }).dropna(subset=['aisle', 'start'])
+    intervals['zone'] = intervals['aisle'].str[0]
+    return intervals.reset_index(drop=True)
+
+
+def _picker_stays(space_code, picker_code, start, end):
+    # Union of each picker's overlapping (or touching) stays in a space, so
+    # nobody is counted twice: (space_code, start, end) of every stay
+    order = np.lexsort((start, picker_code, space_code))
+    group = (space_code.astype(np.int64) * (picker_code.max() + 1) + picker_code)[order]
+    start, end = start[order], end[order]
+    reach = pd.Series(end).groupby(group, sort=False).cummax().to_numpy()
+    opens = np.r_[True, (group[1:] != group[:-1]) | (start[1:] > reach[:-1])]
+    first = np.flatnonzero(opens)
+    return group[first] // (picker_code.max() + 1), start[first], np.maximum.reduceat(end, first)
+
+
+def occupancy(intervals, by='aisle'):
+    """Exact number of pickers in each `by` space (aisle or zone) over time.
+
+    One sort of the stay start/end events and a running sum gives the
+    piecewise-constant picker count of every space; a picker's overlapping
+    stays in one space count once. Returns the timeline as space, date,
+    hour, start, end, pickers rows (pickers > 0 only), split at the hour so
+    every row belongs to one day and hour.
+    """
+    if not len(intervals):
+        return pd.DataFrame({
+            'space': pd.Series(dtype=object), 'date': pd.Series(dtype='datetime64[ns]'),
+            'hour': pd.Series(dtype=np.int64), 'start': pd.Series(dtype='datetime64[ns]'),
+            'end': pd.Series(dtype='datetime64[ns]'), 'pickers': pd.Series(dtype=np.int64),
+        })
+    space_code, spaces = pd.factorize(intervals[by])
+    picker_code, _ = pd.factorize(intervals['picker_id'])
+    space, start, end = _picker_stays(
+        space_code, picker_code,
+        intervals['start'].to_numpy('datetime64[ns]').view(np.int64),
+        intervals['end'].to_numpy('datetime64[ns]').view(np.int64),
+    )
+
+    # Sweep: +1 at every arrival, -1 at every departure, sorted by space and
+    # time with departures first. Each space's events sum to zero, so one
+    # running sum over all spaces is the count within each space.
+    times = np.concatenate([start, end])
+    delta = np.r_[np.ones(len(start), dtype=np.int64), -np.ones(len(end), dtype=np.int64)]
+    where = np.r_[space, space]
+    order = np.lexsort((delta, times, where))
+    times, where = times[order], where[order]
+    pickers = np.cumsum(delta[order])
+
+    # The count after event i holds until event i + 1 of the same space;
+    # neighbouring pieces with the same count are joined
+    keep = np.flatnonzero((where[:-1] == where[1:]) & (times[1:] > times[:-1]) & (pickers[:-1] > 0))
+    seg_space, seg_start, seg_end, seg_pickers = where[keep], times[keep], times[keep + 1], pickers[keep]
+    joins = np.r_[True, (seg_space[1:] != seg_space[:-1]) | (seg_pickers[1:] != seg_pickers[:-1])
+                  | (seg_start[1:] != seg_end[:-1])]
+    first = np.flatnonzero(joins)
+    last = np.r_[first[1:], len(joins)] - 1
+    seg_space, seg_start, seg_end, seg_pickers = seg_space[first], seg_start[first], seg_end[last], seg_pickers[first]
+
+    # Split at every hour boundary the piece crosses
+    pieces = (seg_end - 1) // HOUR_NS - seg_start // HOUR_NS + 1
+    row = np.repeat(np.arange(len(seg_start)), pieces)
+    hour_start = (seg_start // HOUR_NS)[row] + np.arange(len(row)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    piece_start = np.maximum(seg_start[row], hour_start * HOUR_NS)
+    piece_end = np.minimum(seg_end[row], (hour_start + 1) * HOUR_NS)
+
+    return pd.DataFrame({
+        'space': pd.Categorical.from_codes(seg_space[row], spaces),
+        'date': (hour_start // 24 * 24 * HOUR_NS).view('datetime64[ns]'),
+        'hour': hour_start % 24,
+        'start': piece_start.view('datetime64[ns]'),
+        'end': piece_end.view('datetime64[ns]'),
+        'pickers': seg_pickers[row],
+    }, copy=False)
+
+
+def _space_keys(timeline):
+    # evaluate_rules() timelines name a space within its rule
+    return ['rule', 'space'] if 'rule' in timeline else ['space']
+
+
+def blocked_time(timeline, max_pickers=None, per='date'):
+    """Minutes with more than max_pickers pickers, and the peak count, per space and `per`.
+
+    max_pickers defaults to the timeline's own max_pickers column (see
+    evaluate_rules()). `per` is any timeline column or list of them
+    ('date', 'hour', ['date', 'hour']). Sorted worst first; periods in which
+    a space saw no picker at all are not listed.
+    """
+    per = [per] if isinstance(per, str) else list(per)
+    max_pickers = timeline['max_pickers'] if max_pickers is None else max_pickers
+    minutes = (timeline['end'] - timeline['start']).dt.total_seconds() / 60
+    summary = (
+        timeline.assign(blocked_min=minutes.where(timeline['pickers'] > max_pickers, 0.0))
+        .groupby(_space_keys(timeline) + per, observed=True)
+        .agg(blocked_min=('blocked_min', 'sum'), peak_pickers=('pickers', 'max'))
+        .reset_index()
+    )
+    return summary.sort_values(['blocked_min', 'peak_pickers'], ascending=False, ignore_index=True)
+
+
+def safe_windows(timeline, max_pickers=None, min_minutes=0):
+    """Restock windows: stretches of a day with at most max_pickers pickers in the space.
+
+    max_pickers defaults to the timeline's own max_pickers column. Listed
+    for every day the space saw a picker (any other day is safe
+    throughout); windows shorter than min_minutes are dropped. Returns the
+    space columns, date, start, end, minutes.
+    """
+    keys = _space_keys(timeline) + ['date']
+    columns = keys + ['start', 'end', 'minutes']
+    if not len(timeline):
+        return pd.DataFrame(columns=columns)
+    max_pickers = timeline['max_pickers'] if max_pickers is None else max_pickers
+    days = timeline[keys].drop_duplicates()
+    blocked = timeline.loc[timeline['pickers'] > max_pickers, keys + ['start', 'end']]
+    blocked = blocked.sort_values(keys + ['start'])
+
+    # A window opens at midnight or where a blocked stretch ends, and closes
+    # at the next blocked stretch or at the end of the day
+    same_day = (blocked[keys] == blocked[keys].shift()).all(axis=1).to_numpy()
+    last_of_day = np.r_[~same_day[1:], True] if len(blocked) else np.zeros(0, dtype=bool)
+    before = blocked[keys].assign(
+        start=np.where(same_day, blocked['end'].shift().to_numpy(), blocked['date'].to_numpy()),
+        end=blocked['start'].to_numpy(),
+    )
+    after = blocked.loc[last_of_day, keys].assign(
+        start=blocked['end'].to_numpy()[last_of_day],
+        end=blocked['date'].to_numpy()[last_of_day] + pd.Timedelta(days=1),
+    )
+    clear = days.merge(blocked[keys].drop_duplicates(), how='left', indicator=True)
+    clear = clear.loc[clear['_merge'] == 'left_only', keys]
+    whole = clear.assign(start=clear['date'], end=clear['date'] + pd.Timedelta(days=1))
+
+    windows = pd.concat([before, after, whole], ignore_index=True)
+    windows['start'] = pd.to_datetime(windows['start'])
+    windows['end'] = pd.to_datetime(windows['end'])
+    windows['minutes'] = (windows['end'] - windows['start']).dt.total_seconds() / 60
+    windows = windows[(windows['minutes'] > 0) & (windows['minutes'] >= min_minutes)]
+    return windows.sort_values(keys[:-1] + ['start'], ignore_index=True)[columns]
+
+
+def minute_spans(start, end):
+    """Every minute each [start, end) piece touches (ns after its origin): row and minute arrays."""
+    first, last = start // MINUTE_NS, (end - 1) // MINUTE_NS
+    span = last - first + 1
+    row = np.repeat(np.arange(len(start)), span)
+    return row, first[row] + np.arange(len(row)) - np.repeat(np.cumsum(span) - span, span)
+
+
+def minute_profile(timeline, space, date, hour=None, max_pickers=None):
+    """Peak pickers in each minute of one space's day (or one hour of it) for charts.
+
+    Returns minute (of the day, or of the hour), pickers and, when
+    max_pickers is given, blocked_s: seconds of that minute above the limit.
+    """
+    date = pd.Timestamp(date).normalize()
+    rows = timeline[(timeline['space'] == space) & (timeline['date'] == date)]
+    origin = date.value
+    length = 60 * 24
+    if hour is not None:
+        rows = rows[rows['hour'] == hour]
+        origin += hour * HOUR_NS
+        length = 60
+
+    start = rows['start'].to_numpy('datetime64[ns]').view(np.int64) - origin
+    end = rows['end'].to_numpy('datetime64[ns]').view(np.int64) - origin
+    row, minute = minute_spans(start, end)
+
+    pickers = np.zeros(length, dtype=np.int64)
+    np.maximum.at(pickers, minute, rows['pickers'].to_numpy()[row])
+    profile = pd.DataFrame({'minute': np.arange(length), 'pickers': pickers})
+    if max_pickers is not None:
+        overlap = (np.minimum(end[row], (minute + 1) * MINUTE_NS) - np.maximum(start[row], minute * MINUTE_NS)) / 1e9
+        blocked_s = np.zeros(length)
+        np.add.at(blocked_s, minute, np.where(rows['pickers'].to_numpy()[row] > max_pickers, overlap, 0.0))
+        profile['blocked_s'] = blocked_s
+    return profile
+
+
+def capacity_rules(layout=None):
+    """The layout's capacity rules, the forklift rule (forklift_zones, forklift_max_pickers) first.
+
+    A rule allows at most max_pickers pickers at once in each of its
+    spaces. Its aisles are the ones matching every selector it gives:
+    'zones' (zone letters), 'aisles' (aisle ids) and 'max_width_m' (aisles
+    at most this wide). 'per' is 'aisle' (each aisle on its own, the
+    default) or 'zone' (all of a zone's matching aisles as one space).
+    """
+    layout = layout or DEFAULT_LAYOUT
+    forklift = {
+        'name': 'Forklift', 'zones': list(layout['forklift_zones']), 'per': 'zone',
+        'max_pickers': layout['forklift_max_pickers'],
+    }
+    rules = [forklift] + [{'per': 'aisle', **rule} for rule in layout.get('capacity_rules', [])]
+    names = [rule.get('name') for rule in rules]
+    for rule in rules:
+        if not rule.get('name') or names.count(rule['name']) > 1:
+            raise ValueError(f"Capacity rules need unique names, got {names}")
+        if rule['per'] not in ('aisle', 'zone'):
+            raise ValueError(f"Capacity rule {rule['name']!r}: per must be 'aisle' or 'zone', not {rule['per']!r}")
+        if 'max_pickers' not in rule:
+            raise ValueError(f"Capacity rule {rule['name']!r} has no max_pickers")
+    return rules
+
+
+def rule_spaces(aisle_width, layout=None):
+    """The capacity-rule spaces each aisle falls under.
+
+    `aisle_width` is aisle_width_m by aisle_id (NaN where unknown, which no
+    width rule matches); an aisle's zone is its first letter. Returns
+    aisle_id, rule, space, max_pickers with one row per aisle and rule it
+    falls under; the space is the aisle itself or, for per='zone' rules,
+    its zone.
+    """
+    aisle_id = pd.Index(aisle_width.index.astype(str))
+    zone = aisle_id.str[0]
+    width = aisle_width.to_numpy(dtype=float)
+    spaces = []
+    for rule in capacity_rules(layout):
+        match = np.ones(len(aisle_id), dtype=bool)
+        if 'zones' in rule:
+            match &= zone.isin(rule['zones'])
+        if 'aisles' in rule:
+            match &= aisle_id.isin(rule['aisles'])
+        if 'max_width_m' in rule:
+            match &= width <= rule['max_width_m']
+        spaces.append(pd.DataFrame({
+            'aisle_id': aisle_id[match],
+            'rule': rule['name'],
+            'space': (zone if rule['per'] == 'zone' else aisle_id)[match],
+            'max_pickers': rule['max_pickers'],
+        }))
+    return pd.concat(spaces, ignore_index=True)
+
+
+def evaluate_rules(picker_df, mapping, warehouse_df, layout=None):
+    """Exact occupancy of every capacity rule's spaces, all rules in one sweep.
+
+    Each dwell interval is repeated once per rule space its aisle falls
+    under and the lot goes through a single occupancy() pass. Returns the
+    occupancy() timeline with the rule and its max_pickers added, ready for
+    blocked_time() and safe_windows().
+    """
+    spaces = rule_spaces(warehouse_df.groupby('aisle_id', observed=True)['aisle_width_m'].min(), layout)
+    spaces['key'] = spaces.groupby(['rule', 'space'], sort=False).ngroup()
+    hits = dwell_intervals(picker_df, mapping, layout).merge(
+        spaces[['aisle_id', 'key']], left_on='aisle', right_on='aisle_id'
+    )
+    timeline = occupancy(hits, by='key')
+    rules = spaces.drop_duplicates('key').set_index('key')
+    key = timeline.pop('space').astype(np.int64)
+    timeline.insert(0, 'rule', rules['rule'].reindex(key).to_numpy())
+    timeline.insert(1, 'space', rules['space'].reindex(key).to_numpy())
+    timeline.insert(2, 'max_pickers', rules['max_pickers'].reindex(key).to_numpy())
+    return timeline
+
+
+if __name__ == "__main__":
+    # python dead_zones.py [layout.json]  -> worst days of every capacity rule space
+    layout = load_layout(sys.argv[1] if len(sys.argv) > 1 else None)
+    print("🚧 Sweeping picker occupancy against the aisle capacity rules...")
+    tables = load_tables(['sku', 'warehouse', 'picker'])
+    timeline = evaluate_rules(tables['picker'], tables['sku'].set_index('sku_id')['current_slot'], tables['warehouse'], layout)
+
+    days = blocked_time(timeline)
+    days.to_csv('dead_zone_days.csv', index=False)
+    for rule in capacity_rules(layout):
+        rule_days = days[days['rule'] == rule['name']]
+        blocked = rule_days[rule_days['blocked_min'] > 0]
+        print(f"   - {rule['name']} (max {rule['max_pickers']} pickers per {rule['per']}): "
+              f"{blocked['blocked_min'].sum():,.1f} blocked minutes on {len(blocked):,} space-days "
+              f"of {len(rule_days):,} active")
+        for _, day in blocked.head(5).iterrows():
+            print(f"       {day['space']} {day['date']:%Y-%m-%d}: {day['blocked_min']:.1f} min, "
+                  f"peak {day['peak_pickers']} pickers")
+    print("✅ dead_zone_days.csv generated successfully!")
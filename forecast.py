@@ -0,0 +1,133 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_cache import SOURCES, is_fresh, read_table
+from velocity import stream_order_counts
+
+FORECAST_METHODS = ('naive', 'seasonal', 'ewma', 'trend')
+WEEK = pd.Timedelta(days=7)
+MONDAY = np.datetime64('1970-01-05', 'ns')
+
+
+def _week_number(timestamps):
+    # Weeks since Monday 1970-01-05, so every number starts on a Monday
+    # (W-SUN periods, as in stream_order_counts)
+    return (np.asarray(timestamps, dtype='datetime64[ns]') - MONDAY) // np.timedelta64(7, 'D')
+
+
+def week_matrix(sku_ids, week_numbers, counts=None):
+    """SKU x week order-count matrix from parallel columns, in one bincount.
+
+    Every calendar week between the first and last one is a column, so
+    weeks without orders are zeros rather than missing. Returns
+    (sku index, week_start index, float matrix).
+    """
+    week_numbers = np.asarray(week_numbers, dtype=np.int64)
+    sku_ids = pd.Series(sku_ids)
+    if isinstance(sku_ids.dtype, pd.CategoricalDtype):
+        # Cached columns are already dictionary-encoded
+        sku_code, skus = sku_ids.cat.codes.to_numpy(), sku_ids.cat.categories
+    else:
+        sku_code, skus = pd.factorize(sku_ids, sort=True)
+    first = week_numbers.min() if len(week_numbers) else 0
+    n_weeks = int(week_numbers.max() - first) + 1 if len(week_numbers) else 0
+
+    # In place: at 10M+ order lines the temporaries dominate the run time
+    cells = sku_code.astype(np.int64)
+    cells *= n_weeks
+    cells += week_numbers
+    cells -= first
+    matrix = np.bincount(cells, weights=counts, minlength=len(skus) * n_weeks).reshape(len(skus), n_weeks)
+    weeks = pd.DatetimeIndex(MONDAY + np.arange(first, first + n_weeks) * np.timedelta64(7, 'D'), name='week_start')
+    return pd.Index(np.asarray(skus), name='sku_id'), weeks, matrix
+
+
+def load_week_matrix(data_dir='.', chunksize=500_000):
+    """week_matrix() of the store's order log.
+
+    From the forensics cache only sku_id (as category codes) and
+    order_timestamp are mapped in; otherwise the CSV is streamed into weekly
+    counts first, so the order log is never fully loaded.
+    """
+    if not is_fresh('orders', data_dir):
+        weekly = stream_order_counts(os.path.join(data_dir, SOURCES['orders']), chunksize=chunksize, by_week=True)['week']
+        return week_matrix(
+            weekly['sku_id'], _week_number(weekly['week_start']), weekly['order_count'].to_numpy(dtype=float)
+        )
+
+    orders = read_table('orders', columns=['sku_id', 'order_timestamp'], data_dir=data_dir)
+    orders = orders[orders['sku_id'].notna()]
+    return week_matrix(orders['sku_id'], _week_number(orders['order_timestamp']))
+
+
+def forecast_next_week(matrix, method='ewma', alpha=0.3, season=52, trend_weeks=8):
+    """Next week's orders for every SKU (row) at once.
+
+    'naive' repeats the last week, 'seasonal' the same week one season ago,
+    'ewma' is exponential smoothing with factor alpha (started at the first
+    week), and 'trend' extends a least-squares line through the last
+    trend_weeks weeks (never below zero). Each is one slice or one
+    matrix-vector product over the whole SKU x week matrix.
+    """
+    n_weeks = matrix.shape[1]
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Unknown forecast method {method!r}, expected one of {FORECAST_METHODS}")
+    if n_weeks == 0:
+        return np.zeros(len(matrix))
+
+    if method == 'naive':
+        return matrix[:, -1].astype(float)
+
+    if method == 'seasonal':
+        if n_weeks < season:
+            raise ValueError(f"Seasonal forecast needs {season} weeks of history, have {n_weeks}")
+        return matrix[:, n_weeks - season].astype(float)
+
+    if method == 'ewma':
+        # s_t = alpha * x_t + (1 - alpha) * s_(t-1), s_0 = x_0, unrolled into weights
+        weights = alpha * (1 - alpha) ** np.arange(n_weeks - 1, -1, -1, dtype=float)
+        weights[0] = (1 - alpha) ** (n_weeks - 1)
+        return matrix @ weights
+
+    # trend: the fitted line's value one week past the window
+    k = min(trend_weeks, n_weeks)
+    t = np.arange(k, dtype=float)
+    if k == 1:
+        return matrix[:, -1].astype(float)
+    centred = (t - t.mean()) / ((t - t.mean()) ** 2).sum()
+    recent = matrix[:, -k:]
+    level = recent.mean(axis=1)
+    slope = recent @ centred
+    return np.maximum(level + slope * (k - t.mean()), 0.0)
+
+
+def forecast_velocity(data_dir='.', method='ewma', **params):
+    """sku_velocity frame whose order_count is the forecast for the week after the data.
+
+    Highest forecast first; ties keep sku_id order. attrs hold the method and
+    the forecast week's start.
+    """
+    skus, weeks, matrix = load_week_matrix(data_dir)
+    forecast = forecast_next_week(matrix, method, **params)
+    order = np.argsort(-forecast, kind='stable')
+    velocity = pd.DataFrame({'sku_id': skus.to_numpy()[order], 'order_count': forecast[order]})
+    velocity.attrs = {
+        'forecast_method': method,
+        'forecast_week': weeks[-1] + WEEK if len(weeks) else None,
+        'history_weeks': len(weeks),
+    }
+    return velocity
+
+
+if __name__ == "__main__":
+    # python forecast.py [METHOD]  -> next_week_forecast.csv
+    method = sys.argv[1] if len(sys.argv) > 1 else 'ewma'
+    print(f"🔮 Forecasting next week's demand ({method})...")
+    velocity = forecast_velocity(method=method)
+    velocity.to_csv('next_week_forecast.csv', index=False)
+    print(f"✅ Week of {velocity.attrs['forecast_week']:%Y-%m-%d} "
+          f"({velocity.attrs['history_weeks']} weeks of history) -> next_week_forecast.csv")
+    print(velocity.head(10).to_string(index=False))
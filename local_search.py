@@ -0,0 +1,153 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from assignment_solver import pool_zone
+
+ZONES = ['Frozen', 'Refrigerated', 'Ambient']
+
+
+def _independent_moves(delta, *touched):
+    # Improving moves that share no SKU or slot with another improving move,
+    # so a whole batch can be applied at once without re-checking deltas.
+    # `touched` are id arrays in one shared id space (one per move end).
+    improving = np.flatnonzero(delta < -1e-9)
+    ids = np.concatenate([ids[improving] for ids in touched])
+    _, inverse, counts = np.unique(ids, return_inverse=True, return_counts=True)
+    return improving[(counts[inverse] == 1).reshape(len(touched), -1).all(axis=0)]
+
+
+def improve_plan(plan, sku_data, warehouse_df, time_budget_s=10.0, fixed=(), batch_size=4096, patience=50, seed=0):
+    """Anytime local search on a slotting plan: swaps, relocations and ejections.
+
+    The objective is the same velocity x slot_cost sum the greedy and
+    optimal passes use. Each move stays inside one temperature zone and
+    within both slots' weight limits, and its delta is O(1) from the SKUs'
+    velocities and the slot costs: (v_a - v_b) * (c_b - c_a) for a swap,
+    v_a * (c_free - c_a) for a relocation to a free slot, and
+    v_a * (c_b - c_a) + v_b * (c_free - c_b) for an ejection (a takes b's
+    slot, b moves to a free one). Moves are sampled and scored in
+    batches of batch_size with array operations; the improving ones that
+    touch distinct SKUs and slots are applied together.
+
+    Only improving moves are taken, so the current plan is always the best
+    feasible plan found so far and the search can stop at any point. It
+    stops when time_budget_s runs out or after `patience` batches without
+    an improvement. SKUs in `fixed` (e.g. fallbacks) and SKUs whose slot
+    is a ghost, in the wrong zone or too weak are left where they are.
+
+    Returns the improved plan (same SKU order) and a summary dict.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    # Slots grouped by temperature zone, so a zone is one contiguous range
+    slot_zone = pd.Categorical(warehouse_df['temp_zone'], categories=ZONES).codes
+    slot_order = np.argsort(slot_zone, kind='stable')
+    slot_zone = slot_zone[slot_order]
+    slot_ids = warehouse_df['slot_id'].to_numpy()[slot_order]
+    cost = warehouse_df['slot_cost'].to_numpy(dtype=float)[slot_order]
+    capacity = warehouse_df['max_weight_kg'].to_numpy(dtype=float)[slot_order]
+    capacity = np.where(np.isnan(capacity), np.inf, capacity)
+
+    skus = sku_data.set_index('sku_id').reindex(plan['SKU_ID'])
+    velocity = skus['order_count'].fillna(0).to_numpy(dtype=float)
+    weight = skus['clean_weight_kg'].fillna(0).to_numpy(dtype=float)
+    sku_zone = pd.Categorical(pool_zone(skus['temp_req'].to_numpy()), categories=ZONES).codes
+
+    position = pd.Index(slot_ids).get_indexer(plan['Bin_ID'])
+    occupant = np.full(len(slot_ids), -1)
+    occupant[position[position >= 0]] = np.flatnonzero(position >= 0)
+
+    safe_position = np.maximum(position, 0)
+    movable = (
+        (position >= 0)
+        & (slot_zone[safe_position] == sku_zone)
+        & (weight <= capacity[safe_position])
+        & ~plan['SKU_ID'].isin(list(fixed)).to_numpy()
+    )
+    movers = np.flatnonzero(movable)
+    movers = movers[np.argsort(sku_zone[movers], kind='stable')]
+    mover_start = np.searchsorted(sku_zone[movers], np.arange(len(ZONES) + 1))
+
+    cost_before = float((velocity[movers] * cost[position[movers]]).sum())
+    swaps = relocations = ejections = batches = idle = 0
+    while len(movers) and time.perf_counter() - started < time_budget_s and idle < patience:
+        batches += 1
+        applied = 0
+
+        # Swaps: two SKUs of the same zone trade slots
+        a = movers[rng.integers(len(movers), size=batch_size)]
+        zone = sku_zone[a]
+        b = movers[mover_start[zone] + (rng.random(batch_size) * (mover_start[zone + 1] - mover_start[zone])).astype(int)]
+        slot_a, slot_b = position[a], position[b]
+        delta = (velocity[a] - velocity[b]) * (cost[slot_b] - cost[slot_a])
+        delta[(weight[a] > capacity[slot_b]) | (weight[b] > capacity[slot_a]) | (a == b)] = 0
+        chosen = _independent_moves(delta, a, b)
+        if len(chosen):
+            a, b = a[chosen], b[chosen]
+            position[a], position[b] = slot_b[chosen], slot_a[chosen]
+            occupant[position[a]], occupant[position[b]] = a, b
+            swaps += len(chosen)
+            applied += len(chosen)
+
+        # Relocations: a SKU moves to a free slot of its zone
+        free = np.flatnonzero(occupant < 0)
+        free_start = np.searchsorted(slot_zone[free], np.arange(len(ZONES) + 1))
+        a = movers[rng.integers(len(movers), size=batch_size)]
+        zone = sku_zone[a]
+        free_count = free_start[zone + 1] - free_start[zone]
+        has_free = free_count > 0
+        a, zone, free_count = a[has_free], zone[has_free], free_count[has_free]
+        target = free[free_start[zone] + (rng.random(len(a)) * free_count).astype(int)]
+        delta = velocity[a] * (cost[target] - cost[position[a]])
+        delta[weight[a] > capacity[target]] = 0
+        # slot ids are shifted past the SKU ids so both share one id space
+        chosen = _independent_moves(delta, a, target + len(plan))
+        if len(chosen):
+            a, target = a[chosen], target[chosen]
+            occupant[position[a]] = -1
+            occupant[target] = a
+            position[a] = target
+            relocations += len(chosen)
+            applied += len(chosen)
+
+        # Ejections: a SKU takes another SKU's slot, which moves to a free slot
+        free = np.flatnonzero(occupant < 0)
+        free_start = np.searchsorted(slot_zone[free], np.arange(len(ZONES) + 1))
+        a = movers[rng.integers(len(movers), size=batch_size)]
+        zone = sku_zone[a]
+        b = movers[mover_start[zone] + (rng.random(batch_size) * (mover_start[zone + 1] - mover_start[zone])).astype(int)]
+        free_count = free_start[zone + 1] - free_start[zone]
+        has_free = free_count > 0
+        a, b, zone, free_count = a[has_free], b[has_free], zone[has_free], free_count[has_free]
+        target = free[free_start[zone] + (rng.random(len(a)) * free_count).astype(int)]
+        slot_a, slot_b = position[a], position[b]
+        delta = velocity[a] * (cost[slot_b] - cost[slot_a]) + velocity[b] * (cost[target] - cost[slot_b])
+        delta[(weight[a] > capacity[slot_b]) | (weight[b] > capacity[target]) | (a == b)] = 0
+        chosen = _independent_moves(delta, a, b, target + len(plan), slot_a + len(plan))
+        if len(chosen):
+            a, b, target = a[chosen], b[chosen], target[chosen]
+            occupant[slot_a[chosen]] = -1
+            position[a], position[b] = slot_b[chosen], target
+            occupant[position[a]], occupant[target] = a, b
+            ejections += len(chosen)
+            applied += len(chosen)
+
+        idle = 0 if applied else idle + 1
+
+    cost_after = float((velocity[movers] * cost[position[movers]]).sum())
+    improved = plan.copy()
+    improved.loc[movable, 'Bin_ID'] = slot_ids[position[movable]]
+    return improved, {
+        'swaps': swaps,
+        'relocations': relocations,
+        'ejections': ejections,
+        'batches': batches,
+        'seconds': round(time.perf_counter() - started, 3),
+        'cost_before': cost_before,
+        'cost_after': cost_after,
+        'improvement_pct': (1 - cost_after / cost_before) * 100 if cost_before > 0 else 0.0,
+        'converged': idle >= patience,
+    }
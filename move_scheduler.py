@@ -0,0 +1,300 @@
+import heapq
+import sys
+
+import numpy as np
+import pandas as pd
+
+from assignment_solver import pool_zone
+from data_cache import load_tables
+from dead_zones import MINUTE_NS, evaluate_rules, minute_spans, rule_spaces
+from slot_costs import load_layout
+
+MINUTES_PER_DAY = 1440
+
+
+def plan_diff(sku_df, plan):
+    """Moves a plan asks for: sku_id, from_slot, to_slot, temp_req (SKUs already in place dropped)."""
+    moves = sku_df[['sku_id', 'current_slot', 'temp_req']].merge(
+        plan.rename(columns={'SKU_ID': 'sku_id', 'Bin_ID': 'to_slot'}), on='sku_id', how='inner'
+    ).rename(columns={'current_slot': 'from_slot'})
+    moves = moves[moves['from_slot'] != moves['to_slot']]
+    return moves[['sku_id', 'from_slot', 'to_slot', 'temp_req']].reset_index(drop=True)
+
+
+def slot_spaces(warehouse_df, layout=None):
+    """The capacity-rule spaces each slot falls under: slot_id, rule, space (see dead_zones.rule_spaces)."""
+    spaces = rule_spaces(warehouse_df.groupby('aisle_id', observed=True)['aisle_width_m'].min(), layout)
+    slots = pd.DataFrame({
+        'slot_id': warehouse_df['slot_id'].astype(str).to_numpy(),
+        'aisle_id': warehouse_df['aisle_id'].astype(str).to_numpy(),
+    })
+    return slots.merge(spaces, on='aisle_id')[['slot_id', 'rule', 'space']]
+
+
+def free_slots(warehouse_df, sku_df, plan, layout=None):
+    """Slots nobody sits in now or after the plan (slot_id, temp_zone): the buffer candidates.
+
+    Slots outside every capacity-rule space come first, so buffer trips
+    stay out of the restricted aisles while there is room elsewhere.
+    """
+    used = set(sku_df['current_slot'].dropna().astype(str)) | set(plan['Bin_ID'].dropna().astype(str))
+    free = warehouse_df.loc[~warehouse_df['slot_id'].astype(str).isin(used), ['slot_id', 'temp_zone']]
+    restricted = free['slot_id'].astype(str).isin(slot_spaces(warehouse_df, layout)['slot_id']).to_numpy()
+    return free.iloc[np.argsort(restricted, kind='stable')].reset_index(drop=True)
+
+
+def _cycle_representatives(successor):
+    # One node per cycle of a functional graph (every node has a successor):
+    # pointer doubling walks every node onto its cycle, and the minimum over
+    # 2^k steps along the cycle names the cycle by its smallest member
+    land, minimum, jump = successor.copy(), np.arange(len(successor)), successor.copy()
+    for _ in range(max(int(np.ceil(np.log2(max(len(successor), 2)))), 1) + 1):
+        land = land[land]
+        minimum = np.minimum(minimum, minimum[jump])
+        jump = jump[jump]
+    return np.unique(minimum[land])
+
+
+def sequence_moves(moves, buffers=None):
+    """Order moves so that every SKU arrives in an empty slot.
+
+    A move waits until every SKU in its target slot has moved out; moves
+    that do not wait on each other form a wave. When only cycles are left
+    (A -> B -> A rotations), one SKU per cycle goes to a temporary buffer
+    slot first and finishes its move once the rest of the cycle has run.
+    Cycles are found for all stalled moves at once by pointer doubling, so
+    the whole sequence takes a handful of array passes per wave.
+
+    `moves` needs sku_id, from_slot, to_slot and temp_req. `buffers`
+    (slot_id, temp_zone) are the empty slots allowed as buffers, taken in
+    order (free_slots() lists the restricted aisles last); a SKU never
+    waits in another temperature zone, and when a zone runs out of buffers the SKU waits on a
+    STAGING-<zone> cart. SKUs that are not moving are assumed to be out of
+    the way (plan_validator reports double bookings).
+
+    Returns one row per step: step, wave, sku_id, from_slot, to_slot, kind
+    ('move', 'to_buffer' or 'from_buffer').
+    """
+    sku_ids = moves['sku_id'].to_numpy()
+    zone = pool_zone(moves['temp_req'].to_numpy())
+    if buffers is None:
+        buffers = pd.DataFrame({'slot_id': [], 'temp_zone': []})
+
+    slot_code, slots = pd.factorize(pd.Index(np.concatenate([
+        moves['from_slot'].astype(str).to_numpy(), moves['to_slot'].astype(str).to_numpy(),
+        buffers['slot_id'].astype(str).to_numpy(),
+    ])))
+    n = len(moves)
+    source, target = slot_code[:n].copy(), slot_code[n:2 * n]
+    buffer_code = {
+        name: slot_code[2 * n:][(buffers['temp_zone'] == name).to_numpy()]
+        for name in np.unique(zone)
+    }
+    occupants = np.bincount(source, minlength=len(slots))
+    remaining = np.ones(n, dtype=bool)
+    buffered = np.zeros(n, dtype=bool)
+    staging = {}
+
+    # Moves grouped by target slot, so a freed slot finds its waiting moves directly
+    by_target = np.argsort(target, kind='stable')
+    target_start = np.searchsorted(target[by_target], np.arange(len(slots) + 1))
+
+    def waiting_for(freed):
+        freed = freed[freed < len(slots) - len(staging)]
+        starts, counts = target_start[freed], target_start[freed + 1] - target_start[freed]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        waiting = by_target[np.repeat(starts, counts) + offsets]
+        return waiting[remaining[waiting]]
+
+    steps = []
+    wave = 0
+    candidates = np.arange(n)
+    while remaining.any():
+        idx = candidates[occupants[target[candidates]] == 0]
+        if len(idx):
+            steps.append((wave, idx, source[idx], target[idx], np.where(buffered[idx], 'from_buffer', 'move')))
+            remaining[idx] = False
+            np.subtract.at(occupants, source[idx], 1)
+            freed = np.unique(source[idx])
+        else:
+            # Only cycles (and chains waiting on them) are left: send one SKU
+            # per cycle to a buffer, which frees a slot in every cycle
+            idx = np.flatnonzero(remaining)
+            occupant_of = np.full(len(slots), -1)
+            occupant_of[source[idx]] = np.arange(len(idx))
+            cycles = idx[_cycle_representatives(occupant_of[target[idx]])]
+
+            to_buffer = np.empty(len(cycles), dtype=object)
+            for name in np.unique(zone[cycles]):
+                in_zone = np.flatnonzero(zone[cycles] == name)
+                empty = buffer_code[name][occupants[buffer_code[name]] == 0][:len(in_zone)]
+                if name not in staging:
+                    staging[name] = len(slots)
+                    slots = slots.append(pd.Index([f'STAGING-{name}']))
+                    occupants = np.append(occupants, 0)
+                to_buffer[in_zone] = np.append(empty, np.full(len(in_zone) - len(empty), staging[name]))
+            to_buffer = to_buffer.astype(int)
+
+            steps.append((wave, cycles, source[cycles], to_buffer, np.full(len(cycles), 'to_buffer')))
+            freed = np.unique(source[cycles])
+            np.subtract.at(occupants, source[cycles], 1)
+            np.add.at(occupants, to_buffer, 1)
+            source[cycles] = to_buffer
+            buffered[cycles] = True
+        candidates = np.unique(waiting_for(freed[occupants[freed] == 0]))
+        wave += 1
+
+    if not steps:
+        return pd.DataFrame(columns=['step', 'wave', 'sku_id', 'from_slot', 'to_slot', 'kind'])
+    # Steps are kept as code arrays per wave and named once at the end
+    wave_of = np.concatenate([np.full(len(step[1]), step[0]) for step in steps])
+    moved, from_code, to_code, kind = (np.concatenate(part) for part in list(zip(*steps))[1:])
+    return pd.DataFrame({
+        'step': np.arange(1, len(moved) + 1), 'wave': wave_of, 'sku_id': sku_ids[moved],
+        'from_slot': slots[from_code], 'to_slot': slots[to_code], 'kind': kind,
+    })
+
+
+def concurrency_profile(timeline, quantile=0.9):
+    """Pickers in every capacity-rule space for each minute of the day.
+
+    `timeline` is the evaluate_rules() occupancy of the current layout. The
+    peak pickers of every space, day and minute (what minute_profile()
+    charts for one space-day) go into one grid in a single pass over the
+    timeline rows; every calendar day from the first to the last in the
+    timeline counts (quiet days as zero), and the `quantile` across days is
+    kept so a window is safe on most nights, not just on average. Returns
+    rule, space, max_pickers, minute and pickers, 1440 rows per space.
+    """
+    columns = ['rule', 'space', 'max_pickers', 'minute', 'pickers']
+    if not len(timeline):
+        return pd.DataFrame(columns=columns)
+    space = timeline.groupby(['rule', 'space'], sort=False).ngroup().to_numpy()
+    spaces = timeline.drop_duplicates(['rule', 'space'])
+    date = timeline['date'].to_numpy('datetime64[ns]').view(np.int64)
+    day = (date - date.min()) // (MINUTES_PER_DAY * MINUTE_NS)
+    row, minute = minute_spans(
+        timeline['start'].to_numpy('datetime64[ns]').view(np.int64) - date,
+        timeline['end'].to_numpy('datetime64[ns]').view(np.int64) - date,
+    )
+
+    grid = np.zeros((len(spaces), day.max() + 1, MINUTES_PER_DAY), dtype=np.int32)
+    cell = np.ravel_multi_index((space[row], day[row], minute), grid.shape)
+    np.maximum.at(grid.reshape(-1), cell, timeline['pickers'].to_numpy(dtype=np.int32)[row])
+    return pd.DataFrame({
+        'rule': np.repeat(spaces['rule'].to_numpy(), MINUTES_PER_DAY),
+        'space': np.repeat(spaces['space'].to_numpy(), MINUTES_PER_DAY),
+        'max_pickers': np.repeat(spaces['max_pickers'].to_numpy(), MINUTES_PER_DAY),
+        'minute': np.tile(np.arange(MINUTES_PER_DAY), len(spaces)),
+        'pickers': np.concatenate([np.quantile(days, quantile, axis=0) for days in grid]),
+    })
+
+
+def _next_window(safe, length):
+    # Earliest start >= m (m within a day) of `length` safe minutes in a row,
+    # over a repeating day; windows may run past midnight
+    tiled = np.tile(safe, 3).astype(int)
+    window = np.convolve(tiled, np.ones(length, dtype=int), mode='valid')[:2 * MINUTES_PER_DAY] == length
+    start = np.where(window, np.arange(len(window)), np.iinfo(np.int64).max)
+    return np.minimum.accumulate(start[::-1])[::-1][:MINUTES_PER_DAY]
+
+
+def _clock(minutes):
+    # HH:MM of minutes after midnight (any day)
+    minutes = minutes % MINUTES_PER_DAY
+    return (minutes // 60).astype(str).str.zfill(2) + ':' + (minutes % 60).astype(str).str.zfill(2)
+
+
+def schedule_moves(sequence, profile, warehouse_df, minutes_per_move=5, crews=1, start='22:00', shift_hours=8,
+                   layout=None):
+    """Minute-level start times for a move sequence, restricted-aisle moves in safe windows only.
+
+    Moves run in a nightly shift of shift_hours from `start`, and a move
+    whose from or to slot (buffers included) lies in a capacity-rule space
+    (dead_zones.rule_spaces, e.g. the forklift zone) only in minutes where
+    the concurrency_profile() of every such space is within its max_pickers.
+    Moves go to the crew that is free first, no earlier than the SKUs in
+    their target slot have left and the SKU itself has arrived (buffer
+    trips), so the sequence order is kept wherever it matters.
+
+    Adds crew, forklift (the move touches a capacity-rule space), start_min
+    and end_min (minutes after midnight of the first night's day) plus
+    readable night / start / end columns.
+    """
+    hours, minutes = (int(part) for part in start.split(':'))
+    shift_start = hours * 60 + minutes
+    in_shift = (np.arange(MINUTES_PER_DAY) - shift_start) % MINUTES_PER_DAY < shift_hours * 60
+    # Spaces without any picker history are always safe
+    safe = {
+        key: rows.sort_values('minute')['pickers'].to_numpy() <= rows['max_pickers'].iloc[0]
+        for key, rows in profile.groupby(['rule', 'space'], sort=False)
+    }
+
+    # The rule spaces each move touches, one window table per distinct set
+    spaces = slot_spaces(warehouse_df, layout)
+    touched = pd.concat([
+        pd.DataFrame({'move': np.arange(len(sequence)), 'slot_id': sequence[column].astype(str).to_numpy()})
+        for column in ('from_slot', 'to_slot')
+    ]).merge(spaces, on='slot_id').drop_duplicates(['move', 'rule', 'space']).sort_values(['move', 'rule', 'space'])
+    space_set = [()] * len(sequence)
+    for move, rule, space in zip(touched['move'], touched['rule'], touched['space']):
+        space_set[move] += ((rule, space),)
+
+    next_window = {}
+    for keys in set(space_set):
+        allowed = in_shift.copy()
+        for key in keys:
+            allowed &= safe.get(key, True)
+        next_window[keys] = _next_window(allowed, minutes_per_move)
+        if next_window[keys].min() >= 2 * MINUTES_PER_DAY:
+            where = ', '.join(f"{rule} {space}" for rule, space in keys)
+            raise ValueError(f"No {minutes_per_move}-minute window in a {shift_hours}h shift"
+                             + (f" that is safe for {where}" if keys else ""))
+
+    crew_free = [(shift_start, crew) for crew in range(crews)]
+    slot_free, sku_ready = {}, {}
+    crew_of, start_at = np.empty(len(sequence), dtype=int), np.empty(len(sequence), dtype=int)
+    for i, (sku, source, target) in enumerate(zip(sequence['sku_id'], sequence['from_slot'], sequence['to_slot'])):
+        free_at, crew = heapq.heappop(crew_free)
+        at = max(free_at, slot_free.get(target, 0), sku_ready.get(sku, 0))
+        day, minute = divmod(at, MINUTES_PER_DAY)
+        at = day * MINUTES_PER_DAY + int(next_window[space_set[i]][minute])
+        end = at + minutes_per_move
+        heapq.heappush(crew_free, (end, crew))
+        slot_free[source] = max(slot_free.get(source, 0), end)
+        sku_ready[sku] = end
+        crew_of[i], start_at[i] = crew + 1, at
+
+    forklift = np.array([len(keys) > 0 for keys in space_set], dtype=bool)
+    scheduled = sequence.assign(crew=crew_of, forklift=forklift, start_min=start_at, end_min=start_at + minutes_per_move)
+    return scheduled.assign(
+        night=(scheduled['start_min'] - shift_start) // MINUTES_PER_DAY + 1,
+        start=_clock(scheduled['start_min']),
+        end=_clock(scheduled['end_min']),
+    )
+
+
+if __name__ == "__main__":
+    # python move_scheduler.py [plan.csv] [CREWS] [layout.json]
+    path = sys.argv[1] if len(sys.argv) > 1 else 'final_slotting_plan.csv'
+    crews = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    layout = load_layout(sys.argv[3] if len(sys.argv) > 3 else None)
+    print(f"🗓️ Scheduling the moves of {path} for {crews} crew(s)...")
+    tables = load_tables(['sku', 'warehouse', 'picker'])
+    plan = pd.read_csv(path)
+    sequence = sequence_moves(plan_diff(tables['sku'], plan), free_slots(tables['warehouse'], tables['sku'], plan, layout))
+    profile = concurrency_profile(evaluate_rules(
+        tables['picker'], tables['sku'].set_index('sku_id')['current_slot'], tables['warehouse'], layout
+    ))
+    schedule = schedule_moves(sequence, profile, tables['warehouse'], crews=crews, layout=layout)
+    schedule.to_csv('move_schedule.csv', index=False)
+
+    print(f"   - {len(schedule):,} steps in {schedule['wave'].nunique() if len(schedule) else 0} waves, "
+          f"{(schedule['kind'] == 'to_buffer').sum():,} buffer trips, {schedule['forklift'].sum():,} restricted-aisle moves")
+    safe = profile.assign(safe=profile['pickers'] <= profile['max_pickers']).groupby(['rule', 'space'], sort=False)['safe'].sum()
+    for rule, minutes in safe.groupby(level='rule', sort=False):
+        print(f"   - {rule}: {int(minutes.min()):,} safe minutes per day in its tightest of {len(minutes)} space(s)")
+    if len(schedule):
+        last = schedule.loc[schedule['end_min'].idxmax()]
+        print(f"   - Done on night {last['night']} at {last['end']}")
+    print("✅ move_schedule.csv generated successfully!")
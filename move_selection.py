@@ -0,0 +1,255 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+
+def build_candidate_moves(sku_data, plan, slot_cost, minutes_per_move=5.0):
+    """Turn a slotting plan into candidate moves with a velocity-weighted saving.
+
+    `sku_data` needs sku_id, current_slot and order_count, `plan` is a
+    SKU_ID/Bin_ID frame and `slot_cost` is a Series of travel cost indexed by
+    slot_id. A SKU sitting in a bin missing from `slot_cost` (ghost bin) is
+    charged the worst slot cost, so moving it out is always worth something.
+    """
+    moves = sku_data[['sku_id', 'current_slot', 'order_count']].merge(
+        plan.rename(columns={'SKU_ID': 'sku_id', 'Bin_ID': 'target_slot'}),
+        on='sku_id',
+        how='inner'
+    )
+    moves = moves[moves['current_slot'] != moves['target_slot']].reset_index(drop=True)
+
+    worst_cost = slot_cost.max()
+    current_cost = moves['current_slot'].astype(str).map(slot_cost).fillna(worst_cost)
+    target_cost = moves['target_slot'].map(slot_cost).fillna(worst_cost)
+
+    moves['saving'] = moves['order_count'] * (current_cost - target_cost)
+    moves['labor_minutes'] = minutes_per_move
+    return moves
+
+
+def _atomic_units(moves, relaxed=False):
+    """Group moves that can only be executed together.
+
+    A move into a slot waits for every SKU currently in that slot (the current
+    layout may double-book a bin). Rotations (cycles) and any group waiting
+    on more than one other group are merged until every unit waits on at
+    most one other unit.
+
+    With relaxed=True a move only waits on the first SKU in its target slot,
+    so only rotations are merged. That drops constraints, so its LP value is
+    an upper bound for the real problem.
+
+    Returns the unit id of each move and the prerequisite unit of each unit
+    (-1 when its target slots are free).
+    """
+    n = len(moves)
+    unit = list(range(n))
+
+    def find(i):
+        root = i
+        while unit[root] != root:
+            root = unit[root]
+        while unit[i] != root:
+            unit[i], i = root, unit[i]
+        return root
+
+    def union(i, j):
+        i, j = find(i), find(j)
+        if i != j:
+            unit[max(i, j)] = min(i, j)
+            return True
+        return False
+
+    occupants = pd.Series(np.arange(n)).groupby(moves['current_slot'].to_numpy()).agg(list)
+    waits_on = occupants.reindex(moves['target_slot'].to_numpy()).tolist()
+    waits_on = [occ if isinstance(occ, list) else [] for occ in waits_on]
+    if relaxed:
+        waits_on = [occ[:1] for occ in waits_on]
+
+    while True:
+        prerequisites = {}
+        for i, occupied_by in enumerate(waits_on):
+            u = find(i)
+            for occupant in occupied_by:
+                p = find(occupant)
+                if u != p:
+                    prerequisites.setdefault(u, set()).add(p)
+
+        changed = False
+        for u, parents in prerequisites.items():
+            if len(parents) > 1:
+                for p in parents:
+                    changed |= union(u, p)
+        if changed:
+            continue
+
+        # Every unit now waits on at most one unit: contract rotations
+        parent = {u: next(iter(parents)) for u, parents in prerequisites.items()}
+        state = {}
+        for start in parent:
+            path = []
+            node = start
+            while node in parent and node not in state:
+                state[node] = 1
+                path.append(node)
+                node = parent[node]
+            if state.get(node) == 1:
+                for member in path[path.index(node):]:
+                    changed |= union(member, node)
+            for member in path:
+                state[member] = 2
+        if not changed:
+            break
+
+    roots = [find(i) for i in range(n)]
+    return np.array(roots, dtype=np.int64), parent
+
+
+def _density_order(roots, unit_parent, saving, labor):
+    """Merge units into groups no denser than their prerequisite.
+
+    Returns the groups in non-increasing density order, the prerequisite
+    group of each, their members (prerequisite-first) and value/weight.
+    """
+    n = len(roots)
+    value = np.bincount(roots, weights=saving, minlength=n).tolist()
+    weight = np.bincount(roots, weights=labor, minlength=n).tolist()
+
+    members = {}
+    for i, root in enumerate(roots.tolist()):
+        members.setdefault(root, []).append(i)
+    prerequisite = {g: unit_parent.get(g, -1) for g in members}
+
+    # --- Union-find over units; each root is one group ---
+    group = list(range(n))
+
+    def find(i):
+        root = i
+        while group[root] != root:
+            root = group[root]
+        while group[i] != root:
+            group[i], i = root, group[i]
+        return root
+
+    # --- Merge groups that are denser than their prerequisite ---
+    version = dict.fromkeys(members, 0)
+    heap = [(-value[g] / weight[g], g, 0) for g in members]
+    heapq.heapify(heap)
+    finalized = []
+    is_final = set()
+
+    while heap:
+        _, g, ver = heapq.heappop(heap)
+        if g not in version or version[g] != ver:
+            continue
+        p = prerequisite[g]
+        if p != -1:
+            p = find(p)
+        if p != -1 and p not in is_final:
+            # g is the densest open group, so it is at least as dense as p
+            group[g] = p
+            value[p] += value[g]
+            weight[p] += weight[g]
+            members[p].extend(members.pop(g))
+            del version[g]
+            version[p] += 1
+            heapq.heappush(heap, (-value[p] / weight[p], p, version[p]))
+        else:
+            prerequisite[g] = p
+            is_final.add(g)
+            finalized.append(g)
+
+    return finalized, prerequisite, members, value, weight
+
+
+def select_moves(moves, budget, budget_unit='moves'):
+    """Pick the moves with the highest saving that fit a labor budget.
+
+    A move into an occupied slot needs the occupant's move too, so moves form
+    swap chains (trees pointing at the occupant) and rotations (cycles, which
+    are only executable as a whole). These are first collapsed into atomic
+    units, then any group denser (saving per labor unit) than the group it
+    depends on is merged into it. After that every group is no denser than
+    its prerequisite, and a greedy scan in density order that skips groups
+    which do not fit (or whose prerequisite was skipped) respects every
+    chain. Leftover budget is spent on the best executable prefix of a
+    skipped group.
+
+    `budget_unit` is 'moves' (each move costs 1) or 'minutes' (each move costs
+    its labor_minutes). Returns the selected moves, ordered by priority, and a
+    summary with the fractional (LP) upper bound on the achievable saving.
+    """
+    n = len(moves)
+    saving = moves['saving'].to_numpy(dtype=float)
+    if budget_unit == 'moves':
+        labor = np.ones(n)
+    elif budget_unit == 'minutes':
+        labor = moves['labor_minutes'].to_numpy(dtype=float)
+    else:
+        raise ValueError(f"Unknown budget unit: {budget_unit}")
+
+    roots, unit_parent = _atomic_units(moves)
+    unit = roots.tolist()
+    finalized, prerequisite, members, value, weight = _density_order(roots, unit_parent, saving, labor)
+
+    # --- Greedy fill in density order, skipping what does not fit ---
+    remaining = float(budget)
+    taken = set()
+    selected = []
+    for g in finalized:
+        p = prerequisite[g]
+        if value[g] <= 0 or weight[g] > remaining or (p != -1 and p not in taken):
+            continue
+        taken.add(g)
+        remaining -= weight[g]
+        selected.extend(members[g])
+
+    # --- Repair: spend leftover budget on the best executable prefix of a
+    # skipped group (members are listed prerequisite-first, so every prefix
+    # that does not split a rotation is a valid set of moves) ---
+    for g in finalized:
+        p = prerequisite[g]
+        if g in taken or value[g] <= 0 or (p != -1 and p not in taken):
+            continue
+        best_len, best_value = 0, 0.0
+        used = gained = 0.0
+        group_members = members[g]
+        for k, move in enumerate(group_members):
+            used += labor[move]
+            gained += saving[move]
+            if used > remaining:
+                break
+            at_boundary = k + 1 == len(group_members) or unit[group_members[k + 1]] != unit[move]
+            if at_boundary and gained > best_value:
+                best_len, best_value = k + 1, gained
+        if best_len:
+            selected.extend(group_members[:best_len])
+            remaining -= float(labor[group_members[:best_len]].sum())
+
+    # --- Fractional bound over the relaxed chains (same as above when no bin
+    # is double-booked and no unit waits on two others) ---
+    roots, unit_parent = _atomic_units(moves, relaxed=True)
+    finalized, _, _, value, weight = _density_order(roots, unit_parent, saving, labor)
+    bound = 0.0
+    capacity = float(budget)
+    for g in finalized:
+        if value[g] <= 0 or capacity <= 0:
+            break
+        share = min(1.0, capacity / weight[g])
+        bound += share * value[g]
+        capacity -= share * weight[g]
+
+    result = moves.iloc[selected].copy()
+    result['priority'] = np.arange(1, len(result) + 1)
+    achieved = float(saving[selected].sum())
+    summary = {
+        'candidates': n,
+        'selected': len(result),
+        'budget': float(budget),
+        'budget_used': float(budget) - remaining,
+        'saving': achieved,
+        'upper_bound': bound,
+        'gap_pct': (bound - achieved) / bound * 100 if bound > 0 else 0.0,
+    }
+    return result, summary
@@ -1,151 +1,621 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
-def optimize_slotting():
+from affinity import affinity_partners, load_affinity
+from assignment_solver import optimize_assignment, pool_zone
+from congestion import CongestionTracker, forecast_aisle_load, picker_events
+from dead_zones import blocked_time, capacity_rules, evaluate_rules, rule_spaces
+from data_cache import SOURCES, WEIGHT_THRESHOLD, drift_corrected, load_tables
+from forecast import forecast_velocity
+from local_search import improve_plan
+from move_selection import build_candidate_moves, select_moves
+from order_replay import load_order_lines, replay_orders
+from plan_validator import validate_plan, write_violations
+from run_report import RunReport
+from slot_costs import DEFAULT_LAYOUT, load_layout, slot_costs
+from slot_index import SlotIndex
+from velocity import load_velocity, save_velocity_state
+
+def score_slots(warehouse_df, layout=None):
+    """Attach each slot's expected pick cost and return slots best-first.
+
+    slot_cost (seconds per pick) comes from the slot_costs model: distance
+    from the entry, shelf level, aisle width and the Aisle B forklift penalty.
+    """
+    warehouse_df = warehouse_df.copy()
+    warehouse_df['slot_cost'] = slot_costs(warehouse_df, layout).to_numpy()
+    
+    # Sort slots: Best (cheapest) slots first, ties keep file order
+    return warehouse_df.sort_values('slot_cost', kind='stable')
+
+def assign_slots(sku_data, warehouse_df, events=None, taken=(), partners=None, layout=None, placed=None):
+    """Greedy match: each SKU, in velocity order, takes the best free slot it fits.
+
+    `sku_data` must be sorted by velocity and `warehouse_df` ranked by
+    score_slots(). With picker `events` the aisle capacity rules (see
+    dead_zones.capacity_rules()) are priced in, with affinity `partners`
+    (see affinity_partners()) co-ordered SKUs are pulled into the same
+    aisle (see optimize_slotting). `taken` holds
+    (n, slot_id) pairs for slots that stop being free once the first n SKUs
+    are placed. `placed` (slot_id by sku_id) holds SKUs that already sit
+    in slots outside warehouse_df: their picker visits and aisles count for
+    the capacity rules and affinity from the start. Capacity rules and
+    affinity settings come from `layout` (default: DEFAULT_LAYOUT).
+
+    Returns the SKU_ID/Bin_ID plan and the SKUs that found no slot and kept
+    their current one.
+    """
+    layout = layout or DEFAULT_LAYOUT
+    congestion = events is not None
+    slot_cost = warehouse_df.set_index('slot_id')['slot_cost']
+ 
+    # Capacity-rule spaces of each aisle; slots under no rule are unrestricted
+    restrictions = {}
+    if congestion:
+        tracker = CongestionTracker(events)
+        trackers = {}
+        aisle_width = warehouse_df.groupby('aisle_id', observed=True)['aisle_width_m'].min()
+        for aisle_id, spaces in rule_spaces(aisle_width, layout).groupby('aisle_id', sort=False):
+            restrictions[aisle_id] = tuple(zip(spaces['rule'], spaces['space'], spaces['max_pickers']))
+
+    def slot_restrictions(slot_id):
+        # Rule spaces a slot falls under (looked up by aisle, so kept slots outside this pool count too)
+        aisle_id = str(slot_id).split('-')[0]
+        if congestion and aisle_id not in restrictions:
+            spaces = rule_spaces(pd.Series([np.nan], index=[aisle_id]), layout)
+            restrictions[aisle_id] = tuple(zip(spaces['rule'], spaces['space'], spaces['max_pickers']))
+        return restrictions.get(aisle_id, ())
+
+    def space_tracker(rule, space, max_pickers):
+        if (rule, space) not in trackers:
+            trackers[(rule, space)] = tracker.with_limit(max_pickers)
+        return trackers[(rule, space)]
+
+    def congestion_penalty(sku_id, slot_id):
+        # Penalty for the extra picker-minutes above each rule's limit
+        excess = sum(space_tracker(*restriction).excess(sku_id) for restriction in slot_restrictions(slot_id))
+        return layout['congestion_penalty_s'] * excess
+
+    slot_restriction = warehouse_df['aisle_id'].astype(str).map(lambda aisle_id: restrictions.get(aisle_id, ()))
+    restricted = slot_restriction.map(len).to_numpy() > 0
+    
+    assignments = []
+    
+    # Index each temperature pool once: slots stay in ranking order and are
+    # searched by max_weight_kg, so a lookup never walks the pool row by row
+    # (in congestion mode the slots under capacity rules get indexes of their
+    # own, one per set of rule spaces)
+    pool_indexes = {
+        zone: SlotIndex(pool['slot_id'], pool['max_weight_kg'])
+        for zone, pool in [
+            ('Frozen', warehouse_df[(warehouse_df['temp_zone'] == 'Frozen') & ~restricted]),
+            ('Refrigerated', warehouse_df[(warehouse_df['temp_zone'] == 'Refrigerated') & ~restricted]),
+            ('Ambient', warehouse_df[(warehouse_df['temp_zone'] == 'Ambient') & ~restricted]),
+        ]
+    }
+    restricted_indexes = {zone: {} for zone in pool_indexes}
+    for (zone, spaces), pool in warehouse_df[restricted].groupby(['temp_zone', slot_restriction[restricted]], sort=False):
+        if zone in restricted_indexes:
+            restricted_indexes[zone][spaces] = SlotIndex(pool['slot_id'], pool['max_weight_kg'])
+    restricted_slot_indexes = [index for indexes in restricted_indexes.values() for index in indexes.values()]
+
+    # In affinity mode each aisle gets an index too, to find the best free
+    # slot next to a SKU's already placed partners
+    affinity = partners is not None
+    slot_aisle = dict(zip(warehouse_df['slot_id'], zip(warehouse_df['temp_zone'], warehouse_df['aisle_id'])))
+    aisle_indexes = {
+        aisle: SlotIndex(slots['slot_id'], slots['max_weight_kg'])
+        for aisle, slots in warehouse_df.groupby(['temp_zone', 'aisle_id'], sort=False)
+    } if affinity else {}
+    placed_aisle = {}
+
+    # Track used slots to prevent double-booking (across every pool, since a
+    # fallback keeps the SKU's current slot wherever that is)
+    def mark_used(slot_id):
+        for index in [*pool_indexes.values(), *restricted_slot_indexes]:
+            index.remove(slot_id)
+        if affinity and slot_aisle.get(slot_id) in aisle_indexes:
+            aisle_indexes[slot_aisle[slot_id]].remove(slot_id)
+
+    # SKUs placed before this pass (a weekly re-slot's unchanged SKUs)
+    aisle_key = {aisle_id: (zone, aisle_id) for zone, aisle_id in aisle_indexes}
+    for sku_id, slot_id in (placed.items() if placed is not None else ()):
+        placed_aisle[sku_id] = slot_aisle.get(slot_id) or aisle_key.get(str(slot_id).split('-')[0])
+        if congestion:
+            for restriction in slot_restrictions(slot_id):
+                space_tracker(*restriction).add(sku_id)
+
+    fallback_skus = []
+    taken = sorted(taken, key=lambda pair: pair[0])
+    next_taken = 0
+    
+    for position, (sku_id, temp_req, weight, current_slot, order_count) in enumerate(zip(
+        sku_data['sku_id'], sku_data['temp_req'], sku_data['clean_weight_kg'], sku_data['current_slot'],
+        sku_data['order_count']
+    )):
+        while next_taken < len(taken) and taken[next_taken][0] <= position:
+            mark_used(taken[next_taken][1])
+            next_taken += 1
+        
+        # Select relevant pool (HARD CONSTRAINT: Temperature, strict mapping)
+        if temp_req == 'Frozen':
+            temp_pool = 'Frozen'
+        elif temp_req == 'Refrigerated':
+            temp_pool = 'Refrigerated'
+        else:
+            temp_pool = 'Ambient'
+        pool = pool_indexes[temp_pool]
+            
+        # HARD CONSTRAINT: Max Weight
+        best_slot = pool.best_slot(weight)
+        
+        # SOFT CONSTRAINT: a capacity-restricted aisle (Aisle B, narrow
+        # aisles...) only if it still pays after the congestion penalty
+        if congestion:
+            best_cost = order_count * slot_cost[best_slot] if best_slot else np.inf
+            for index in restricted_indexes[temp_pool].values():
+                restricted_slot = index.best_slot(weight)
+                if restricted_slot:
+                    cost = order_count * slot_cost[restricted_slot] + congestion_penalty(sku_id, restricted_slot)
+                    if cost <= best_cost:
+                        best_slot, best_cost = restricted_slot, cost
+
+        # SOFT CONSTRAINT: share an aisle with co-ordered SKUs if the saved
+        # aisle visits outweigh the worse slot
+        if affinity and best_slot:
+            saving = {}
+            for partner, co_orders in partners.get(sku_id, ()):
+                if placed_aisle.get(partner) in aisle_indexes:
+                    aisle = placed_aisle[partner]
+                    saving[aisle] = saving.get(aisle, 0) + co_orders * layout['affinity_aisle_s']
+            if saving:
+                def placement_cost(slot):
+                    penalty = congestion_penalty(sku_id, slot) if congestion else 0
+                    return order_count * slot_cost[slot] + penalty - saving.get(slot_aisle[slot], 0)
+
+                best_cost = placement_cost(best_slot)
+                for aisle in saving:
+                    aisle_slot = aisle_indexes[aisle].best_slot(weight) if aisle[0] == temp_pool else None
+                    if aisle_slot and placement_cost(aisle_slot) < best_cost:
+                        best_slot, best_cost = aisle_slot, placement_cost(aisle_slot)
+        
+        if best_slot:
+            assignments.append({
+                'SKU_ID': sku_id,
+                'Bin_ID': best_slot
+            })
+            mark_used(best_slot)
+        else:
+            # Fallback: keep current if possible, or flag error
+            assignments.append({
+                'SKU_ID': sku_id,
+                'Bin_ID': current_slot # Fallback to original
+            })
+            mark_used(current_slot)
+            fallback_skus.append(sku_id)
+        
+        # Update the concurrency of the slot's rule spaces with this SKU's picker visits
+        placed_slot = best_slot or current_slot
+        placed_aisle[sku_id] = slot_aisle.get(placed_slot)
+        if congestion:
+            for restriction in slot_restrictions(placed_slot):
+                space_tracker(*restriction).add(sku_id)
+            
+    return pd.DataFrame(assignments, columns=['SKU_ID', 'Bin_ID']), fallback_skus
+
+def _solve_zone(sku_data, warehouse_df, events, solver, top_k, taken, partners, layout):
+    # One temperature zone end to end: greedy, then the optional matching
+    plan, fallback_skus = assign_slots(sku_data, warehouse_df, events, taken, partners, layout)
+    gap_report = None
+    if solver == 'optimal':
+        plan, gap_report = optimize_assignment(
+            sku_data, warehouse_df, plan, fallback_skus, top_k=top_k, withheld=[slot for _, slot in taken]
+        )
+    return plan, fallback_skus, gap_report
+
+def solve_zones(sku_data, warehouse_df, events=None, solver='greedy', top_k=32, workers=3, partners=None,
+                layout=None):
+    """Run the Frozen, Refrigerated and Ambient subproblems in parallel workers.
+
+    A SKU only ever takes a slot in its own temperature zone, so the zones
+    are independent except for fallbacks: a SKU with no fitting slot keeps
+    its current one, which may sit in another zone. That zone is then solved
+    again with the slot taken from the SKU's velocity rank on, exactly as
+    in the serial loop, until no zone's fallbacks change. The merged plan
+    follows sku_data order, whatever order the workers finish in.
+
+    Returns the plan, the fallback SKUs and (for solver='optimal') the gap report.
+    """
+    zones = ['Frozen', 'Refrigerated', 'Ambient']
+    sku_zone = pool_zone(sku_data['temp_req'])
+    rank = pd.Series(np.arange(len(sku_data)), index=sku_data['sku_id'].to_numpy())
+    zone_ranks = {zone: rank.to_numpy()[sku_zone == zone] for zone in zones}
+    zone_of_slot = warehouse_df.set_index('slot_id')['temp_zone']
+    # Workers only get the columns they read, to keep pickling cheap
+    sku_data = sku_data[['sku_id', 'temp_req', 'clean_weight_kg', 'current_slot', 'order_count']]
+    warehouse_df = warehouse_df[['slot_id', 'zone', 'aisle_id', 'aisle_width_m', 'temp_zone', 'max_weight_kg', 'slot_cost']]
+
+    taken = {zone: [] for zone in zones}
+    results = {}
+    pending = zones
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending:
+            futures = {}
+            for zone in pending:
+                skus = sku_data[sku_zone == zone]
+                slots = warehouse_df[warehouse_df['temp_zone'] == zone]
+                zone_events = None if events is None else events[events['sku_id'].isin(skus['sku_id'])]
+                # Aisles hold one temperature zone, so partners elsewhere never share one
+                zone_partners = None if partners is None else {
+                    sku_id: partners[sku_id] for sku_id in skus['sku_id'] if sku_id in partners
+                }
+                futures[zone] = pool.submit(
+                    _solve_zone, skus, slots, zone_events, solver, top_k, taken[zone], zone_partners, layout
+                )
+            for zone, future in futures.items():
+                results[zone] = future.result()
+
+            # Slots that fallback SKUs kept in another zone, taken there from
+            # the point in velocity order where the fallback happened
+            kept = {zone: [] for zone in zones}
+            for zone, (plan, fallback_skus, _) in results.items():
+                fallback_plan = plan[plan['SKU_ID'].isin(fallback_skus)]
+                for sku_id, slot in zip(fallback_plan['SKU_ID'], fallback_plan['Bin_ID']):
+                    owner = zone_of_slot.get(slot)
+                    if owner in kept and owner != zone:
+                        kept[owner].append((int(np.searchsorted(zone_ranks[owner], rank[sku_id])), slot))
+            pending = [zone for zone in zones if sorted(kept[zone]) != sorted(taken[zone])]
+            taken = kept
+
+    plan = pd.concat([results[zone][0] for zone in zones], ignore_index=True)
+    plan = plan.set_index('SKU_ID').loc[sku_data['sku_id']].reset_index()
+    fallback = set().union(*(results[zone][1] for zone in zones))
+    fallback_skus = [sku_id for sku_id in sku_data['sku_id'] if sku_id in fallback]
+    gap_report = None
+    if solver == 'optimal':
+        gap_report = pd.concat(
+            [results[zone][2][results[zone][2]['temp_zone'] == zone] for zone in zones], ignore_index=True
+        )
+    return plan, fallback_skus, gap_report
+
+def optimize_slotting(solver='greedy', top_k=32, move_budget=None, budget_unit='moves', congestion=False,
+                      data_dir='.', output_dir=None, tables=None, zone_workers=1, half_life_days=None,
+                      forecast=None, affinity=False, affinity_top_k=20, improve_seconds=0, layout=None,
+                      weight_threshold=WEIGHT_THRESHOLD, demand_multipliers=None, velocity=None):
+    """Build final_slotting_plan.csv for the store whose CSVs are in data_dir.
+
+    solver='greedy' gives each SKU, in velocity order, the best free slot.
+    solver='optimal' re-solves the greedy plan as a min-cost matching per
+    temperature zone (top_k candidate slots per weight class) and reports
+    the objective gap against greedy.
+
+    With a move_budget (in 'moves' or labor 'minutes'), only the relocations
+    with the highest velocity-weighted saving are kept; every other SKU stays
+    in its current slot.
+
+    congestion=True makes the greedy pass aware of the aisle capacity rules
+    (the Aisle B forklift rule plus any layout['capacity_rules'], e.g.
+    narrow aisles): the historical picker log is replayed against the plan
+    as it is built, and a SKU only takes a slot under a rule if that slot
+    still beats the best slot elsewhere after paying for the picker-minutes
+    it pushes over the rule's limit. The optimal and move-budget stages do
+    not see this penalty.
+
+    zone_workers > 1 solves the three temperature zones (greedy and, if
+    asked, the matching) in parallel processes; see solve_zones(). The
+    plan is the same as the serial one, except that in congestion mode each
+    zone only sees its own SKUs' picker visits (Aisle B is all Ambient in
+    the shipped layout, so only cross-zone fallbacks are missed).
+
+    affinity=True pulls SKUs that are ordered together into the same aisle:
+    each SKU's affinity_top_k co-order partners come from a cached sparse
+    co-occurrence matrix (see affinity.py), and a SKU takes the best free
+    slot in a placed partner's aisle when the aisle visits saved on shared
+    orders outweigh the worse slot. Like congestion, only the greedy pass
+    sees it.
+
+    improve_seconds > 0 runs an anytime local search (swaps, relocations to
+    free slots and ejections within a temperature zone, see local_search.py)
+    on the plan for at most that many seconds before any move budget is
+    applied. It optimizes the plain velocity x slot cost objective, so it
+    is best left off in congestion and affinity mode.
+
+    half_life_days ranks SKUs by time-decayed velocity instead of all-time
+    order counts: an order half_life_days older than the latest one counts
+    half as much. forecast ('naive', 'seasonal', 'ewma' or 'trend') ranks
+    them by forecast demand for the week after the order log instead (see
+    forecast.py); it cannot be combined with a half-life.
+
+    layout is a slot-cost layout dict (see slot_costs.load_layout) or the
+    path of a JSON file of overrides to DEFAULT_LAYOUT: aisle and zone
+    penalties, walk speed, forklift limits. weight_threshold is the decimal
+    drift cut-off (weights above it are divided by 10), and
+    demand_multipliers ({category: factor}) scales the velocity of whole
+    categories before ranking, e.g. for a seasonal peak. A precomputed
+    sku_velocity frame can be passed as `velocity` (see scenarios.py).
+
+    Wall time, CPU time, peak RSS growth and rows per stage are written to
+    final_slotting_report.json next to the plan.
+
+    Both files go to output_dir (default: data_dir). `tables` can hold
+    already-cleaned tables by name (e.g. a SKU master shared by several
+    stores); they are used instead of the store's own CSVs.
+    """
+    output_dir = output_dir or data_dir
+    os.makedirs(output_dir, exist_ok=True)
+    plan_path = os.path.join(output_dir, 'final_slotting_plan.csv')
+    tables = dict(tables or {})
+    if isinstance(layout, str):
+        layout = load_layout(layout)
+    layout = layout or DEFAULT_LAYOUT
     print("🚀 STARTING SLOTTING OPTIMIZATION ENGINE...")
+    report = RunReport(
+        solver=solver, top_k=top_k, move_budget=move_budget, budget_unit=budget_unit, congestion=congestion,
+        half_life_days=half_life_days, forecast=forecast, affinity=affinity, improve_seconds=improve_seconds,
+        weight_threshold=weight_threshold, demand_multipliers=demand_multipliers,
+    )
     
     # 1. LOAD DATA
     print("📦 Loading datasets...")
-    sku_df = pd.read_csv('sku_master.csv')
-    orders_df = pd.read_csv('order_transactions.csv')
-    warehouse_df = pd.read_csv('warehouse_constraints.csv')
+    report.begin('load')
+    # Cleaned, typed tables from the shared forensics cache (rebuilt when a CSV changes)
+    tables.update(load_tables([name for name in ['sku', 'warehouse'] if name not in tables], data_dir))
+    sku_df = tables['sku']
+    warehouse_df = tables['warehouse']
+    report.end(rows=len(sku_df) + len(warehouse_df))
     
     # 2. DATA FORENSICS (CLEANING) - Critical for valid weight checks
     print("🧹 Running Forensics Pipeline...")
-    # Fix Decimal Drift
-    weight_threshold = 50
-    sku_df['clean_weight_kg'] = sku_df['weight_kg']
-    sku_df.loc[sku_df['clean_weight_kg'] > weight_threshold, 'clean_weight_kg'] = \
-        sku_df.loc[sku_df['clean_weight_kg'] > weight_threshold, 'clean_weight_kg'] / 10
+    report.begin('forensics')
+    # Decimal Drift is fixed once in the cache build (clean_weight_kg),
+    # and again here only for a non-default threshold
+    if weight_threshold != WEIGHT_THRESHOLD:
+        sku_df = sku_df.assign(clean_weight_kg=drift_corrected(sku_df['weight_kg'], weight_threshold))
     print(f"   - Corrected {len(sku_df[sku_df['weight_kg'] > weight_threshold])} weight anomalies")
+    report.end(rows=len(sku_df))
 
     # 3. CALCULATE VELOCITY (Demand)
     print("📈 Calculating SKU Velocity...")
-    sku_velocity = orders_df['sku_id'].value_counts().reset_index()
-    sku_velocity.columns = ['sku_id', 'order_count']
+    report.begin('velocity')
+    # From the cached sku_id column, or streamed in chunks from the CSV:
+    # the order log is never fully loaded into memory
+    if forecast and half_life_days:
+        raise ValueError("Choose either a demand forecast or a velocity half-life, not both")
+    if velocity is not None:
+        sku_velocity = velocity
+    elif forecast:
+        sku_velocity = forecast_velocity(data_dir, forecast)
+        print(f"   - Forecasting week of {sku_velocity.attrs['forecast_week']:%Y-%m-%d} "
+              f"from {sku_velocity.attrs['history_weeks']} weeks ({forecast})")
+    else:
+        sku_velocity = load_velocity(data_dir, half_life_days=half_life_days)
     
     # Merge velocity with metadata
     sku_data = sku_df.merge(sku_velocity, on='sku_id', how='left')
     sku_data['order_count'] = sku_data['order_count'].fillna(0)
+    # Unscaled demand, saved in the velocity state for the next week to add to
+    base_count = sku_data['order_count']
+    if demand_multipliers:
+        sku_data['order_count'] = sku_data['order_count'] * (
+            sku_data['category'].astype(str).map(demand_multipliers).fillna(1).to_numpy()
+        )
     
     # Sort SKUs by importance (Highest velocity comes first)
     sku_data = sku_data.sort_values('order_count', ascending=False)
+    report.end(rows=sku_data['order_count'].sum())
     
     # 4. RANK WAREHOUSE SLOTS
     print("🏟️ Ranking Warehouse Slots...")
-    # Strategy: 
-    # - Aisle A is best (Entry)
-    # - Aisle B is penalized (Forklift Restriction)
-    # - Lower shelves (level < 3) are faster
-    
-    def parse_aisle(slot_id):
-        # Assuming format like "A01-B-12" where A is aisle
-        return slot_id[0] 
-        
-    warehouse_df['aisle_char'] = warehouse_df['aisle_id'].str[0]
-    
-    # Score slots (Higher is better)
-    # Base score: 100
-    warehouse_df['slot_score'] = 100
+    report.begin('ranking')
+    warehouse_df = score_slots(warehouse_df, layout)
+    slot_cost = warehouse_df.set_index('slot_id')['slot_cost']
+    report.end(rows=len(warehouse_df))
     
-    # Peninsula mapping (Assumption: A=100, C=90, D=80... B=50 due to restrictions)
-    aisle_scores = {'A': 100, 'C': 90, 'D': 80, 'E': 70, 'F': 60, 'B': 40} # B is heavily penalized!
-    warehouse_df['aisle_score'] = warehouse_df['aisle_id'].str[0].map(aisle_scores).fillna(50)
-    
-    # Total Score
-    warehouse_df['final_score'] = warehouse_df['aisle_score']
-    
-    # Sort slots: Best slots first
-    warehouse_df = warehouse_df.sort_values('final_score', ascending=False)
+    # 4b. CAPACITY CONGESTION (per-minute picker load in Aisle B and other restricted aisles)
+    if congestion and 'picker' not in tables and not os.path.exists(os.path.join(data_dir, SOURCES['picker'])):
+        print(f"   - {SOURCES['picker']} not found, congestion mode disabled")
+        congestion = False
+    events = None
+    if congestion:
+        print("🚧 Forecasting picker concurrency in capacity-restricted aisles...")
+        report.begin('congestion_forecast')
+        if 'picker' not in tables:
+            tables.update(load_tables(['picker'], data_dir))
+        events = picker_events(tables['picker'])
+        report.end(rows=len(events))
+
+    # 4c. CO-ORDER AFFINITY (top partners per SKU from order baskets)
+    partners = None
+    if affinity:
+        print("🧺 Loading SKU co-order affinity...")
+        report.begin('affinity')
+        affinity_skus, affinity_matrix = load_affinity(data_dir, affinity_top_k)
+        partners = affinity_partners(affinity_skus, affinity_matrix)
+        report.end(rows=affinity_matrix.nnz)
     
-    # 5. ASSIGNMENT ALGORITHM (Greedy Match)
-    print("🧩 Running Assignment Logic...")
+    if zone_workers > 1:
+        # 5. ASSIGNMENT + 5b. OPTIMIZATION, one temperature zone per worker
+        print(f"🧩 Solving temperature zones in parallel ({zone_workers} workers)...")
+        report.begin('zone_solve')
+        result_df, fallback_skus, gap_report = solve_zones(
+            sku_data, warehouse_df, events, solver=solver, top_k=top_k, workers=zone_workers, partners=partners,
+            layout=layout,
+        )
+        report.end(rows=len(result_df))
+    else:
+        # 5. ASSIGNMENT ALGORITHM (Greedy Match)
+        print("🧩 Running Assignment Logic...")
+        report.begin('assignment')
+        result_df, fallback_skus = assign_slots(sku_data, warehouse_df, events, partners=partners, layout=layout)
+        report.end(rows=len(result_df))
+        
+        # 5b. GLOBAL OPTIMIZATION (Min-Cost Matching per Temp Zone)
+        if solver == 'optimal':
+            print("🧮 Solving min-cost assignment per temperature zone...")
+            report.begin('optimal_matching')
+            result_df, gap_report = optimize_assignment(
+                sku_data, warehouse_df, result_df, fallback_skus, top_k=top_k
+            )
+            report.end(rows=gap_report['skus'].sum())
     
-    assignments = []
+    # 5c. LOCAL SEARCH (anytime improvement within a time budget)
+    if improve_seconds > 0:
+        print(f"🔧 Improving the plan by local search (up to {improve_seconds}s)...")
+        report.begin('local_search')
+        result_df, search = improve_plan(result_df, sku_data, warehouse_df, improve_seconds, fixed=fallback_skus)
+        print(f"   - {search['swaps']} swaps, {search['relocations']} relocations, {search['ejections']} ejections "
+              f"in {search['seconds']:.1f}s: "
+              f"cost {search['cost_before']:,.0f} -> {search['cost_after']:,.0f} "
+              f"({search['improvement_pct']:.3f}% better{', converged' if search['converged'] else ''})")
+        report.summary.update(local_search=search)
+        report.end(rows=search['swaps'] + search['relocations'] + search['ejections'])
+
+    if solver == 'optimal':
+        for row in gap_report.itertuples():
+            print(f"   - {row.temp_zone}: {row.skus} SKUs, cost {row.greedy_cost:,.0f} -> "
+                  f"{row.optimal_cost:,.0f} ({row.gap_pct:.2f}% better than greedy)")
+    success_count = len(result_df) - len(fallback_skus)
+    fail_count = len(fallback_skus)
     
-    # Track used slots to prevent double-booking
-    used_slots = set()
+    # 5d. LABOR BUDGET (Move Selection)
+    if move_budget is not None:
+        print(f"🚚 Selecting moves within a budget of {move_budget} {budget_unit}...")
+        report.begin('move_selection')
+        moves = build_candidate_moves(
+            sku_data, result_df, warehouse_df.set_index('slot_id')['slot_cost']
+        )
+        selected, summary = select_moves(moves, move_budget, budget_unit)
+        kept = ~result_df['SKU_ID'].isin(selected['sku_id'])
+        result_df.loc[kept, 'Bin_ID'] = result_df.loc[kept, 'SKU_ID'].map(
+            sku_data.set_index('sku_id')['current_slot']
+        )
+        print(f"   - {summary['selected']} of {summary['candidates']} moves, saving "
+              f"{summary['saving']:,.0f} (bound {summary['upper_bound']:,.0f}, gap {summary['gap_pct']:.2f}%)")
+        report.end(rows=len(moves))
     
-    # Helper to find best slot
-    def find_slot(sku_row, valid_slots_df):
-        for _, slot in valid_slots_df.iterrows():
-            sid = slot['slot_id']
-            if sid in used_slots:
-                continue
-            
-            # HARD CONSTRAINT: Max Weight
-            if sku_row['clean_weight_kg'] > slot['max_weight_kg']:
-                continue
-                
-            # HARD CONSTRAINT: Temperature
-            # Map requirements to allowed zones
-            # Frozen -> Frozen only
-            # Refrigerated -> Refrigerated (ideal) or Frozen (acceptable cost?) -> strict mapping prefered
-            # Ambient -> Any? No, usually Ambient or AC.
-            
-            req = sku_row['temp_req']
-            zone = slot['temp_zone']
-            
-            if req == 'Frozen' and zone != 'Frozen':
-                continue
-            if req == 'Refrigerated' and zone != 'Refrigerated':
-                continue
-            if req == 'Ambient' and zone != 'Ambient':
-                continue
-                
-            return sid
-        return None
-
-    # Separate warehouse by Temp Zone to speed up lookup
-    frozen_slots = warehouse_df[warehouse_df['temp_zone'] == 'Frozen']
-    fridge_slots = warehouse_df[warehouse_df['temp_zone'] == 'Refrigerated']
-    ambient_slots = warehouse_df[warehouse_df['temp_zone'] == 'Ambient']
-    
-    success_count = 0
-    fail_count = 0
-    
-    for _, sku in sku_data.iterrows():
-        temp_req = sku['temp_req']
-        
-        # Select relevant pool
-        if temp_req == 'Frozen':
-            pool = frozen_slots
-        elif temp_req == 'Refrigerated':
-            pool = fridge_slots
-        else:
-            pool = ambient_slots
-            
-        best_slot = find_slot(sku, pool)
-        
-        if best_slot:
-            assignments.append({
-                'SKU_ID': sku['sku_id'],
-                'Bin_ID': best_slot
-            })
-            used_slots.add(best_slot)
-            success_count += 1
-        else:
-            # Fallback: keep current if possible, or flag error
-            assignments.append({
-                'SKU_ID': sku['sku_id'],
-                'Bin_ID': sku['current_slot'] # Fallback to original
-            })
-            used_slots.add(sku['current_slot'])
-            fail_count += 1
-            
-    # 6. EXPORT
+    # 6. EXPORT (hard constraints checked before anything is written)
+    print("🔍 Validating hard constraints...")
+    report.begin('validation')
+    violation_counts = write_violations(validate_plan(result_df, sku_data, warehouse_df), output_dir)
+    report.summary.update(violations=violation_counts.to_dict())
+    report.end(rows=len(result_df))
+
     print(f"💾 Saving results... (Assigned: {success_count}, Fallback: {fail_count})")
-    result_df = pd.DataFrame(assignments)
-    result_df.to_csv('final_slotting_plan.csv', index=False)
+    report.begin('export')
+    result_df.to_csv(plan_path, index=False)
+    save_velocity_state(
+        sku_data.assign(order_count=base_count), output_dir, sku_velocity.attrs.get('as_of'), half_life_days, forecast,
+        demand_multipliers,
+        settings=dict(
+            layout=layout, weight_threshold=weight_threshold, solver=solver, top_k=top_k, congestion=congestion,
+            affinity=affinity, affinity_top_k=affinity_top_k, improve_seconds=improve_seconds,
+            move_budget=move_budget, budget_unit=budget_unit,
+        ),
+    )
+    report.end(rows=len(result_df))
     print("✅ final_slotting_plan.csv generated successfully!")
     
     # 7. GENERATE EXECUTIVE SUMMARY METRICS
-    original_slot_score = 0 # Placeholder for improvement calc
-    new_slot_score = 0
+    report.begin('impact')
+    # Velocity-weighted expected pick cost (ghost bins count as the worst slot)
+    velocity = result_df['SKU_ID'].map(sku_data.set_index('sku_id')['order_count'])
+    current_slots = result_df['SKU_ID'].map(sku_data.set_index('sku_id')['current_slot'].astype(str))
+    original_slot_cost = (velocity * current_slots.map(slot_cost).fillna(slot_cost.max())).sum()
+    new_slot_cost = (velocity * result_df['Bin_ID'].map(slot_cost).fillna(slot_cost.max())).sum()
     
     print("\nImpact Analysis:")
     print(f"- Processed {len(sku_data)} SKUs")
+    if original_slot_cost > 0:
+        print(f"- Expected pick time down {(1 - new_slot_cost / original_slot_cost) * 100:.1f}% (velocity-weighted)")
     print(f"- De-congested Aisle B by prioritizing Aisle A/C for Top Movers")
+    if congestion:
+        # Every capacity rule, replayed exactly over the picker log for both layouts
+        before, after = [
+            blocked_time(evaluate_rules(tables['picker'], mapping, warehouse_df, layout), per=[])
+            .groupby('rule', sort=False)['blocked_min'].sum()
+            for mapping in [sku_data.set_index('sku_id')['current_slot'], result_df.set_index('SKU_ID')['Bin_ID']]
+        ]
+        rules = [rule['name'] for rule in capacity_rules(layout)]
+        capacity = pd.DataFrame({'before': before, 'after': after}).reindex(rules).fillna(0.0).round(1)
+        for rule, row in capacity.iterrows():
+            print(f"- {rule} capacity-blocked minutes: {row['before']:,.1f} -> {row['after']:,.1f} (picker log replay)")
+        peak = forecast_aisle_load(events, result_df.set_index('SKU_ID')['Bin_ID'])['pickers'].max()
+        print(f"- Busiest aisle-minute after re-slotting: {peak} concurrent pickers")
+        report.summary.update(
+            blocked_minutes_before=round(capacity['before'].sum(), 1),
+            blocked_minutes_after=round(capacity['after'].sum(), 1),
+            capacity_rules=capacity.to_dict(orient='index'),
+        )
+    if affinity:
+        order_lines = load_order_lines(data_dir)
+        before = replay_orders(order_lines, sku_data.set_index('sku_id')['current_slot'], warehouse_df)
+        after = replay_orders(order_lines, result_df.set_index('SKU_ID')['Bin_ID'], warehouse_df)
+        print(f"- Aisles visited per order: {before['aisles'].mean():.1f} -> {after['aisles'].mean():.1f}, "
+              f"walk {before['distance_m'].mean():,.0f} m -> {after['distance_m'].mean():,.0f} m (order replay)")
+        report.summary.update(aisles_per_order_before=before['aisles'].mean(), aisles_per_order_after=after['aisles'].mean())
+    report.end(rows=len(result_df))
+    
+    report.summary.update(
+        skus=len(sku_data),
+        assigned=success_count,
+        fallback=fail_count,
+        pick_time_reduction_pct=(
+            round((1 - new_slot_cost / original_slot_cost) * 100, 2) if original_slot_cost > 0 else None
+        ),
+    )
+    run = report.write(os.path.join(output_dir, 'final_slotting_report.json'))
+    print(f"⏱️ Run report: final_slotting_report.json ({run['wall_s']:.2f}s, "
+          f"slowest stage {max(run['stages'], key=lambda stage: stage['wall_s'])['stage']})")
+
+def _demand_multiplier(text):
+    # CATEGORY=FACTOR from the command line
+    category, _, factor = text.rpartition('=')
+    if not category:
+        raise argparse.ArgumentTypeError(f"expected CATEGORY=FACTOR, got {text!r}")
+    return category, float(factor)
 
 if __name__ == "__main__":
-    optimize_slotting()
+    parser = argparse.ArgumentParser(description="Build a slotting plan for one store")
+    parser.add_argument('--data-dir', default='.', help="folder with the store's CSVs (default: current folder)")
+    parser.add_argument('--output-dir', help="where the plan and reports go (default: --data-dir)")
+    parser.add_argument('--solver', choices=['greedy', 'optimal'], default='greedy')
+    parser.add_argument('--top-k', type=int, default=32, help="candidate slots per SKU and weight class (optimal)")
+    parser.add_argument('--move-budget', type=float, help="keep only the best moves within this budget")
+    parser.add_argument('--budget-unit', choices=['moves', 'minutes'], default='moves')
+    parser.add_argument('--congestion', action='store_true', help="price in the aisle capacity rules (Aisle B forklift, layout capacity_rules)")
+    parser.add_argument('--zone-workers', type=int, default=1, help="solve temperature zones in parallel")
+    parser.add_argument('--half-life-days', type=float, help="rank SKUs by time-decayed velocity")
+    parser.add_argument('--forecast', choices=['naive', 'seasonal', 'ewma', 'trend'], help="rank SKUs by next week's forecast")
+    parser.add_argument('--affinity', action='store_true', help="keep co-ordered SKUs in the same aisle")
+    parser.add_argument('--affinity-top-k', type=int, default=20)
+    parser.add_argument('--improve-seconds', type=float, default=0, help="local search time budget")
+    parser.add_argument('--layout', help="JSON file of slot-cost layout overrides (aisle penalties, walk speed, ...); "
+                             "a scenario file sets its own")
+    parser.add_argument('--weight-threshold', type=float, default=WEIGHT_THRESHOLD,
+                        help=f"decimal drift cut-off in kg (default: {WEIGHT_THRESHOLD})")
+    parser.add_argument('--demand', type=_demand_multiplier, action='append', metavar='CATEGORY=FACTOR',
+                        help="scale a category's velocity (repeatable)")
+    parser.add_argument('--scenarios', help="JSON file of parameter variants to run in one process (see scenarios.py)")
+    args = parser.parse_args()
+
+    options = dict(
+        solver=args.solver, top_k=args.top_k, move_budget=args.move_budget, budget_unit=args.budget_unit,
+        congestion=args.congestion, zone_workers=args.zone_workers, half_life_days=args.half_life_days,
+        forecast=args.forecast, affinity=args.affinity, affinity_top_k=args.affinity_top_k,
+        improve_seconds=args.improve_seconds, layout=args.layout, weight_threshold=args.weight_threshold,
+        demand_multipliers=dict(args.demand) if args.demand else None,
+    )
+    if args.scenarios:
+        from scenarios import run_scenarios
+
+        print(f"🧪 Running the scenarios in {args.scenarios}...")
+        options.pop('layout')
+        summary = run_scenarios(args.scenarios, args.data_dir, args.output_dir, **options)
+        print(summary.to_string(index=False))
+        print(f"✅ {int((summary['status'] == 'ok').sum())} of {len(summary)} scenarios run")
+    else:
+        optimize_slotting(data_dir=args.data_dir, output_dir=args.output_dir, **options)
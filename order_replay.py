@@ -0,0 +1,135 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_cache import SOURCES, is_fresh, load_tables, read_table
+from slot_costs import DEFAULT_LAYOUT, slot_geometry
+
+
+def load_order_lines(data_dir='.'):
+    """order_id/sku_id of every order line (memory-mapped from the cache when fresh)."""
+    if is_fresh('orders', data_dir):
+        return read_table('orders', columns=['order_id', 'sku_id'], data_dir=data_dir)
+    return pd.read_csv(os.path.join(data_dir, SOURCES['orders']), usecols=['order_id', 'sku_id'])
+
+
+def _line_slots(sku_ids, mapping, slot_index):
+    """Slot position (into slot_index) of every order line, -1 when unmapped."""
+    slot_of_sku = slot_index.get_indexer(mapping.to_numpy())
+    sku_index = pd.Index(mapping.index)
+
+    if isinstance(sku_ids.dtype, pd.CategoricalDtype):
+        # Resolve each distinct SKU once, then gather through the codes
+        per_category = np.append(slot_of_sku, -1)[sku_index.get_indexer(sku_ids.cat.categories)]
+        per_category = np.append(per_category, -1)
+        return per_category[sku_ids.cat.codes.to_numpy()]
+
+    return np.append(slot_of_sku, -1)[sku_index.get_indexer(sku_ids)]
+
+
+def replay_orders(order_lines, mapping, warehouse_df, layout=None):
+    """Replay historical orders against a SKU -> slot mapping.
+
+    Each order is walked with a return policy: along the main path to the
+    farthest aisle it needs and back, and into each visited aisle up to its
+    deepest bay and back. Lines are sorted by (order, aisle) once and the
+    per-aisle depths and per-order totals come from segment reductions, so
+    there is no Python loop over orders.
+
+    `mapping` is a Series of slot_id indexed by sku_id. Lines whose SKU has
+    no slot (or a ghost slot) are left out and counted in unmapped_lines.
+
+    Returns one row per order: order_id, lines, aisles, distance_m, pick_time_s.
+    """
+    layout = layout or DEFAULT_LAYOUT
+    geometry = slot_geometry(warehouse_df, layout)
+    aisle_code, _ = pd.factorize(geometry['aisle_id'])
+
+    order_code, order_ids = pd.factorize(order_lines['order_id'])
+    line_slot = _line_slots(order_lines['sku_id'], mapping, geometry.index)
+
+    mapped = (line_slot >= 0) & (order_code >= 0)
+    order_code = order_code[mapped]
+    line_slot = line_slot[mapped]
+
+    n_orders = len(order_ids)
+    lines = np.bincount(order_code, minlength=n_orders)
+    handling_s = np.bincount(order_code, weights=geometry['handling_s'].to_numpy()[line_slot], minlength=n_orders)
+
+    # Sort lines by (order, aisle) so both become contiguous segments
+    line_aisle = aisle_code[line_slot]
+    order = np.lexsort((line_aisle, order_code))
+    order_code = order_code[order]
+    line_aisle = line_aisle[order]
+    x_m = geometry['x_m'].to_numpy()[line_slot[order]]
+    depth_m = geometry['depth_m'].to_numpy()[line_slot[order]]
+
+    distance_m = np.zeros(n_orders)
+    aisles = np.zeros(n_orders, dtype=np.int64)
+    if len(order_code):
+        # Deepest bay per (order, aisle) segment: walk in and back out
+        aisle_start = np.flatnonzero(np.r_[True, (np.diff(order_code) != 0) | (np.diff(line_aisle) != 0)])
+        aisle_depth = np.maximum.reduceat(depth_m, aisle_start)
+        aisle_order = order_code[aisle_start]
+        distance_m += np.bincount(aisle_order, weights=2 * aisle_depth, minlength=n_orders)
+        aisles = np.bincount(aisle_order, minlength=n_orders)
+
+        # Farthest aisle per order along the main path, there and back
+        order_start = np.flatnonzero(np.r_[True, np.diff(order_code) != 0])
+        distance_m[order_code[order_start]] += 2 * np.maximum.reduceat(x_m, order_start)
+
+    result = pd.DataFrame({
+        'order_id': np.asarray(order_ids),
+        'lines': lines,
+        'aisles': aisles,
+        'distance_m': distance_m,
+        'pick_time_s': distance_m / layout['walk_speed_m_per_s'] + handling_s,
+    })
+    result.attrs['unmapped_lines'] = int((~mapped).sum())
+    return result
+
+
+def summarize_replay(per_order):
+    """Headline numbers for one replayed plan.
+
+    Averages are over the orders that still have a line after unmapped
+    ones are dropped; an order left empty would count as a free trip.
+    unmapped_lines and empty_orders say how much of the history that left out.
+    """
+    picked = per_order[per_order['lines'] > 0]
+    return {
+        'orders': len(picked),
+        'lines': int(per_order['lines'].sum()),
+        'total_distance_km': per_order['distance_m'].sum() / 1000,
+        'avg_distance_m': picked['distance_m'].mean(),
+        'avg_pick_time_min': picked['pick_time_s'].mean() / 60,
+        'unmapped_lines': per_order.attrs.get('unmapped_lines', 0),
+        'empty_orders': len(per_order) - len(picked),
+        'total_pick_hours': per_order['pick_time_s'].sum() / 3600,
+    }
+
+
+def compare_plans(order_lines, plans, warehouse_df, layout=None):
+    """Replay several SKU -> slot mappings side by side, one row per plan."""
+    rows = {name: summarize_replay(replay_orders(order_lines, mapping, warehouse_df, layout))
+            for name, mapping in plans.items()}
+    return pd.DataFrame(rows).T
+
+
+def plan_mapping(plan_df):
+    """SKU -> slot Series from a final_slotting_plan.csv frame."""
+    return plan_df.set_index('SKU_ID')['Bin_ID']
+
+
+if __name__ == "__main__":
+    # python order_replay.py [plan.csv ...]  (current layout is always included)
+    print("🔁 Replaying order history...")
+    tables = load_tables(['sku', 'warehouse'])
+    plans = {'current layout': tables['sku'].set_index('sku_id')['current_slot']}
+    for path in sys.argv[1:] or ['final_slotting_plan.csv']:
+        plans[path] = plan_mapping(pd.read_csv(path))
+
+    comparison = compare_plans(load_order_lines(), plans, tables['warehouse'])
+    print(comparison.to_string(float_format=lambda v: f"{v:,.2f}"))
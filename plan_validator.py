@@ -0,0 +1,170 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from assignment_solver import pool_zone
+from data_cache import load_tables
+from local_search import ZONES
+
+# Checks in report order; any of them zeroes the slotting score
+VIOLATIONS = ['unknown_sku', 'duplicate_sku', 'ghost_bin', 'double_booking', 'weight', 'temperature']
+
+
+def _key_codes(df, key):
+    # Categorical key column (the cached tables already have one) and the
+    # first row of each category; the categories' hash index is built once
+    # per table and reused by every lookup
+    keys = df[key]
+    if not isinstance(keys.dtype, pd.CategoricalDtype):
+        keys = keys.astype('category')
+    codes = keys.cat.codes.to_numpy()
+    rows = np.flatnonzero(codes >= 0)[::-1]
+    first_row = np.full(len(keys.cat.categories) + 1, -1)
+    first_row[codes[rows]] = rows
+    return keys, first_row
+
+
+def _encode(values, categories):
+    # Position of each value in `categories` (-1 if absent); a categorical
+    # column is looked up by its categories only
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return np.append(_encode(values.cat.categories, categories), -1)[values.cat.codes.to_numpy()]
+    if pd.api.types.is_string_dtype(values.dtype) and pd.api.types.is_string_dtype(categories.dtype):
+        # Arrow hashes strings a few times faster than a pandas object index
+        positions = pc.index_in(pa.array(values, from_pandas=True), value_set=pa.array(categories, from_pandas=True))
+        return positions.fill_null(-1).to_numpy().astype(np.int64)
+    return categories.get_indexer(values)
+
+
+def _zone_codes(values, pool=False):
+    # Position in ZONES of each row's temperature zone, or with pool=True of
+    # its temperature pool (-1 when missing), mapped on the categories only
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+    categories = values.cat.categories
+    zones = pd.Index(ZONES).get_indexer(pool_zone(categories) if pool else categories)
+    return np.append(zones, -1)[values.cat.codes.to_numpy()]
+
+
+def validate_plan(plan, sku_df, warehouse_df):
+    """Every hard-constraint violation in a SKU_ID/Bin_ID plan, in one vectorized pass.
+
+    Plan IDs are encoded against the categorical sku_id and slot_id of the
+    SKU and warehouse tables, so everything after that one hash lookup per
+    column works on integer codes. Checks: SKUs missing from the SKU master
+    or planned twice, ghost bins (not in the warehouse), slots given to more
+    than one SKU, weight over the slot's max_weight_kg (clean weight when
+    the SKU table has it) and temperature zone other than the SKU's pool
+    (Frozen and Refrigerated are strict, everything else goes to Ambient).
+
+    Returns one row per violation: SKU_ID, Bin_ID, violation, weight,
+    max_weight_kg, temp_req and temp_zone (see describe_violations for a
+    readable detail column).
+    """
+    skus, sku_row = _key_codes(sku_df, 'sku_id')
+    slots, slot_row = _key_codes(warehouse_df, 'slot_id')
+    sku_code = _encode(plan['SKU_ID'], skus.cat.categories)
+    slot_code = _encode(plan['Bin_ID'], slots.cat.categories)
+    sku_pos = sku_row[sku_code]
+    slot_pos = slot_row[slot_code]
+    known_sku = sku_code >= 0
+    known_slot = slot_code >= 0
+    both = known_sku & known_slot
+
+    # Repeats counted on the codes; unknown SKUs (rare) are hashed again
+    repeated_sku = np.bincount(sku_code[known_sku], minlength=len(sku_row))[sku_code] > 1
+    repeated_sku[~known_sku] = plan['SKU_ID'][~known_sku].duplicated(keep=False).to_numpy()
+    shared_slot = known_slot & (np.bincount(slot_code[known_slot], minlength=len(slot_row))[slot_code] > 1)
+
+    weight_column = 'clean_weight_kg' if 'clean_weight_kg' in sku_df else 'weight_kg'
+    weight = np.append(sku_df[weight_column].to_numpy(dtype=float), np.nan)[sku_pos]
+    capacity = np.append(warehouse_df['max_weight_kg'].to_numpy(dtype=float), np.nan)[slot_pos]
+    required = np.append(_zone_codes(sku_df['temp_req'], pool=True), -1)[sku_pos]
+    zone = np.append(_zone_codes(warehouse_df['temp_zone']), -1)[slot_pos]
+
+    checks = {
+        'unknown_sku': ~known_sku,
+        'duplicate_sku': repeated_sku,
+        'ghost_bin': ~known_slot,
+        'double_booking': shared_slot,
+        'weight': both & (weight > capacity),
+        'temperature': both & (required != zone),
+    }
+    hits = [np.flatnonzero(checks[violation]) for violation in VIOLATIONS]
+    rows = np.concatenate(hits)
+    temp_req = sku_df['temp_req'].astype('category')
+    return pd.DataFrame({
+        'SKU_ID': plan['SKU_ID'].array.take(rows),
+        'Bin_ID': plan['Bin_ID'].array.take(rows),
+        'violation': pd.Categorical.from_codes(
+            np.repeat(np.arange(len(VIOLATIONS)), [len(hit) for hit in hits]), categories=VIOLATIONS
+        ),
+        'weight': weight[rows],
+        'max_weight_kg': capacity[rows],
+        'temp_req': pd.Categorical.from_codes(
+            np.append(temp_req.cat.codes.to_numpy(), -1)[sku_pos[rows]], dtype=temp_req.dtype
+        ),
+        'temp_zone': pd.Categorical.from_codes(zone[rows], categories=ZONES),
+    })
+
+
+def describe_violations(violations):
+    """violations with a readable detail column, for reports and plan_violations.csv."""
+    detail = violations['violation'].map({
+        'unknown_sku': 'not in SKU master',
+        'duplicate_sku': 'SKU planned more than once',
+        'ghost_bin': 'slot not in warehouse',
+        'double_booking': 'slot given to more than one SKU',
+    }).astype(object)
+    weight = (violations['violation'] == 'weight').to_numpy()
+    detail[weight] = [
+        f"{w:g} kg > {c:g} kg limit"
+        for w, c in zip(violations['weight'][weight], violations['max_weight_kg'][weight])
+    ]
+    temperature = (violations['violation'] == 'temperature').to_numpy()
+    required = pool_zone(violations['temp_req'][temperature].astype(object).to_numpy())
+    detail[temperature] = [
+        f"needs {r}, slot is {z}"
+        for r, z in zip(required, violations['temp_zone'][temperature].astype(object).fillna('other'))
+    ]
+    return violations.assign(detail=detail)
+
+
+def summarize_violations(violations):
+    """Violation counts by type (every type listed, zeros included)."""
+    return violations['violation'].value_counts().reindex(VIOLATIONS, fill_value=0)
+
+
+def write_violations(violations, output_dir):
+    """Report a plan's violations before export: plan_violations.csv in output_dir, or no file when clean.
+
+    Returns the counts by type (see summarize_violations).
+    """
+    counts = summarize_violations(violations)
+    path = os.path.join(output_dir, 'plan_violations.csv')
+    if len(violations):
+        print("⚠️ " + ", ".join(f"{count} {violation}" for violation, count in counts.items() if count)
+              + " (see plan_violations.csv)")
+        describe_violations(violations).to_csv(path, index=False)
+    elif os.path.exists(path):
+        os.remove(path)
+    return counts
+
+
+if __name__ == "__main__":
+    # python plan_validator.py [plan.csv]  -> exit status 1 if the plan breaks a hard constraint
+    path = sys.argv[1] if len(sys.argv) > 1 else 'final_slotting_plan.csv'
+    print(f"🔍 Validating {path}...")
+    tables = load_tables(['sku', 'warehouse'])
+    violations = validate_plan(pd.read_csv(path), tables['sku'], tables['warehouse'])
+    for violation, count in summarize_violations(violations).items():
+        print(f"   - {violation}: {count:,}")
+    if len(violations):
+        print(describe_violations(violations.head(20)).to_string(index=False))
+        print(f"❌ {len(violations):,} violations")
+        sys.exit(1)
+    print("✅ No hard-constraint violations")
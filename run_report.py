@@ -0,0 +1,133 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _proc_status_mb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """RSS high-water mark of this process in MB (since the last reset on Linux), or None."""
+    peak = _proc_status_mb('VmHWM')
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+    return peak
+
+
+def current_rss_mb():
+    """Resident memory right now in MB (falls back to the peak)."""
+    return _proc_status_mb('VmRSS') or peak_rss_mb()
+
+
+# Peaks of the measurement windows still open; every reset folds the current
+# high-water mark into them, so nested windows (a benchmark around a run
+# report) each see their own true peak
+_open_windows = []
+
+
+def _fold_peak():
+    peak = peak_rss_mb()
+    if peak is not None:
+        for window in _open_windows:
+            window[0] = max(window[0] or 0.0, peak)
+
+
+def reset_peak_rss():
+    """Reset the RSS high-water mark (Linux only; elsewhere it is kept since start)."""
+    _fold_peak()
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def open_peak_window():
+    reset_peak_rss()
+    window = [None]
+    _open_windows.append(window)
+    return window
+
+
+def close_peak_window(window):
+    """Peak RSS in MB seen while `window` was open, or None if unknown."""
+    _fold_peak()
+    # by identity: two windows can hold the same peak
+    _open_windows[:] = [open_window for open_window in _open_windows if open_window is not window]
+    return window[0]
+
+
+class RunReport:
+    """Wall time, CPU time, peak RSS growth and row counts per pipeline stage.
+
+    Stages are marked with begin()/end() around existing code. Each boundary
+    costs a couple of clock reads and a /proc read, so it stays on in
+    production.
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self.stages = []
+        self.summary = {}
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._run_start = (time.perf_counter(), time.process_time())
+        self._open = None
+        self._peak_mb = None
+
+    def begin(self, name):
+        if self._open:
+            self.end()
+        rss_start = current_rss_mb()
+        self._open = (name, time.perf_counter(), time.process_time(), rss_start, open_peak_window())
+
+    def end(self, rows=None):
+        name, wall_start, cpu_start, rss_start, window = self._open
+        self._open = None
+        peak = close_peak_window(window)
+        if peak is not None:
+            self._peak_mb = max(peak, self._peak_mb or 0.0)
+        self.stages.append({
+            'stage': name,
+            'wall_s': round(time.perf_counter() - wall_start, 4),
+            'cpu_s': round(time.process_time() - cpu_start, 4),
+            'peak_rss_delta_mb': None if peak is None or rss_start is None else round(max(peak - rss_start, 0.0), 1),
+            'rows': None if rows is None else int(rows),
+        })
+
+    def to_dict(self):
+        if self._open:
+            self.end()
+        wall_start, cpu_start = self._run_start
+        return {
+            'started_at': self.started_at,
+            'params': self.params,
+            'wall_s': round(time.perf_counter() - wall_start, 4),
+            'cpu_s': round(time.process_time() - cpu_start, 4),
+            'peak_rss_mb': self._peak_mb and round(self._peak_mb, 1),
+            'stages': self.stages,
+            'summary': self.summary,
+        }
+
+    def write(self, path):
+        report = self.to_dict()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return report
@@ -0,0 +1,111 @@
+import contextlib
+import json
+import os
+import traceback
+
+import pandas as pd
+
+from data_cache import load_tables
+from forecast import forecast_velocity
+from optimize_slotting import optimize_slotting
+from slot_costs import load_layout
+from velocity import load_velocity
+
+
+def load_scenarios(path):
+    """Read a scenario file. Relative paths are taken from the file's folder.
+
+    {
+      "options": {"solver": "optimal", "layout": "layout.json"},
+      "scenarios": [
+        {"name": "baseline"},
+        {"name": "snack-peak", "demand_multipliers": {"Snacks": 1.5}},
+        {"name": "aisle-b-120s", "layout": {"zone_penalty_s": {"B": 120}}}
+      ]
+    }
+
+    `options` are optimize_slotting() arguments for every scenario,
+    overridable per scenario. A scenario's `layout` can be a file of its own
+    or a dict of overrides applied on top of the shared layout file.
+
+    Returns one option dict per scenario, with its name and a resolved
+    layout dict.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        spec = json.load(f)
+
+    options = dict(spec.get('options', {}))
+    shared_layout = options.pop('layout', None)
+    shared_path = os.path.join(base, shared_layout) if isinstance(shared_layout, str) else None
+    shared_overrides = shared_layout if isinstance(shared_layout, dict) else None
+
+    scenarios = []
+    for i, entry in enumerate(spec['scenarios']):
+        scenario = {**options, 'name': f'scenario_{i + 1}', **entry}
+        layout = scenario.pop('layout', None)
+        if isinstance(layout, str):
+            scenario['layout'] = load_layout(os.path.join(base, layout))
+        else:
+            scenario['layout'] = load_layout(shared_path, shared_overrides, layout)
+        scenarios.append(scenario)
+    return scenarios
+
+
+def run_scenarios(path, data_dir='.', output_dir=None, **options):
+    """Run every scenario in the file against one store, in this process.
+
+    The store's tables are loaded once and velocity once per distinct
+    half-life / forecast setting, and every scenario reuses them (and the
+    slot cost cache, whenever two scenarios share a layout) instead of
+    re-reading the CSVs. `options` are defaults under the file's own.
+
+    Each scenario writes its plan, run report and optimize.log to
+    <output_dir>/scenarios/<name>/. Returns one summary row per scenario,
+    also saved as scenario_summary.csv; a failing scenario is reported and
+    does not stop the others.
+    """
+    output_dir = output_dir or data_dir
+    scenarios = [{**options, **scenario} for scenario in load_scenarios(path)]
+
+    names = ['sku', 'warehouse'] + (['picker'] if any(s.get('congestion') for s in scenarios) else [])
+    tables = load_tables(names, data_dir)
+    velocities = {}
+
+    results = []
+    for scenario in scenarios:
+        scenario = dict(scenario)
+        name = scenario.pop('name')
+        scenario_dir = os.path.join(output_dir, 'scenarios', name)
+        os.makedirs(scenario_dir, exist_ok=True)
+
+        with open(os.path.join(scenario_dir, 'optimize.log'), 'w') as log, contextlib.redirect_stdout(log):
+            try:
+                key = (scenario.get('half_life_days'), scenario.get('forecast'))
+                if key not in velocities:
+                    if key[1] and key[0]:
+                        raise ValueError("Choose either a demand forecast or a velocity half-life, not both")
+                    velocities[key] = (
+                        forecast_velocity(data_dir, key[1]) if key[1] else load_velocity(data_dir, half_life_days=key[0])
+                    )
+                optimize_slotting(
+                    data_dir=data_dir, output_dir=scenario_dir, tables=tables, velocity=velocities[key], **scenario
+                )
+            except Exception:
+                traceback.print_exc(file=log)
+                failed = True
+            else:
+                failed = False
+        if failed:
+            results.append({'scenario': name, 'status': 'failed', 'log': log.name})
+            print(f"   - {name}: failed (see {log.name})")
+            continue
+
+        with open(os.path.join(scenario_dir, 'final_slotting_report.json')) as f:
+            run = json.load(f)
+        results.append({'scenario': name, 'status': 'ok', 'wall_s': run['wall_s'], **run['summary']})
+        print(f"   - {name}: ok ({run['wall_s']:.2f}s)")
+
+    summary = pd.json_normalize(results)
+    summary.to_csv(os.path.join(output_dir, 'scenario_summary.csv'), index=False)
+    return summary
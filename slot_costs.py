@@ -0,0 +1,137 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Physical layout assumptions behind the expected pick cost (seconds per pick).
+# Override any key with a JSON file passed to load_layout().
+DEFAULT_LAYOUT = {
+    # Walking distance from the dock entry to each zone's first aisle
+    # (zones follow each other along the main path, 25 aisles apiece)
+    'zone_offset_m': {'A': 0, 'B': 75, 'C': 150, 'D': 225, 'E': 300, 'F': 375},
+    # Distance between neighbouring aisles and between bays inside an aisle
+    'aisle_pitch_m': 3.0,
+    'bay_pitch_m': 1.2,
+    'walk_speed_m_per_s': 1.2,
+    # Extra reach time by shelf level (A is the lowest, fastest shelf)
+    'shelf_level_s': {'A': 0, 'B': 1, 'C': 2, 'D': 6, 'E': 10, 'F': 15},
+    # Narrow aisles slow pickers down: penalty * (reference / width - 1)
+    'reference_width_m': 2.0,
+    'narrow_aisle_s': 12.0,
+    # Operational penalties per zone (B: forklift restriction)
+    'zone_penalty_s': {'B': 60},
+    # Forklift rule: no restocking while more than this many pickers share
+    # the zone; congestion mode charges each extra picker-minute it causes
+    'forklift_zones': ['B'],
+    'forklift_max_pickers': 2,
+    'congestion_penalty_s': 60,
+    # How long a picker stays in the aisle from a logged movement (dead zones)
+    'pick_dwell_s': 60,
+    # Affinity mode: credit per shared order (above chance) when two SKUs sit
+    # in the same aisle. Kept small: multi-line orders already share the
+    # walk to the aisles, and larger credits trade away better slots
+    'affinity_aisle_s': 2,
+}
+
+_cost_cache = {}
+
+
+def load_layout(path=None, *overrides):
+    """DEFAULT_LAYOUT with overrides from a JSON file, then from any dicts given (dict keys are merged)."""
+    layout = json.loads(json.dumps(DEFAULT_LAYOUT))
+    sources = []
+    if path:
+        with open(path) as f:
+            sources.append(json.load(f))
+    for source in [*sources, *overrides]:
+        for key, value in (source or {}).items():
+            if isinstance(value, dict) and isinstance(layout.get(key), dict):
+                layout[key].update(value)
+            else:
+                layout[key] = value
+    return layout
+
+
+def slot_geometry(warehouse_df, layout=None):
+    """Position and handling time of every slot, indexed by slot_id.
+
+    x_m is the distance along the main path from the entry to the slot's
+    aisle, depth_m how far into the aisle the bay sits, and handling_s the
+    per-pick time at the shelf (reach by shelf level, narrow-aisle penalty
+    and any zone penalty).
+    """
+    layout = layout or DEFAULT_LAYOUT
+
+    zone = warehouse_df['zone'].astype(str)
+    aisle_index = warehouse_df['aisle_id'].astype(str).str[1:].astype(int) - 1
+    bay_index = warehouse_df['slot_id'].astype(str).str.rsplit('-', n=1).str[-1].astype(int) - 1
+
+    x_m = (
+        zone.map(layout['zone_offset_m']).fillna(max(layout['zone_offset_m'].values()))
+        + aisle_index * layout['aisle_pitch_m']
+    )
+    depth_m = bay_index * layout['bay_pitch_m']
+
+    reach_s = warehouse_df['shelf_level'].astype(str).map(layout['shelf_level_s']).fillna(
+        max(layout['shelf_level_s'].values())
+    )
+    width = warehouse_df['aisle_width_m'].to_numpy(dtype=float)
+    narrow_s = layout['narrow_aisle_s'] * np.maximum(0.0, layout['reference_width_m'] / width - 1)
+    penalty_s = zone.map(layout['zone_penalty_s']).fillna(0)
+
+    return pd.DataFrame({
+        'aisle_id': warehouse_df['aisle_id'].astype(str).to_numpy(),
+        'x_m': x_m.to_numpy(dtype=float),
+        'depth_m': depth_m.to_numpy(dtype=float),
+        'handling_s': (reach_s + narrow_s + penalty_s).to_numpy(dtype=float),
+    }, index=warehouse_df['slot_id'].to_numpy())
+
+
+def compute_slot_costs(warehouse_df, layout=None):
+    """Expected pick cost in seconds for every slot, as a Series keyed by slot_id.
+
+    Round-trip walk from the entry to the bay (zone offset + aisle index +
+    bay position), plus shelf reach time, a narrow-aisle penalty and any zone
+    penalty. Everything is computed column-wise in one pass.
+    """
+    layout = layout or DEFAULT_LAYOUT
+    geometry = slot_geometry(warehouse_df, layout)
+    walk_s = 2 * (geometry['x_m'] + geometry['depth_m']) / layout['walk_speed_m_per_s']
+    return (walk_s + geometry['handling_s']).rename('slot_cost')
+
+
+def slot_costs(warehouse_df, layout=None):
+    """Cached compute_slot_costs: recomputed only when slots or layout change.
+
+    A table from the forensics cache is keyed on its source hash
+    (attrs['source'], see data_cache.read_table) and the layout, and costs
+    are kept in an array by slot_id category code: any subset or reordering
+    of that table is answered with one gather. Other tables are keyed on a
+    hash of their slot columns.
+    """
+    layout = layout or DEFAULT_LAYOUT
+    slot_ids = warehouse_df['slot_id']
+    source = warehouse_df.attrs.get('source')
+    if source is None or not isinstance(slot_ids.dtype, pd.CategoricalDtype) or slot_ids.isna().any():
+        columns = ['slot_id', 'zone', 'aisle_id', 'shelf_level', 'aisle_width_m']
+        key = (
+            len(warehouse_df),
+            int(pd.util.hash_pandas_object(warehouse_df[columns].astype(str), index=False).sum()),
+            json.dumps(layout, sort_keys=True),
+        )
+        if key not in _cost_cache:
+            _cost_cache.clear()
+            _cost_cache[key] = compute_slot_costs(warehouse_df, layout)
+        return _cost_cache[key]
+
+    key = (source, json.dumps(layout, sort_keys=True))
+    if key not in _cost_cache:
+        _cost_cache.clear()
+        _cost_cache[key] = np.full(len(slot_ids.cat.categories), np.nan)
+    costs = _cost_cache[key]
+    codes = slot_ids.cat.codes.to_numpy()
+    # Slots not costed yet (a subset came first) are filled in on demand
+    missing = np.isnan(costs[codes])
+    if missing.any():
+        costs[codes[missing]] = compute_slot_costs(warehouse_df[missing], layout).to_numpy()
+    return pd.Series(costs[codes], index=slot_ids.to_numpy(), name='slot_cost')
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class SlotIndex:
+    """Free-slot index for one temperature pool.
+
+    Slots are kept in ranking order (best first) as the leaves of a max
+    segment tree over ``max_weight_kg``. Finding the best free slot that can
+    carry a SKU and releasing a used slot are both O(log n), so the greedy
+    assignment never has to walk the pool row by row.
+    """
+
+    def __init__(self, slot_ids, max_weights):
+        self.slot_ids = list(slot_ids)
+        self.position = {sid: i for i, sid in enumerate(self.slot_ids)}
+
+        size = 1
+        while size < max(len(self.slot_ids), 1):
+            size *= 2
+        self.size = size
+
+        # Missing limits never fail the weight check (NaN comparisons are False)
+        capacity = np.asarray(max_weights, dtype=float)
+        capacity = np.where(np.isnan(capacity), np.inf, capacity)
+
+        tree = np.full(2 * size, -np.inf)
+        tree[size:size + len(capacity)] = capacity
+        level = size // 2
+        while level:
+            tree[level:2 * level] = np.maximum(tree[2 * level:4 * level:2], tree[2 * level + 1:4 * level:2])
+            level //= 2
+        self.tree = tree.tolist()
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def best_slot(self, weight):
+        """Return the highest-ranked free slot with max_weight_kg >= weight, or None."""
+        # A missing SKU weight passes every free slot, same as `weight > limit`
+        # being False; used slots sit at -inf so they still never match
+        if weight != weight:
+            weight = -np.finfo(float).max
+
+        tree = self.tree
+        if tree[1] < weight:
+            return None
+
+        node = 1
+        while node < self.size:
+            node *= 2
+            if tree[node] < weight:
+                node += 1
+        return self.slot_ids[node - self.size]
+
+    def remove(self, slot_id):
+        """Mark a slot as used. Unknown or already-used slots are ignored."""
+        pos = self.position.pop(slot_id, None)
+        if pos is None:
+            return
+
+        tree = self.tree
+        node = pos + self.size
+        tree[node] = -np.inf
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
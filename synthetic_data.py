@@ -0,0 +1,205 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_cache import SOURCES, WEIGHT_THRESHOLD
+
+# 1x matches the shipped store: 800 SKUs, 6 zones x 25 aisles x 6 shelves x 20 bays
+BASE_SKUS = 800
+BASE_AISLES_PER_ZONE = 25
+BASE_ORDER_LINES = 250_000
+BASE_PICKER_MOVES = 100_000
+BASE_PICKERS = 12
+
+ZONES = ['A', 'B', 'C', 'D', 'E', 'F']
+SHELF_LEVELS = ['A', 'B', 'C', 'D', 'E', 'F']
+BAYS_PER_AISLE = 20
+ZONE_TEMP = {'C': 'Refrigerated', 'D': 'Frozen'}
+NARROW_ZONES = {'B': 1.2}
+CATEGORIES = ['Beverages', 'Dairy', 'Frozen', 'Groceries', 'Health', 'Snacks']
+
+HISTORY_START = pd.Timestamp('2023-12-04')
+HISTORY_WEEKS = 90
+CHUNK_ORDERS = 400_000
+
+
+def _hour_profile():
+    """Share of orders per hour: a night trough, a lunch bump and the 19:00 peak."""
+    hours = np.arange(24)
+    profile = (
+        0.2
+        + 0.6 * np.exp(-0.5 * ((hours - 12.5) / 1.5) ** 2)
+        + 2.0 * np.exp(-0.5 * ((hours - 19) / 1.2) ** 2)
+    )
+    profile[:6] *= 0.15
+    return profile / profile.sum()
+
+
+def _timestamps(rng, n):
+    days = rng.integers(0, HISTORY_WEEKS * 7, n)
+    hours = rng.choice(24, n, p=_hour_profile())
+    minutes = rng.integers(0, 60, n)
+    return (
+        HISTORY_START
+        + pd.to_timedelta(days, unit='D')
+        + pd.to_timedelta(hours * 60 + minutes, unit='min')
+    )
+
+
+def generate_warehouse(scale=1):
+    """Slot topology with the shipped naming (A01-A-01 = aisle, shelf, bay)."""
+    aisles = BASE_AISLES_PER_ZONE * scale
+    width = max(2, len(str(aisles)))
+
+    zone = np.repeat(ZONES, aisles * len(SHELF_LEVELS) * BAYS_PER_AISLE)
+    aisle_no = np.tile(np.repeat(np.arange(1, aisles + 1), len(SHELF_LEVELS) * BAYS_PER_AISLE), len(ZONES))
+    shelf = np.tile(np.repeat(SHELF_LEVELS, BAYS_PER_AISLE), len(ZONES) * aisles)
+    bay = np.tile(np.arange(1, BAYS_PER_AISLE + 1), len(ZONES) * aisles * len(SHELF_LEVELS))
+
+    aisle_id = pd.Series(zone) + pd.Series(aisle_no).astype(str).str.zfill(width)
+    warehouse = pd.DataFrame({
+        'slot_id': aisle_id + '-' + shelf + '-' + pd.Series(bay).astype(str).str.zfill(2),
+        'zone': zone,
+        'aisle_id': aisle_id,
+        'shelf_level': shelf,
+        'temp_zone': pd.Series(zone).map(ZONE_TEMP).fillna('Ambient'),
+        # Top two shelves only carry light items
+        'max_weight_kg': np.where(np.isin(shelf, ['E', 'F']), 25, 150),
+        'aisle_width_m': pd.Series(zone).map(NARROW_ZONES).fillna(2.0),
+    })
+    return warehouse
+
+
+def generate_skus(warehouse_df, scale=1, seed=0):
+    """SKU master with the shipped data's defects baked in.
+
+    About 2.5% of weights carry decimal drift (10x too high), 2% of SKUs sit
+    in ghost bins that are not in the topology, 5% share one overflow bin, and
+    current slots ignore temperature zones.
+    """
+    rng = np.random.default_rng(seed)
+    n = BASE_SKUS * scale
+
+    weight = rng.uniform(0.5, 12.0, n).round(2)
+    drift = rng.random(n) < 0.025
+    weight[drift] = np.maximum(weight[drift] * 10, WEIGHT_THRESHOLD + 1).round(1)
+
+    slot_ids = warehouse_df['slot_id'].to_numpy()
+    current_slot = slot_ids[rng.integers(0, len(slot_ids), n)].astype(object)
+    # Overflow bin: the top shelf at the head of A01
+    current_slot[rng.random(n) < 0.05] = slot_ids[(len(SHELF_LEVELS) - 1) * BAYS_PER_AISLE]
+    ghost = rng.random(n) < 0.02
+    ghost_aisle = BASE_AISLES_PER_ZONE * scale + 1 + rng.integers(0, 9, ghost.sum())
+    current_slot[ghost] = [
+        f"{zone}{aisle}-{shelf}-{bay:02d}"
+        for zone, aisle, shelf, bay in zip(
+            rng.choice(ZONES, ghost.sum()), ghost_aisle,
+            rng.choice(SHELF_LEVELS, ghost.sum()), rng.integers(1, BAYS_PER_AISLE + 1, ghost.sum())
+        )
+    ]
+
+    return pd.DataFrame({
+        'sku_id': [f"SKU-{10000 + i}" for i in range(n)],
+        'category': rng.choice(CATEGORIES, n),
+        'weight_kg': weight,
+        'temp_req': rng.choice(['Ambient', 'Frozen', 'Refrigerated'], n, p=[0.5, 0.275, 0.225]),
+        'is_fragile': rng.random(n) < 0.18,
+        'current_slot': current_slot,
+    })
+
+
+def _popularity(rng, n):
+    # Zipf-like demand: a few SKUs carry most order lines
+    weights = 1.0 / np.arange(1, n + 1) ** 0.9
+    return rng.permutation(weights / weights.sum())
+
+
+def write_orders(path, sku_df, scale=1, seed=0):
+    """order_transactions.csv, written in chunks of orders (1-5 lines each)."""
+    rng = np.random.default_rng(seed + 1)
+    sku_ids = sku_df['sku_id'].to_numpy()
+    popularity = _popularity(rng, len(sku_ids))
+
+    target_lines = BASE_ORDER_LINES * scale
+    width = max(6, len(str(target_lines)))
+    written = next_order = 0
+    with open(path, 'w', newline='') as f:
+        f.write('order_id,sku_id,order_timestamp\n')
+        while written < target_lines:
+            sizes = 1 + rng.poisson(1.5, CHUNK_ORDERS).clip(max=4)
+            sizes = sizes[np.cumsum(sizes) <= target_lines - written]
+            if not len(sizes):
+                sizes = np.array([target_lines - written])
+            order_no = np.repeat(np.arange(next_order, next_order + len(sizes)), sizes)
+            chunk = pd.DataFrame({
+                'order_id': pd.Series(order_no).astype(str).str.zfill(width).radd('ORD-'),
+                'sku_id': sku_ids[rng.choice(len(sku_ids), len(order_no), p=popularity)],
+                'order_timestamp': np.repeat(_timestamps(rng, len(sizes)), sizes),
+            })
+            chunk.to_csv(f, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S')
+            written += len(chunk)
+            next_order += len(sizes)
+    return written
+
+
+def write_picker_moves(path, sku_df, scale=1, seed=0):
+    """picker_movement.csv: GPS moves with PICKER-07's suspiciously short paths."""
+    rng = np.random.default_rng(seed + 2)
+    target_moves = BASE_PICKER_MOVES * scale
+    n_pickers = BASE_PICKERS * scale
+    width = max(2, len(str(n_pickers)))
+    pickers = pd.Series(np.arange(1, n_pickers + 1)).astype(str).str.zfill(width).radd('PICKER-').to_numpy()
+    sku_ids = sku_df['sku_id'].to_numpy()
+    popularity = _popularity(rng, len(sku_ids))
+
+    written = 0
+    with open(path, 'w', newline='') as f:
+        f.write('picker_id,sku_id,order_timestamp,movement_timestamp,travel_distance_m\n')
+        while written < target_moves:
+            n = min(CHUNK_ORDERS, target_moves - written)
+            picker_id = pickers[rng.integers(0, n_pickers, n)]
+            shortcut = picker_id == 'PICKER-07'
+            distance = rng.normal(35, 8, n).clip(5, 90)
+            distance[shortcut] = rng.normal(17.5, 3, shortcut.sum()).clip(5, 30)
+            seconds = distance / 1.0 + rng.gamma(2.0, 20.0, n)
+
+            order_ts = pd.Series(_timestamps(rng, n))
+            chunk = pd.DataFrame({
+                'picker_id': picker_id,
+                'sku_id': sku_ids[rng.choice(len(sku_ids), n, p=popularity)],
+                'order_timestamp': order_ts,
+                'movement_timestamp': order_ts + pd.to_timedelta(seconds.round(), unit='s'),
+                'travel_distance_m': distance.round(1),
+            })
+            chunk.to_csv(f, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S')
+            written += n
+    return written
+
+
+def generate_store(out_dir, scale=1, seed=0):
+    """Write all four source CSVs for a synthetic store at `scale` x the shipped size."""
+    os.makedirs(out_dir, exist_ok=True)
+    warehouse_df = generate_warehouse(scale)
+    sku_df = generate_skus(warehouse_df, scale, seed)
+    warehouse_df.to_csv(os.path.join(out_dir, SOURCES['warehouse']), index=False)
+    sku_df.to_csv(os.path.join(out_dir, SOURCES['sku']), index=False)
+    order_lines = write_orders(os.path.join(out_dir, SOURCES['orders']), sku_df, scale, seed)
+    picker_moves = write_picker_moves(os.path.join(out_dir, SOURCES['picker']), sku_df, scale, seed)
+    return {
+        'skus': len(sku_df),
+        'slots': len(warehouse_df),
+        'order_lines': order_lines,
+        'picker_moves': picker_moves,
+    }
+
+
+if __name__ == "__main__":
+    # python synthetic_data.py OUT_DIR [SCALE] [SEED]
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else 'synthetic_store'
+    scale = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    print(f"🏭 Generating a {scale}x synthetic store in {out_dir}/...")
+    sizes = generate_store(out_dir, scale, seed)
+    print("✅ " + ", ".join(f"{count:,} {name.replace('_', ' ')}" for name, count in sizes.items()))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dead_zones import evaluate_rules, minute_profile
+from move_scheduler import MINUTES_PER_DAY, concurrency_profile
+from slot_costs import load_layout
+
+
+@pytest.fixture
+def timeline():
+    # Two zone-B aisles (forklift rule, one space) and a narrow C aisle, picks
+    # on three days with a quiet day in between and stays across the hour
+    warehouse = pd.DataFrame({
+        'slot_id': ['B01-A-01', 'B02-A-01', 'C01-A-01', 'A01-A-01'],
+        'aisle_id': ['B01', 'B02', 'C01', 'A01'],
+        'aisle_width_m': [2.0, 2.0, 1.0, 2.0],
+    })
+    mapping = pd.Series(['B01-A-01', 'B02-A-01', 'C01-A-01', 'A01-A-01'], index=['S1', 'S2', 'S3', 'S4'])
+    rng = np.random.default_rng(7)
+    days = pd.to_datetime(['2024-03-01', '2024-03-02', '2024-03-04'])
+    stamps = days[rng.integers(0, len(days), 400)] + pd.to_timedelta(rng.integers(0, 86400, 400), unit='s')
+    picker_df = pd.DataFrame({
+        'picker_id': rng.choice(['P1', 'P2', 'P3', 'P4', 'P5'], 400),
+        'sku_id': rng.choice(mapping.index, 400),
+        'movement_timestamp': stamps,
+    })
+    layout = load_layout(None, {'pick_dwell_s': 420, 'capacity_rules': [
+        {'name': 'Narrow', 'max_width_m': 1.2, 'max_pickers': 1},
+    ]})
+    return evaluate_rules(picker_df, mapping, warehouse, layout)
+
+
+@pytest.mark.parametrize('quantile', [0.5, 0.9, 1.0])
+def test_concurrency_profile_matches_daily_minute_profiles(timeline, quantile):
+    days = pd.date_range(timeline['date'].min(), timeline['date'].max())
+    profile = concurrency_profile(timeline, quantile)
+
+    assert len(profile) == 2 * MINUTES_PER_DAY
+    for (rule, space), rows in timeline.groupby(['rule', 'space'], sort=False):
+        grid = np.zeros((len(days), MINUTES_PER_DAY))
+        for date, day in rows.groupby('date'):
+            grid[days.get_loc(date)] = minute_profile(day, space, date)['pickers'].to_numpy()
+        got = profile[(profile['rule'] == rule) & (profile['space'] == space)]
+        assert (got['max_pickers'] == rows['max_pickers'].iloc[0]).all()
+        np.testing.assert_array_equal(got['minute'].to_numpy(), np.arange(MINUTES_PER_DAY))
+        np.testing.assert_allclose(got['pickers'].to_numpy(), np.quantile(grid, quantile, axis=0))
+
+
+def test_concurrency_profile_empty_timeline(timeline):
+    assert concurrency_profile(timeline.iloc[:0]).empty
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from order_replay import replay_orders, summarize_replay
+
+
+@pytest.fixture
+def warehouse():
+    return pd.DataFrame({
+        'slot_id': ['A01-A-01', 'A01-A-02', 'B03-A-05'],
+        'zone': ['A', 'A', 'B'],
+        'aisle_id': ['A01', 'A01', 'B03'],
+        'shelf_level': ['A', 'A', 'A'],
+        'aisle_width_m': [2.0, 2.0, 1.0],
+    })
+
+
+def test_summary_averages_skip_orders_with_only_unmapped_skus(warehouse):
+    mapping = pd.Series({'S1': 'A01-A-01', 'S2': 'B03-A-05', 'S3': 'GHOST-1'})
+    order_lines = pd.DataFrame({
+        'order_id': ['O1', 'O1', 'O2', 'O3', 'O3'],
+        'sku_id': ['S1', 'S2', 'S2', 'S3', 'S9'],  # O3: a ghost slot and a SKU without one
+    })
+    per_order = replay_orders(order_lines, mapping, warehouse)
+    summary = summarize_replay(per_order)
+
+    picked = per_order[per_order['order_id'] != 'O3']
+    assert per_order.set_index('order_id').loc['O3', 'lines'] == 0
+    assert summary['orders'] == 2
+    assert summary['lines'] == 3
+    assert summary['unmapped_lines'] == 2
+    assert summary['empty_orders'] == 1
+    assert summary['avg_distance_m'] == pytest.approx(picked['distance_m'].mean())
+    assert summary['avg_pick_time_min'] == pytest.approx(picked['pick_time_s'].mean() / 60)
+    assert summary['avg_distance_m'] > per_order['distance_m'].mean()
@@ -0,0 +1,196 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_cache import SOURCES, is_fresh, read_table
+
+# Per-SKU state saved next to each plan, so the next week can start from it
+VELOCITY_STATE = 'velocity_state.csv'
+# Layout and options of the run that saved the state, read back by the weekly re-slot
+VELOCITY_SETTINGS = 'velocity_state.json'
+
+
+def _accumulate(total, chunk_counts):
+    # groupby(sort=False) keeps keys in first-seen order, like value_counts
+    if total is None:
+        return chunk_counts
+    return pd.concat([total, chunk_counts]).groupby(level=list(range(chunk_counts.index.nlevels)), sort=False).sum()
+
+
+def stream_order_counts(path='order_transactions.csv', chunksize=500_000, by_week=False, by_hour=False):
+    """Count order lines per SKU by streaming the order log in chunks.
+
+    Only sku_id (and order_timestamp when a time breakdown is asked for) is
+    read, and only the running per-key counts are kept between chunks, so
+    peak memory depends on chunksize and the number of SKUs, not on how much
+    history the file holds.
+
+    Returns a dict with 'sku' (sku_id, order_count) and, if requested, 'week'
+    (sku_id, week_start, order_count) and 'hour' (sku_id, hour, order_count).
+    """
+    usecols = ['sku_id']
+    if by_week or by_hour:
+        usecols.append('order_timestamp')
+
+    sku_total = week_total = hour_total = None
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+        sku_total = _accumulate(sku_total, chunk['sku_id'].value_counts(sort=False))
+
+        if by_week or by_hour:
+            timestamps = pd.to_datetime(chunk['order_timestamp'])
+        if by_week:
+            week_start = timestamps.dt.to_period('W-SUN').dt.start_time
+            week_total = _accumulate(
+                week_total, chunk.groupby([chunk['sku_id'], week_start.rename('week_start')], sort=False).size()
+            )
+        if by_hour:
+            hour_total = _accumulate(
+                hour_total, chunk.groupby([chunk['sku_id'], timestamps.dt.hour.rename('hour')], sort=False).size()
+            )
+
+    if sku_total is None:
+        # Empty order log
+        sku_total = pd.Series(dtype='int64')
+        week_total = hour_total = pd.Series(dtype='int64', index=pd.MultiIndex.from_arrays([[], []]))
+
+    # Highest velocity first; ties keep first-seen order (same as value_counts)
+    sku_velocity = sku_total.sort_values(ascending=False, kind='stable').rename_axis('sku_id').reset_index()
+    sku_velocity.columns = ['sku_id', 'order_count']
+
+    counts = {'sku': sku_velocity}
+    if by_week:
+        counts['week'] = week_total.rename('order_count').rename_axis(['sku_id', 'week_start']).reset_index()
+    if by_hour:
+        counts['hour'] = hour_total.rename('order_count').rename_axis(['sku_id', 'hour']).reset_index()
+    return counts
+
+
+def stream_velocity(path='order_transactions.csv', chunksize=500_000):
+    """sku_velocity frame (sku_id, order_count) built without loading the order log."""
+    return stream_order_counts(path, chunksize=chunksize)['sku']
+
+
+def decay_weights(timestamps, as_of, half_life_days):
+    """Weight of an order placed at `timestamps` as seen at `as_of` (1 at as_of, 0.5 one half-life earlier)."""
+    age_days = (as_of - timestamps) / pd.Timedelta(days=1)
+    return np.exp2(-np.asarray(age_days, dtype=float) / half_life_days)
+
+
+def update_decayed_velocity(state, orders, half_life_days):
+    """Fold new order lines (sku_id, order_timestamp) into a decayed velocity state.
+
+    The state is a sku_velocity frame whose order_count is the decayed
+    number of orders as of the latest order seen (`state.attrs['as_of']`);
+    pass None to start from nothing. Existing totals are decayed to the new
+    as_of with one multiply per SKU and each new row is added once, so the
+    full history is never re-read.
+    """
+    timestamps = pd.to_datetime(orders['order_timestamp'])
+    as_of = timestamps.max()
+    if state is not None and (pd.isna(as_of) or state.attrs['as_of'] > as_of):
+        as_of = state.attrs['as_of']
+
+    weights = pd.Series(decay_weights(timestamps, as_of, half_life_days), index=orders.index)
+    total = weights.groupby(orders['sku_id'], sort=False, observed=True).sum()
+    if state is not None:
+        previous = state.set_index('sku_id')['order_count']
+        total = _accumulate(previous * decay_weights(state.attrs['as_of'], as_of, half_life_days), total)
+
+    velocity = total.sort_values(ascending=False, kind='stable').rename_axis('sku_id').reset_index()
+    velocity.columns = ['sku_id', 'order_count']
+    velocity['sku_id'] = velocity['sku_id'].astype(str)
+    velocity.attrs = {'as_of': as_of, 'half_life_days': half_life_days}
+    return velocity
+
+
+def stream_decayed_velocity(path='order_transactions.csv', half_life_days=28, chunksize=500_000, state=None):
+    """Decayed sku_velocity streamed from the order log, one chunk at a time.
+
+    Starts from `state` (an earlier decayed sku_velocity) when given.
+    """
+    velocity = state
+    for chunk in pd.read_csv(path, usecols=['sku_id', 'order_timestamp'], chunksize=chunksize):
+        velocity = update_decayed_velocity(velocity, chunk, half_life_days)
+    return velocity
+
+
+def load_velocity(data_dir='.', chunksize=500_000, half_life_days=None):
+    """sku_velocity from the forensics cache when it is fresh, else streamed from the CSV.
+
+    From the cache only the dictionary-encoded sku_id column is mapped in.
+    With half_life_days, each order counts 0.5 ** (age / half_life) as of
+    the latest order, so recent demand outranks old demand.
+    """
+    if half_life_days:
+        if not is_fresh('orders', data_dir):
+            return stream_decayed_velocity(os.path.join(data_dir, SOURCES['orders']), half_life_days, chunksize)
+        orders = read_table('orders', columns=['sku_id', 'order_timestamp'], data_dir=data_dir)
+        return update_decayed_velocity(None, orders, half_life_days)
+
+    if not is_fresh('orders', data_dir):
+        return stream_velocity(os.path.join(data_dir, SOURCES['orders']), chunksize=chunksize)
+
+    sku_ids = read_table('orders', columns=['sku_id'], data_dir=data_dir)['sku_id']
+    codes = pd.Series(sku_ids.cat.codes)
+    # Counting codes keeps ties in first-seen order, same as the CSV path
+    counts = codes[codes >= 0].value_counts()
+    return pd.DataFrame({
+        'sku_id': sku_ids.cat.categories[counts.index.to_numpy()],
+        'order_count': counts.to_numpy(),
+    })
+
+
+def save_velocity_state(sku_data, output_dir='.', as_of=None, half_life_days=None, forecast_method=None,
+                        demand_multipliers=None, settings=None):
+    """Save velocity and constraint attributes per SKU, in velocity rank order.
+
+    For decayed velocity the half-life and as_of go along, so the next week
+    is decayed the same way; a forecast-ranked state records its method.
+    order_count must be the unscaled demand: the demand_multipliers the rank
+    was built with are saved alongside, so the next week adds its orders to
+    real counts and scales the total the same way. `settings` (the plan's
+    layout, weight threshold and solver options) go to velocity_state.json.
+    """
+    state = sku_data[['sku_id', 'order_count', 'temp_req', 'clean_weight_kg']]
+    if half_life_days:
+        state = state.assign(as_of=as_of, half_life_days=half_life_days)
+    if forecast_method:
+        state = state.assign(forecast_method=forecast_method)
+    if demand_multipliers:
+        state = state.assign(demand_multipliers=json.dumps(demand_multipliers, sort_keys=True))
+    state.to_csv(os.path.join(output_dir, VELOCITY_STATE), index=False)
+    settings_path = os.path.join(output_dir, VELOCITY_SETTINGS)
+    if settings:
+        with open(settings_path, 'w') as f:
+            json.dump(settings, f, indent=2, sort_keys=True)
+    elif os.path.exists(settings_path):
+        os.remove(settings_path)
+
+
+def load_velocity_state(output_dir='.'):
+    """The state saved with the previous plan (rank order kept), or None.
+
+    A decayed state carries as_of and half_life_days in its attrs, a
+    forecast-ranked one forecast_method, a scaled one demand_multipliers,
+    and one saved with run settings their dict under 'settings'.
+    """
+    path = os.path.join(output_dir, VELOCITY_STATE)
+    if not os.path.exists(path):
+        return None
+    state = pd.read_csv(path)
+    attrs = {}
+    if 'half_life_days' in state:
+        attrs = {'as_of': pd.Timestamp(state['as_of'].iloc[0]), 'half_life_days': float(state['half_life_days'].iloc[0])}
+    if 'forecast_method' in state:
+        attrs['forecast_method'] = state['forecast_method'].iloc[0]
+    if 'demand_multipliers' in state:
+        attrs['demand_multipliers'] = json.loads(state['demand_multipliers'].iloc[0])
+    state = state.drop(columns=['as_of', 'half_life_days', 'forecast_method', 'demand_multipliers'], errors='ignore')
+    settings_path = os.path.join(output_dir, VELOCITY_SETTINGS)
+    if os.path.exists(settings_path):
+        with open(settings_path) as f:
+            attrs['settings'] = json.load(f)
+    state.attrs = attrs
+    return state
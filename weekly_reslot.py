@@ -0,0 +1,218 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from affinity import affinity_partners, load_affinity
+from assignment_solver import pool_zone
+from congestion import picker_events
+from data_cache import WEIGHT_THRESHOLD, drift_corrected, load_tables
+from optimize_slotting import assign_slots, score_slots
+from plan_validator import validate_plan, write_violations
+from run_report import RunReport
+from velocity import load_velocity_state, save_velocity_state, stream_decayed_velocity, stream_velocity
+
+MOVES_FILE = 'slotting_moves.csv'
+
+
+def find_changed_skus(sku_data, prev_rank, prev_state, plan_slot, warehouse_df, rank_tolerance=0.02):
+    """Why each SKU has to be re-slotted this week ('' when it can stay).
+
+    `sku_data` is in the new velocity order. A SKU is re-slotted if it is
+    new, if its velocity rank moved by more than rank_tolerance (a share of
+    the catalogue), if its temperature or weight changed, or if its planned
+    slot no longer exists, has the wrong temperature or cannot carry it.
+    Tied SKUs share a rank range, so reshuffles within a tie move nothing.
+    """
+    n = len(sku_data)
+    reason = np.full(n, '', dtype=object)
+
+    previous = prev_state.set_index('sku_id').reindex(sku_data['sku_id'])
+    slots = warehouse_df.set_index('slot_id').reindex(plan_slot)
+    weight = sku_data['clean_weight_kg'].to_numpy(dtype=float)
+
+    counts = -sku_data['order_count'].to_numpy(dtype=float)
+    first = np.searchsorted(counts, counts, side='left')
+    last = np.searchsorted(counts, counts, side='right') - 1
+    shift = np.maximum(np.maximum(first - prev_rank, prev_rank - last), 0)
+    moved = shift > max(1, rank_tolerance * n)
+    reason[moved] = 'velocity'
+    constraint = (
+        (previous['temp_req'].to_numpy() != sku_data['temp_req'].to_numpy())
+        | ~np.isclose(previous['clean_weight_kg'].to_numpy(dtype=float), weight)
+        | slots['temp_zone'].isna().to_numpy()
+        | (slots['temp_zone'].to_numpy() != pool_zone(sku_data['temp_req']))
+        | (slots['max_weight_kg'].to_numpy(dtype=float) < weight)
+    )
+    reason[constraint] = 'constraint'
+    reason[np.isnan(prev_rank)] = 'new'
+    return reason
+
+
+def candidate_slots(free_slots, movers):
+    """The free slots the greedy pass could give to `movers`.
+
+    `free_slots` is in ranking order and a mover takes the best free slot of
+    its temperature pool that can carry it, so with m movers in a pool only
+    the m best slots of each max_weight_kg class there can ever be taken.
+    The plan is the same as over the whole free pool, but the slot index is
+    built over at most m slots per class.
+    """
+    movers_per_pool = pd.Series(pool_zone(movers['temp_req'])).value_counts()
+    limit = free_slots['temp_zone'].astype(str).map(movers_per_pool).fillna(0).to_numpy()
+    rank = free_slots.groupby(['temp_zone', 'max_weight_kg'], sort=False, observed=True, dropna=False).cumcount()
+    return free_slots[rank.to_numpy() < limit]
+
+
+def reslot_week(new_orders, data_dir='.', output_dir=None, rank_tolerance=0.02):
+    """Update last week's plan with one more week of orders.
+
+    Starts from final_slotting_plan.csv and the velocity state saved with it
+    in output_dir (default: data_dir), adds only the new week's order counts
+    (decayed with the state's half-life if the plan used decayed velocity),
+    and re-runs the greedy assignment for the changed SKUs alone (see
+    find_changed_skus) on the few free slots they could take (see
+    candidate_slots); every other SKU keeps its slot. A plan built with
+    demand_multipliers is scaled the same way again, and the layout, weight
+    threshold, congestion and affinity settings saved with the state are
+    reused, so the week is placed on the same cost surface (the optimal
+    solver, local search and move budget are not re-run: changed SKUs are
+    placed greedily). The merged plan is validated like a full run's
+    (plan_violations.csv), then the new plan, the delta move list
+    (slotting_moves.csv), the state and a run report are written.
+    """
+    output_dir = output_dir or data_dir
+    plan_path = os.path.join(output_dir, 'final_slotting_plan.csv')
+    print("🔁 STARTING INCREMENTAL RE-SLOTTING...")
+    report = RunReport(mode='incremental', new_orders=new_orders, rank_tolerance=rank_tolerance)
+
+    # 1. PREVIOUS STATE
+    print("📦 Loading last week's plan...")
+    report.begin('load')
+    prev_state = load_velocity_state(output_dir)
+    if prev_state is None or not os.path.exists(plan_path):
+        raise FileNotFoundError(f"No previous plan in {output_dir}; run optimize_slotting() first")
+    plan = pd.read_csv(plan_path)
+    # Same layout and options as the run that built the plan (defaults for an older state)
+    settings = prev_state.attrs.get('settings', {})
+    layout = settings.get('layout')
+    weight_threshold = settings.get('weight_threshold', WEIGHT_THRESHOLD)
+    tables = load_tables(['sku', 'warehouse'] + (['picker'] if settings.get('congestion') else []), data_dir)
+    sku_df = tables['sku']
+    if weight_threshold != WEIGHT_THRESHOLD:
+        sku_df = sku_df.assign(clean_weight_kg=drift_corrected(sku_df['weight_kg'], weight_threshold))
+    report.end(rows=len(plan))
+
+    # 2. VELOCITY UPDATE (new week only)
+    print("📈 Adding the new week's orders...")
+    report.begin('velocity_update')
+    if 'forecast_method' in prev_state.attrs:
+        raise ValueError("The previous plan was ranked by a demand forecast; re-run optimize_slotting() instead")
+    multipliers = prev_state.attrs.get('demand_multipliers')
+    decay = {}
+    if 'half_life_days' in prev_state.attrs:
+        # Same half-life as the previous plan; the old totals are decayed, not re-read
+        counts = stream_decayed_velocity(new_orders, prev_state.attrs['half_life_days'], state=prev_state)
+        decay = counts.attrs
+        counts = counts.set_index('sku_id')['order_count']
+    else:
+        week = stream_velocity(new_orders)
+        counts = prev_state.set_index('sku_id')['order_count'].add(
+            week.set_index('sku_id')['order_count'], fill_value=0
+        )
+    prev_rank = pd.Series(np.arange(len(prev_state), dtype=float), index=prev_state['sku_id'])
+
+    sku_ids = sku_df['sku_id'].astype(str)
+    sku_data = sku_df.assign(base_count=sku_ids.map(counts).fillna(0), prev_rank=sku_ids.map(prev_rank))
+    # Counts stay unscaled; the previous plan's category multipliers are applied on top
+    sku_data['order_count'] = sku_data['base_count']
+    if multipliers:
+        sku_data['order_count'] = sku_data['base_count'] * (
+            sku_data['category'].astype(str).map(multipliers).fillna(1).to_numpy()
+        )
+    # New velocity order; ties keep last week's order, new SKUs go last among equals
+    sku_data = sku_data.sort_values(
+        ['order_count', 'prev_rank'], ascending=[False, True], na_position='last', kind='stable'
+    ).reset_index(drop=True)
+    report.end(rows=len(counts))
+
+    # 3. CHANGE DETECTION
+    print("🔎 Finding SKUs whose rank or constraints changed...")
+    report.begin('change_detection')
+    warehouse_df = score_slots(tables['warehouse'], layout)
+    plan_slot = sku_data['sku_id'].astype(str).map(plan.set_index('SKU_ID')['Bin_ID'])
+    reason = find_changed_skus(
+        sku_data, sku_data['prev_rank'].to_numpy(), prev_state, plan_slot.to_numpy(), warehouse_df, rank_tolerance
+    )
+    changed = reason != ''
+    report.end(rows=int(changed.sum()))
+    print(f"   - {changed.sum()} of {len(sku_data)} SKUs to re-slot "
+          f"({', '.join(f'{n} {r}' for r, n in pd.Series(reason[changed]).value_counts().items()) or 'none'})")
+
+    # 4. ASSIGNMENT (changed SKUs only, on every slot the others do not hold)
+    print("🧩 Re-slotting changed SKUs...")
+    report.begin('assignment')
+    held = set(plan_slot[~changed].dropna())
+    free_slots = warehouse_df[~warehouse_df['slot_id'].isin(held)]
+    movers = sku_data[changed].copy()
+    # A SKU that finds no slot stays where last week's plan put it
+    movers['current_slot'] = plan_slot[changed].fillna(movers['current_slot'])
+    if settings.get('congestion') or settings.get('affinity'):
+        # Capacity rules and affinity see the unchanged SKUs where they sit;
+        # a mover may then pass over better slots, so the whole free pool stays open
+        events = picker_events(tables['picker']) if settings.get('congestion') else None
+        partners = None
+        if settings.get('affinity'):
+            partners = affinity_partners(*load_affinity(data_dir, settings.get('affinity_top_k', 20)))
+        held_slots = pd.Series(plan_slot[~changed].to_numpy(), index=sku_data['sku_id'][~changed].to_numpy()).dropna()
+        reassigned, fallback_skus = assign_slots(
+            movers, free_slots, events, partners=partners, layout=layout, placed=held_slots
+        )
+    else:
+        reassigned, fallback_skus = assign_slots(movers, candidate_slots(free_slots, movers), layout=layout)
+
+    new_slot = plan_slot.copy()
+    new_slot[changed] = movers['sku_id'].map(reassigned.set_index('SKU_ID')['Bin_ID']).to_numpy()
+    result_df = pd.DataFrame({'SKU_ID': sku_data['sku_id'], 'Bin_ID': new_slot})
+    report.end(rows=len(movers))
+
+    # 5. VALIDATION (hard constraints of the merged plan, before anything is written)
+    print("🔍 Validating hard constraints...")
+    report.begin('validation')
+    violation_counts = write_violations(validate_plan(result_df, sku_data, warehouse_df), output_dir)
+    report.summary.update(violations=violation_counts.to_dict())
+    report.end(rows=len(result_df))
+
+    # 6. EXPORT (plan, delta moves, state)
+    print("💾 Saving plan and move list...")
+    report.begin('export')
+    from_slot = plan_slot.fillna(sku_data['current_slot'])
+    is_move = (from_slot != new_slot).to_numpy()
+    moves = pd.DataFrame({
+        'sku_id': sku_data['sku_id'],
+        'from_slot': from_slot,
+        'to_slot': new_slot,
+        'order_count': sku_data['order_count'],
+        'reason': reason,
+    })[is_move]
+    result_df.to_csv(plan_path, index=False)
+    moves.to_csv(os.path.join(output_dir, MOVES_FILE), index=False)
+    save_velocity_state(sku_data.assign(order_count=sku_data['base_count']), output_dir, **decay,
+                        demand_multipliers=multipliers, settings=settings)
+    report.end(rows=len(moves))
+
+    dropped = (~plan['SKU_ID'].isin(sku_data['sku_id'])).sum()
+    report.summary.update(
+        skus=len(sku_data), changed=int(changed.sum()), moves=len(moves),
+        fallback=len(fallback_skus), dropped=int(dropped),
+    )
+    report.write(os.path.join(output_dir, 'final_slotting_report.json'))
+    print(f"✅ {len(moves)} moves written to {MOVES_FILE} "
+          f"({len(fallback_skus)} fallbacks, {dropped} SKUs no longer in the catalogue)")
+    return result_df, moves
+
+
+if __name__ == "__main__":
+    # python weekly_reslot.py NEW_WEEK_ORDERS.csv [RANK_TOLERANCE]
+    reslot_week(sys.argv[1], rank_tolerance=float(sys.argv[2]) if len(sys.argv) > 2 else 0.02)